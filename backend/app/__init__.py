@@ -1,7 +1,7 @@
 from flask import Flask
 from config import Config
 # Importa as instâncias do novo arquivo
-from .extensions import db, migrate, jwt, bcrypt, cors 
+from .extensions import db, migrate, jwt, bcrypt, cors, pool_senhas, fila_relatorios, pragmas_sqlite, metricas, hub_eventos
 
 def create_app(config_class=Config):
     """
@@ -13,12 +13,21 @@ def create_app(config_class=Config):
     
     # 1. Carrega a configuração
     app.config.from_object(config_class)
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        raise RuntimeError('Banco de dados não configurado: defina DATABASE_URL (obrigatória no perfil de produção).')
+    from app.receita import verificar_banco
+    verificar_banco(app)
 
     # 2. Inicializa as extensões com a aplicação
     db.init_app(app)
+    pragmas_sqlite.init_app(app, db)
     migrate.init_app(app, db)
     jwt.init_app(app)
     bcrypt.init_app(app)
+    pool_senhas.init_app(app)
+    fila_relatorios.init_app(app)
+    metricas.init_app(app, db)
+    hub_eventos.init_app(app)
     
     # Inicializa o CORS com o padrão robusto que você já tinha
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
@@ -43,4 +52,13 @@ def create_app(config_class=Config):
     from app.routes.relatorios import bp as relatorios_bp
     app.register_blueprint(relatorios_bp, url_prefix='/api/relatorios')
 
+    from app.routes.sincronizacao import bp as sincronizacao_bp
+    app.register_blueprint(sincronizacao_bp, url_prefix='/api/sincronizacao')
+
+    # 4. Comandos de linha ('flask receita reconstruir', 'flask sincronizacao reconstruir')
+    from app.receita import receita_cli
+    app.cli.add_command(receita_cli)
+    from app.sincronizacao import sincronizacao_cli
+    app.cli.add_command(sincronizacao_cli)
+
     return app
\ No newline at end of file
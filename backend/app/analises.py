@@ -0,0 +1,171 @@
+from itertools import chain
+import numpy as np
+from sqlalchemy import select, extract, func
+from app.extensions import db
+from app.models import RegistroOperacional, Viagem, Onibus
+from app.ocupacao import CAPACIDADE_PADRAO
+
+# --- Lotação e fator de carga a partir dos registros operacionais ---
+#
+# Os registros do período vêm numa única consulta, só com colunas inteiras
+# (dia da semana e hora já extraídos pelo banco), e viram uma matriz NumPy.
+# Os agrupamentos são feitos com np.bincount, sem laços em Python
+# por registro: anos de registros cabem em poucas dezenas de milissegundos.
+# Uma viagem pode ter vários registros (um por parada): as médias são por
+# registro, e 'viagens'/'viagens_lotadas' contam viagens distintas.
+
+# Colunas da matriz, na ordem do SELECT
+VIAGEM, ROTA, ONIBUS, DIA_SEMANA, HORA, CAPACIDADE, CHEGARAM, EMBARCARAM, DESEMBARCARAM, FINAL = range(10)
+
+# Dimensões aceitas em ?dimensoes= (nome -> coluna da matriz)
+DIMENSOES = {'rota': ROTA, 'onibus': ONIBUS, 'dia_semana': DIA_SEMANA, 'hora': HORA}
+
+# extract('dow') devolve 0 = domingo (SQLite e PostgreSQL)
+NOMES_DIA_SEMANA = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
+
+# Lotação a partir da qual a viagem conta como cheia
+LIMIAR_LOTADA = 0.9
+
+# Indicadores que são contagens (saem como inteiros)
+INDICADORES_INTEIROS = ('registros', 'viagens', 'viagens_lotadas', 'passageiros', 'assentos', 'embarques', 'desembarques')
+
+
+def carregar_registros(data_inicio=None, data_fim=None, rota_id=None, onibus_id=None):
+    """
+    Matriz int64 (n x 10) com um registro por linha, nas colunas VIAGEM ... FINAL.
+    O período é o da partida prevista da viagem. Contagens nulas valem 0 e
+    ônibus sem capacidade usam CAPACIDADE_PADRAO, como no mapa de poltronas.
+    """
+    partida = Viagem.data_partida_prevista
+    consulta = select(
+        Viagem.id,
+        Viagem.rota_id,
+        Viagem.onibus_id,
+        extract('dow', partida),
+        extract('hour', partida),
+        func.coalesce(Onibus.capacidade, CAPACIDADE_PADRAO),
+        func.coalesce(RegistroOperacional.pass_chegaram, 0),
+        func.coalesce(RegistroOperacional.pass_embarcaram, 0),
+        func.coalesce(RegistroOperacional.pass_desembarcaram, 0),
+        func.coalesce(RegistroOperacional.pass_final, 0),
+    ).join(Viagem, RegistroOperacional.viagem_id == Viagem.id) \
+     .join(Onibus, Viagem.onibus_id == Onibus.id)
+    if data_inicio:
+        consulta = consulta.where(partida >= data_inicio)
+    if data_fim:
+        consulta = consulta.where(partida <= data_fim)
+    if rota_id is not None:
+        consulta = consulta.where(Viagem.rota_id == rota_id)
+    if onibus_id is not None:
+        consulta = consulta.where(Viagem.onibus_id == onibus_id)
+
+    # Direto do cursor do DBAPI: são só inteiros, não há conversão de tipo a fazer
+    # e evitam-se os objetos Row do SQLAlchemy (metade do tempo da carga)
+    resultado = db.session.connection().execute(consulta)
+    try:
+        linhas = resultado.cursor.fetchall()
+    finally:
+        resultado.close()
+    # Achata as tuplas direto num buffer int64 (sem uma lista de listas no meio)
+    matriz = np.fromiter(chain.from_iterable(linhas), dtype=np.int64, count=len(linhas) * 10)
+    return matriz.reshape(len(linhas), 10)
+
+
+def _pesos(matriz):
+    """
+    Valores por registro (float64) somados nos agrupamentos. Calculados uma
+    vez e reutilizados por todas as dimensões.
+    """
+    capacidade = np.maximum(matriz[:, CAPACIDADE], 1).astype(np.float64)
+    final = matriz[:, FINAL].astype(np.float64)
+    ocupacao = final / capacidade
+    lotada = ocupacao >= LIMIAR_LOTADA
+
+    # Viagens distintas: peso 1 só no primeiro registro de cada viagem. Todas as
+    # dimensões são da viagem, então os registros dela caem sempre no mesmo grupo
+    _, primeiros, viagem = np.unique(matriz[:, VIAGEM], return_index=True, return_inverse=True)
+    viagens = np.zeros(len(matriz))
+    viagens[primeiros] = 1.0
+    # Viagem lotada: algum dos seus registros passou de LIMIAR_LOTADA
+    viagens_lotadas = np.zeros(len(matriz))
+    viagens_lotadas[primeiros] = np.bincount(viagem, weights=lotada) > 0
+    return {
+        'ocupacao': ocupacao,
+        'ocupacao_chegada': matriz[:, CHEGARAM] / capacidade,
+        'viagens': viagens,
+        'viagens_lotadas': viagens_lotadas,
+        'passageiros': final,
+        'assentos': capacidade,
+        'embarques': matriz[:, EMBARCARAM].astype(np.float64),
+        'desembarques': matriz[:, DESEMBARCARAM].astype(np.float64),
+    }
+
+
+def _agrupar(chave, pesos):
+    """
+    Indicadores por valor de chave (inteiros >= 0, como ids, dia da semana e
+    hora). A própria chave serve de índice no np.bincount, sem ordenar;
+    ficam só os valores que aparecem. Retorna (valores, {indicador: array}).
+    """
+    # Coluna da matriz é uma vista com passo: copiada uma vez, e não a cada bincount
+    chave = np.ascontiguousarray(chave, dtype=np.intp)
+    tamanho = int(chave.max()) + 1 if len(chave) else 0
+    soma = {nome: np.bincount(chave, weights=peso, minlength=tamanho) for nome, peso in pesos.items()}
+    registros = np.bincount(chave, minlength=tamanho)
+    maxima = np.full(tamanho, np.nan)
+    np.fmax.at(maxima, chave, pesos['ocupacao'])
+
+    valores = np.flatnonzero(registros)
+    registros = registros[valores]
+    soma = {nome: array[valores] for nome, array in soma.items()}
+    return valores, {
+        'registros': registros,
+        'viagens': soma['viagens'],
+        # Média das lotações medidas em cada registro (pass_final / capacidade)
+        'ocupacao_media': soma['ocupacao'] / registros,
+        'ocupacao_chegada_media': soma['ocupacao_chegada'] / registros,
+        'ocupacao_maxima': maxima[valores],
+        # Fator de carga: passageiros transportados / assentos oferecidos
+        'fator_carga': soma['passageiros'] / soma['assentos'],
+        # Viagens com pelo menos um registro acima de LIMIAR_LOTADA
+        'viagens_lotadas': soma['viagens_lotadas'],
+        'passageiros': soma['passageiros'],
+        'assentos': soma['assentos'],
+        'embarques': soma['embarques'],
+        'desembarques': soma['desembarques'],
+    }
+
+
+def _como_itens(chave, valores, indicadores):
+    """ Arrays por grupo -> lista de dicts (só aqui há um laço, por grupo e não por registro) """
+    colunas = {nome: array.tolist() for nome, array in indicadores.items()}
+    itens = []
+    for i, valor in enumerate(valores.tolist()):
+        item = {chave: valor}
+        for nome, lista in colunas.items():
+            item[nome] = _arredondar(nome, lista[i])
+        itens.append(item)
+    return itens
+
+
+def _arredondar(nome, valor):
+    if nome in INDICADORES_INTEIROS:
+        return int(valor) if valor == valor else 0
+    return round(valor, 4) if valor == valor else None  # NaN (sem viagens) -> None
+
+
+def analisar(matriz, dimensoes=tuple(DIMENSOES)):
+    """
+    Indicadores de lotação da matriz de carregar_registros(): o total do
+    período e um agrupamento por dimensão pedida. Retorna
+    {'total': {...}, 'por_<dimensao>': [{<dimensao>: valor, ...}, ...]}.
+    """
+    pesos = _pesos(matriz)
+    # O total é um agrupamento com a mesma chave (0) para todos os registros
+    _, total = _agrupar(np.zeros(len(matriz), dtype=np.intp), pesos)
+    resultado = {'total': {nome: _arredondar(nome, array[0].item() if len(array) else float('nan'))
+                           for nome, array in total.items()}}
+    for nome in dimensoes:
+        valores, indicadores = _agrupar(matriz[:, DIMENSOES[nome]], pesos)
+        resultado[f'por_{nome}'] = _como_itens(nome, valores, indicadores)
+    return resultado
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinela para distinguir "não está no cache" de um valor None guardado
+AUSENTE = object()
+
+
+class CacheTTL:
+    """
+    Cache em memória, thread-safe, com expiração por tempo (TTL) e limite de
+    itens (descarta o usado há mais tempo - LRU). É local ao processo.
+    Com 'max_bytes', os valores devem ser bytes e o cache também descarta os
+    itens mais antigos quando a soma dos tamanhos passa desse limite.
+    """
+
+    def __init__(self, max_itens=1024, ttl=300, max_bytes=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()  # chave -> (expira_em, valor, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=AUSENTE):
+        """ Retorna o valor guardado, ou 'padrao' se não existir ou tiver expirado """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return padrao
+            expira_em, valor, _ = item
+            if expira_em < time.monotonic():
+                self._remover(chave)
+                return padrao
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl=None):
+        """ Guarda um valor. 'ttl' (segundos) sobrepõe o TTL padrão do cache. """
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tamanho = len(valor) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and tamanho > self.max_bytes:
+            return # Não cabe no cache
+        with self._lock:
+            self._remover(chave)
+            self._itens[chave] = (expira_em, valor, tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or \
+                    (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remover(next(iter(self._itens)))
+
+    def invalidar(self, chave):
+        """ Remove uma chave do cache (se existir) """
+        with self._lock:
+            self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self._bytes -= item[2]
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,170 @@
+import heapq
+from bisect import bisect_left
+from sqlalchemy import or_, and_, func
+from app.extensions import db
+from app.models import Viagem
+
+# --- Conflitos de escala: o mesmo ônibus ou motorista em viagens sobrepostas ---
+#
+# Duas viagens se sobrepõem se cada uma parte antes da chegada da outra
+# (encostar, chegada == partida, não é conflito). Viagens canceladas não
+# ocupam ônibus nem motorista.
+
+STATUS_SEM_ESCALA = ('Cancelada',)
+
+# Recurso -> coluna da viagem (cada uma com índice composto (coluna, data_partida_prevista))
+RECURSOS = {
+    'onibus': Viagem.onibus_id,
+    'motorista': Viagem.motorista_id,
+}
+
+# Nome do recurso nas mensagens de conflito
+NOMES_RECURSO = {'onibus': 'ônibus', 'motorista': 'motorista'}
+
+
+def _ocupa_escala():
+    # status NULL conta como viagem ativa (NOT IN sozinho a deixaria de fora)
+    return or_(Viagem.status.is_(None), Viagem.status.notin_(STATUS_SEM_ESCALA))
+
+
+def conflitos_viagem(viagem):
+    """
+    Viagens que já usam o ônibus ou o motorista de 'viagem' num horário que se
+    sobrepõe ao dela. Retorna [(recurso, Viagem), ...].
+
+    Cada recurso custa duas buscas no índice (coluna, data_partida_prevista),
+    O(log n) no número de viagens do recurso:
+      - as viagens que partem dentro da janela [partida, chegada) da nova;
+      - a última viagem que parte antes dela, que é a única que pode ainda
+        estar em curso na partida, desde que a escala gravada não tenha
+        sobreposições (o que estas verificações garantem dali em diante;
+        as que já existirem aparecem em listar_conflitos()).
+    """
+    if viagem.status in STATUS_SEM_ESCALA:
+        return []
+    partida, chegada = viagem.data_partida_prevista, viagem.data_chegada_prevista
+    conflitos = []
+    for recurso, coluna in RECURSOS.items():
+        base = Viagem.query.filter(
+            coluna == getattr(viagem, coluna.key),
+            _ocupa_escala(),
+        )
+        if viagem.id is not None:
+            base = base.filter(Viagem.id != viagem.id)
+
+        na_janela = base.filter(
+            Viagem.data_partida_prevista >= partida,
+            Viagem.data_partida_prevista < chegada,
+        ).order_by(Viagem.data_partida_prevista).all()
+        anterior = base.filter(Viagem.data_partida_prevista < partida) \
+            .order_by(Viagem.data_partida_prevista.desc()).first()
+
+        if anterior is not None and anterior.data_chegada_prevista > partida:
+            conflitos.append((recurso, anterior))
+        conflitos.extend((recurso, outra) for outra in na_janela)
+    return conflitos
+
+
+def escala_ocupada(recurso, ids, inicio, fim):
+    """
+    Horários já ocupados dos ônibus/motoristas 'ids' em torno de [inicio, fim):
+    {id: ([partidas], [chegadas])}, em ordem de partida. Entram as viagens que
+    partem no período e, de cada recurso, a última que parte antes dele (a
+    única que pode ainda estar em curso no início, como em conflitos_viagem).
+    Serve para verificar muitas viagens novas em memória, com posicao_livre().
+    """
+    coluna = RECURSOS[recurso]
+    ocupados = {id: ([], []) for id in ids}
+    if not ocupados:
+        return ocupados
+    linhas = db.session.query(coluna, Viagem.data_partida_prevista, Viagem.data_chegada_prevista).filter(
+        coluna.in_(list(ocupados)), _ocupa_escala(),
+        Viagem.data_partida_prevista >= inicio, Viagem.data_partida_prevista < fim,
+    ).order_by(coluna, Viagem.data_partida_prevista)
+    # Viagem anterior ao período de todos os recursos numa consulta: a última
+    # partida de cada um (GROUP BY) e a viagem que parte nela. Duas viagens do
+    # mesmo recurso na mesma partida já são um conflito; fica a que chega depois
+    ultimas = db.session.query(coluna.label('recurso'), func.max(Viagem.data_partida_prevista).label('partida')).filter(
+        coluna.in_(list(ocupados)), _ocupa_escala(), Viagem.data_partida_prevista < inicio,
+    ).group_by(coluna).subquery()
+    anteriores = {}
+    for id, partida, chegada in db.session.query(
+            ultimas.c.recurso, Viagem.data_partida_prevista, Viagem.data_chegada_prevista
+    ).join(Viagem, and_(coluna == ultimas.c.recurso, Viagem.data_partida_prevista == ultimas.c.partida)) \
+            .filter(_ocupa_escala()):
+        if id not in anteriores or chegada > anteriores[id][1]:
+            anteriores[id] = (partida, chegada)
+    for id, (partida, chegada) in anteriores.items():
+        ocupados[id][0].append(partida)
+        ocupados[id][1].append(chegada)
+    for id, partida, chegada in linhas:
+        ocupados[id][0].append(partida)
+        ocupados[id][1].append(chegada)
+    return ocupados
+
+
+def posicao_livre(partidas, chegadas, partida, chegada):
+    """
+    Posição (busca binária) em que [partida, chegada) entra nas listas de
+    escala_ocupada() sem se sobrepor a nenhum intervalo, mantendo a ordem;
+    None se houver sobreposição.
+    """
+    i = bisect_left(partidas, partida)
+    if i > 0 and chegadas[i - 1] > partida:
+        return None
+    if i < len(partidas) and partidas[i] < chegada:
+        return None
+    return i
+
+
+def listar_conflitos(data_inicio=None, data_fim=None, recursos=tuple(RECURSOS)):
+    """
+    Todos os pares de viagens sobrepostas no mesmo ônibus/motorista entre as
+    viagens que ocupam algum momento do período. Uma varredura por recurso,
+    em ordem de (recurso, partida), com um heap das viagens em curso:
+    O(n log n + pares). Retorna dicts com o recurso e as duas viagens.
+    """
+    pares = []
+    for recurso in recursos:
+        coluna = RECURSOS[recurso]
+        query = db.session.query(
+            coluna, Viagem.id, Viagem.data_partida_prevista, Viagem.data_chegada_prevista, Viagem.status
+        ).filter(_ocupa_escala())
+        if data_inicio:
+            query = query.filter(Viagem.data_chegada_prevista > data_inicio)
+        if data_fim:
+            query = query.filter(Viagem.data_partida_prevista < data_fim)
+        query = query.order_by(coluna, Viagem.data_partida_prevista, Viagem.id)
+
+        recurso_atual = None
+        em_curso = []  # heap de (chegada, id, linha)
+        for linha in query.yield_per(1000):
+            if linha[0] != recurso_atual:
+                recurso_atual, em_curso = linha[0], []
+            # Saem as que já chegaram antes (ou no momento) desta partida
+            while em_curso and em_curso[0][0] <= linha.data_partida_prevista:
+                heapq.heappop(em_curso)
+            for _, _, outra in em_curso:
+                pares.append(_par(recurso, recurso_atual, outra, linha))
+            heapq.heappush(em_curso, (linha.data_chegada_prevista, linha.id, linha))
+    pares.sort(key=lambda par: (par['inicio_sobreposicao'], par['recurso'], par['recurso_id']))
+    return pares
+
+
+def _par(recurso, recurso_id, primeira, segunda):
+    return {
+        'recurso': recurso,
+        'recurso_id': recurso_id,
+        'viagens': [_resumo(primeira), _resumo(segunda)],
+        'inicio_sobreposicao': max(primeira.data_partida_prevista, segunda.data_partida_prevista),
+        'fim_sobreposicao': min(primeira.data_chegada_prevista, segunda.data_chegada_prevista),
+    }
+
+
+def _resumo(viagem):
+    return {
+        'id': viagem.id,
+        'data_partida_prevista': viagem.data_partida_prevista,
+        'data_chegada_prevista': viagem.data_chegada_prevista,
+        'status': viagem.status,
+    }
@@ -0,0 +1,79 @@
+import base64
+import json
+from dateutil import parser
+from sqlalchemy import and_, or_
+
+# --- Helpers partilhados pelas rotas de listagem (filtros e paginação) ---
+
+LIMITE_MAXIMO = 500
+
+
+class ParametroInvalido(ValueError):
+    """ Erro de validação de um parâmetro de query (vira um 400 na rota) """
+    pass
+
+
+def parse_intervalo_datas(args):
+    """
+    Lê ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD dos query params.
+    Retorna (data_inicio, data_fim), cobrindo os dias inteiros. Ambos são opcionais.
+    """
+    data_inicio = data_fim = None
+    try:
+        if args.get('data_inicio'):
+            data_inicio = parser.parse(args['data_inicio']).replace(hour=0, minute=0, second=0, microsecond=0)
+        if args.get('data_fim'):
+            data_fim = parser.parse(args['data_fim']).replace(hour=23, minute=59, second=59, microsecond=999999)
+    except (ValueError, OverflowError) as e:
+        raise ParametroInvalido(f"Formato de data inválido: {e}")
+    return data_inicio, data_fim
+
+
+def parse_inteiro(args, nome):
+    """ Lê ?<nome>=N (ex.: um id de filtro). Retorna None quando o parâmetro não foi passado. """
+    if not args.get(nome):
+        return None
+    try:
+        return int(args[nome])
+    except ValueError:
+        raise ParametroInvalido(f"O parâmetro '{nome}' deve ser um inteiro.")
+
+
+def parse_limite(args):
+    """ Lê ?limite=N. Retorna None quando a paginação não foi pedida. """
+    if 'limite' not in args:
+        return None
+    try:
+        limite = int(args['limite'])
+    except ValueError:
+        raise ParametroInvalido("O parâmetro 'limite' deve ser um inteiro.")
+    if limite < 1:
+        raise ParametroInvalido("O parâmetro 'limite' deve ser maior que zero.")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def codificar_cursor(data_hora, id):
+    """ Gera um cursor opaco a partir da chave (data_hora, id) do último item da página """
+    bruto = json.dumps([data_hora.isoformat(), id]).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """ Inverso de codificar_cursor. Retorna (data_hora, id). """
+    try:
+        data_hora_str, id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return parser.isoparse(data_hora_str), int(id)
+    except (ValueError, TypeError):
+        raise ParametroInvalido('Cursor inválido.')
+
+
+def filtro_keyset_desc(coluna_data, coluna_id, cursor):
+    """
+    Condição WHERE da paginação por cursor (keyset) para listagens ordenadas
+    por (coluna_data DESC, coluna_id DESC): devolve só os itens depois do cursor.
+    """
+    data_hora, id = decodificar_cursor(cursor)
+    return or_(
+        coluna_data < data_hora,
+        and_(coluna_data == data_hora, coluna_id < id)
+    )
@@ -1,11 +1,30 @@
 from functools import wraps
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
 from app.models import Usuario
+from app.cache import CacheTTL, AUSENTE
+
+# Cache (por processo) do nível de acesso dos utilizadores, indexado pelo id.
+# Uma entrada aqui tem prioridade sobre o claim do token: é assim que uma
+# alteração de papel (ou exclusão) vale para tokens emitidos antes dela.
+cache_papeis = CacheTTL(max_itens=1024)
+
+
+def registrar_papel(usuario_id, nivel_acesso):
+    """
+    Regista o nível de acesso atual de um utilizador (None = sem acesso).
+    Deve ser chamado quando o papel muda ou o utilizador é excluído.
+    """
+    cache_papeis.definir(str(usuario_id), nivel_acesso, ttl=current_app.config['CACHE_PAPEIS_TTL'])
+
 
 def admin_required():
     """
     Um decorator que só permite o acesso a utilizadores com
     nivel_acesso == 'admin'.
+    O papel vem do claim 'nivel_acesso' do token (assinado no login), sem ir
+    ao banco. Só tokens sem o claim fazem uma consulta, cujo resultado fica
+    em cache por CACHE_PAPEIS_TTL segundos.
     """
     def wrapper(fn):
         @wraps(fn)
@@ -14,15 +33,21 @@ def admin_required():
             verify_jwt_in_request()
             # Pega a identidade (ID) do utilizador a partir do token
             current_user_id = get_jwt_identity()
-            
-            # Busca o utilizador na base de dados
-            user = Usuario.query.get(current_user_id)
-            
+
+            nivel_acesso = cache_papeis.obter(str(current_user_id))
+            if nivel_acesso is AUSENTE:
+                nivel_acesso = get_jwt().get('nivel_acesso', AUSENTE)
+            if nivel_acesso is AUSENTE:
+                # Token antigo, sem o claim: busca o utilizador na base de dados
+                user = Usuario.query.get(current_user_id)
+                nivel_acesso = user.nivel_acesso if user else None
+                registrar_papel(current_user_id, nivel_acesso)
+
             # Se não for admin, retorna erro
-            if not user or user.nivel_acesso != 'admin':
+            if nivel_acesso != 'admin':
                 return {"error": "Acesso restrito a administradores."}, 403 # Forbidden
-            
+
             # Se for admin, permite que a rota continue
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
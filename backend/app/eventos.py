@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import secrets
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Tipos de evento publicados (nome do 'event:' no stream e filtro ?tipos=)
+TIPOS_EVENTO = ('viagem_status', 'registro', 'caixa')
+
+CABECALHOS_CORS = (
+    'Access-Control-Allow-Origin: *\r\n'
+    'Access-Control-Allow-Headers: Authorization, Last-Event-ID\r\n'
+)
+
+RECARREGAR = b'event: recarregar\ndata: {}\n\n'
+
+
+class _Cliente:
+    """
+    Um assinante do stream: tipos pedidos, conexão, o último id entregue e,
+    do token, o usuário e o instante (epoch) em que expira
+    """
+    __slots__ = ('tipos', 'escritor', 'ultimo_id', 'usuario_id', 'expira')
+
+    def __init__(self, tipos, escritor, ultimo_id, usuario_id, expira):
+        self.tipos = tipos
+        self.escritor = escritor
+        self.ultimo_id = ultimo_id
+        self.usuario_id = usuario_id
+        self.expira = expira
+
+
+class HubEventos:
+    """
+    Canal de push (Server-Sent Events) com os eventos operacionais:
+    mudança de status de viagem, novo registro operacional e abertura/fecho
+    de caixa.
+
+    As rotas publicam com publicar(tipo, dados) depois do commit. O evento é
+    serializado uma vez, guardado num histórico circular (EVENTOS_HISTORICO)
+    e posto na fila de saída da conexão de cada assinante (o buffer de
+    escrita do transporte asyncio, limitado a EVENTOS_FILA_KB). Publicar
+    nunca espera por um cliente: o assinante cuja fila passa do limite (não
+    está a ler) é desligado e, ao reconectar com Last-Event-ID, recebe do
+    histórico o que perdeu.
+
+    Os ids do stream são '<época>.<n>': a época é sorteada a cada início do
+    processo, e n recomeça em 1. Um Last-Event-ID de outra época (o processo
+    reiniciou e perdeu o histórico) não diz o que o cliente perdeu: ele
+    recebe o evento 'recarregar' em vez do replay.
+
+    O stream não passa pelos workers WSGI (cada resposta aberta prenderia
+    uma thread): é servido por um servidor asyncio próprio, numa única thread,
+    em EVENTOS_HOST:EVENTOS_PORTA, com GET /api/eventos?token=<JWT>[&tipos=...].
+    O token na URL acaba nos logs de proxies: deve ser um token de acesso de
+    curta duração (JWT_ACCESS_TOKEN_EXPIRES, 15 min por padrão), nunca um
+    sem expiração. O stream é fechado quando o token expira ou o usuário é
+    excluído (verificado a cada heartbeat), com o evento 'encerrado'; o
+    cliente reconecta com um token novo e o Last-Event-ID.
+    Ele só é iniciado no primeiro pedido HTTP, para não abrir a porta em
+    comandos da linha de comando nem no processo do reloader. Se a porta não
+    estiver livre, o servidor não sobe (fica registado no log e em /metrics,
+    eventos_servidor_ativo 0) e as publicações só vão para o histórico, sem
+    chegar a ninguém.
+    Os eventos são do processo: com vários workers, cada um tem o seu hub.
+    """
+
+    def __init__(self, app=None):
+        self._trava = threading.Lock()
+        self._clientes = set()
+        self._historico = deque()
+        self._proximo_id = 1
+        self._loop = None
+        self._thread = None
+        self.epoca = secrets.token_hex(4)
+        self.servidor_ativo = False
+        self.publicados = 0
+        self.desligados = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTOS_HABILITADOS', True)
+        app.config.setdefault('EVENTOS_HOST', '127.0.0.1')
+        app.config.setdefault('EVENTOS_PORTA', 5003)
+        app.config.setdefault('EVENTOS_FILA_KB', 512)
+        app.config.setdefault('EVENTOS_HISTORICO', 1000)
+        app.config.setdefault('EVENTOS_MAX_CLIENTES', 1000)
+        app.config.setdefault('EVENTOS_HEARTBEAT', 15)
+
+        # Importado aqui: app.serializacao importa os modelos, que importam as extensões
+        from app.serializacao import dumps
+        self._dumps = dumps
+        self._app = app
+        self.habilitado = app.config['EVENTOS_HABILITADOS']
+        self.host = app.config['EVENTOS_HOST']
+        self.porta = app.config['EVENTOS_PORTA']
+        self.limite_fila = app.config['EVENTOS_FILA_KB'] * 1024
+        self.max_clientes = app.config['EVENTOS_MAX_CLIENTES']
+        self.heartbeat = app.config['EVENTOS_HEARTBEAT']
+        with self._trava:
+            self._historico = deque(self._historico, maxlen=app.config['EVENTOS_HISTORICO'])
+        app.extensions['hub_eventos'] = self
+
+        if self.habilitado:
+            app.before_request(self.iniciar)
+
+    # --- Publicação (qualquer thread) ---
+
+    def publicar(self, tipo, dados):
+        """ Envia o evento a todos os assinantes do tipo. Não bloqueia. """
+        if not self.habilitado:
+            return
+        with self._trava:
+            id = self._proximo_id
+            self._proximo_id += 1
+            quadro = f'id: {self.epoca}.{id}\nevent: {tipo}\ndata: '.encode() + self._dumps(dados) + b'\n\n'
+            self._historico.append((id, tipo, quadro))
+            self.publicados += 1
+            # Agendado dentro da trava, para os eventos chegarem ao loop na ordem dos ids
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._distribuir, id, tipo, quadro)
+
+    def _distribuir(self, id, tipo, quadro):
+        # Corre no loop. write() não bloqueia: envia o que o socket aceitar e
+        # guarda o resto no buffer do transporte, que o loop esvazia aos poucos
+        for cliente in list(self._clientes):
+            if tipo not in cliente.tipos or id <= cliente.ultimo_id:
+                continue
+            transporte = cliente.escritor.transport
+            transporte.write(quadro)
+            cliente.ultimo_id = id
+            if transporte.get_write_buffer_size() > self.limite_fila:
+                # Consumidor lento: desligado; recupera pelo histórico ao reconectar
+                self._clientes.discard(cliente)
+                self.desligados += 1
+                transporte.abort()
+
+    # --- Servidor SSE (thread própria com um loop asyncio) ---
+
+    def iniciar(self):
+        """ Sobe o servidor de eventos, se ainda não estiver no ar """
+        if self._thread is not None:
+            return
+        with self._trava:
+            if self._thread is not None:
+                return
+            pronto = threading.Event()
+            self._thread = threading.Thread(target=self._executar, args=(pronto,), name='hub-eventos', daemon=True)
+            self._thread.start()
+        pronto.wait(5)
+
+    def _executar(self, pronto):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.start_server(self._atender, self.host, self.porta, backlog=1024))
+        except OSError as e:
+            logger.error('Servidor de eventos não iniciado em %s:%s (%s): os eventos não serão entregues.',
+                         self.host, self.porta, e)
+            pronto.set()
+            loop.close()
+            return
+        with self._trava:
+            self._loop = loop
+        self.servidor_ativo = True
+        pronto.set()
+        loop.run_forever()
+
+    async def _atender(self, leitor, escritor):
+        try:
+            pedido = await asyncio.wait_for(leitor.readuntil(b'\r\n\r\n'), 10)
+            metodo, alvo, _ = pedido.decode('latin-1').split('\r\n', 1)[0].split(' ', 2)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, ValueError):
+            escritor.close()
+            return
+        cabecalhos = {}
+        for linha in pedido.decode('latin-1').split('\r\n')[1:]:
+            nome, _, valor = linha.partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        url = urlsplit(alvo)
+        args = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+
+        if metodo == 'OPTIONS':
+            return await self._responder(escritor, '204 No Content')
+        if metodo != 'GET' or url.path != '/api/eventos':
+            return await self._responder(escritor, '404 Not Found', {'error': 'Não encontrado'})
+
+        # EventSource não envia cabeçalhos: o token vem em ?token= (ou no Authorization)
+        token = args.get('token') or cabecalhos.get('authorization', '').removeprefix('Bearer ').strip()
+        claims = self._validar_token(token)
+        if claims is None:
+            return await self._responder(escritor, '401 Unauthorized', {'error': 'Token inválido ou ausente'})
+        if len(self._clientes) >= self.max_clientes:
+            return await self._responder(escritor, '503 Service Unavailable', {'error': 'Limite de assinantes atingido'})
+
+        tipos = set(TIPOS_EVENTO)
+        if args.get('tipos'):
+            tipos &= set(args['tipos'].split(','))
+        ultimo = cabecalhos.get('last-event-id') or args.get('ultimo_id')
+
+        # Do histórico ao registo do cliente não há await: nenhum evento se perde
+        # entre os dois, e os já enviados no replay não são repetidos (ultimo_id)
+        with self._trava:
+            historico = list(self._historico)
+            atual = self._proximo_id - 1
+        partes = [b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                  b'Connection: keep-alive\r\nX-Accel-Buffering: no\r\n' + CABECALHOS_CORS.encode() + b'\r\n',
+                  b'retry: 3000\n\n']
+        if ultimo:
+            ultimo_id = self._id_local(ultimo)
+            if ultimo_id is None or ultimo_id > atual:
+                # Id de outro processo (reinício): o histórico não cobre o que ele perdeu
+                partes.append(RECARREGAR)
+            else:
+                if ultimo_id < atual and (not historico or historico[0][0] > ultimo_id + 1):
+                    # Parte do que o cliente perdeu já saiu do histórico: ele deve recarregar os dados
+                    partes.append(RECARREGAR)
+                partes += [quadro for id, tipo, quadro in historico if id > ultimo_id and tipo in tipos]
+        ultimo_id = atual
+        escritor.write(b''.join(partes))
+        cliente = _Cliente(tipos, escritor, ultimo_id, str(claims.get('sub')), claims.get('exp'))
+        self._clientes.add(cliente)
+
+        # Daqui em diante os eventos são escritos por _distribuir(); a corrotina
+        # só espera o cliente sair (EOF), manda o heartbeat e confere o acesso
+        try:
+            while True:
+                espera = self.heartbeat
+                if cliente.expira is not None:
+                    espera = min(espera, cliente.expira - time.time())
+                motivo = 'token_expirado' if espera <= 0 else self._acesso_revogado(cliente)
+                if motivo:
+                    self._clientes.discard(cliente)
+                    escritor.write(f'event: encerrado\ndata: {{"motivo": "{motivo}"}}\n\n'.encode())
+                    await escritor.drain()
+                    break
+                try:
+                    if not await asyncio.wait_for(leitor.read(1024), espera):
+                        break
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão viva em proxies
+                    escritor.write(b': ping\n\n')
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clientes.discard(cliente)
+            escritor.close()
+
+    def _id_local(self, valor):
+        """ n de um id '<época>.<n>' deste processo; None se for de outra época ou inválido """
+        epoca, _, numero = valor.rpartition('.')
+        if epoca != self.epoca or not numero.isdigit():
+            return None
+        return int(numero)
+
+    def _validar_token(self, token):
+        """ Claims do token de acesso; None se faltar, for inválido ou estiver expirado """
+        if not token:
+            return None
+        from flask_jwt_extended import decode_token
+        try:
+            with self._app.app_context():
+                claims = decode_token(token)
+        except Exception:
+            return None
+        return claims if claims.get('type') == 'access' else None
+
+    def _acesso_revogado(self, cliente):
+        # Usuário excluído: registrar_papel(id, None) no cache de papéis
+        from app.decorators import cache_papeis
+        if cache_papeis.obter(cliente.usuario_id) is None:
+            return 'acesso_revogado'
+        return None
+
+    async def _responder(self, escritor, status, corpo=None):
+        conteudo = self._dumps(corpo) if corpo is not None else b''
+        escritor.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(conteudo)}\r\n'
+                       f'{CABECALHOS_CORS}Connection: close\r\n\r\n'.encode() + conteudo)
+        try:
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        escritor.close()
+
+    def exportar_metricas(self):
+        """ Assinantes e contadores no formato de texto do Prometheus (acrescentados a /metrics) """
+        linhas = []
+        for nome, tipo, ajuda, valor in (
+            ('eventos_servidor_ativo', 'gauge', 'Servidor de eventos no ar (0: não iniciado ou porta ocupada)',
+             int(self.servidor_ativo)),
+            ('eventos_assinantes', 'gauge', 'Clientes ligados ao stream de eventos', len(self._clientes)),
+            ('eventos_publicados_total', 'counter', 'Eventos publicados', self.publicados),
+            ('eventos_desligados_total', 'counter', 'Assinantes desligados por fila cheia', self.desligados),
+        ):
+            linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}', f'{nome} {valor}']
+        return '\n'.join(linhas) + '\n'
@@ -4,10 +4,20 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
+from app.senhas import PoolSenhas
+from app.jobs import FilaRelatorios
+from app.sqlite import PragmasSQLite
+from app.metricas import Metricas
+from app.eventos import HubEventos
 
 # Instancia as extensões (sem app)
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 bcrypt = Bcrypt()
-cors = CORS() # Vamos usar o cors.init_app agora
\ No newline at end of file
+cors = CORS() # Vamos usar o cors.init_app agora
+pool_senhas = PoolSenhas() # Pool limitado para o bcrypt do login
+fila_relatorios = FilaRelatorios() # Jobs assíncronos de relatórios
+pragmas_sqlite = PragmasSQLite() # PRAGMAs por conexão (WAL etc.) no perfil de produção
+metricas = Metricas() # Latência/SQL por pedido, expostas em /metrics
+hub_eventos = HubEventos() # Stream SSE de viagens, registros e caixas
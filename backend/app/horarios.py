@@ -0,0 +1,192 @@
+from datetime import datetime, date, time, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import HorarioViagem, Viagem, Rota, Onibus, Motorista
+from app.consultas import ParametroInvalido
+from app.conflitos import RECURSOS, escala_ocupada, posicao_livre
+
+# --- Modelos de horário -> viagens em lote ---
+#
+# Cada modelo (HorarioViagem) vira uma viagem por dia do período em que vale
+# (dia da semana e vigência). As viagens novas são conferidas em memória:
+# as que já existem (mesma rota e partida) são puladas, e as que chocariam
+# com a escala do ônibus ou do motorista ficam de fora, listadas como
+# conflito. As demais entram com um INSERT em lote (executemany) a cada
+# GERADOR_VIAGENS_LOTE linhas, sem um objeto do ORM por viagem.
+
+CAMPOS_OBRIGATORIOS = ('rota_id', 'onibus_id', 'motorista_id', 'hora_partida', 'duracao_minutos')
+
+# Campo -> (modelo, mensagem se não existir) das referências do modelo de horário
+REFERENCIAS = {
+    'rota_id': (Rota, 'Rota não encontrada.'),
+    'onibus_id': (Onibus, 'Ônibus não encontrado.'),
+    'motorista_id': (Motorista, 'Motorista não encontrado.'),
+}
+
+
+def parse_data(valor, campo):
+    """ 'YYYY-MM-DD' -> date, ou ParametroInvalido """
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f"'{campo}' deve estar no formato YYYY-MM-DD.")
+
+
+def aplicar_dados(horario, data):
+    """
+    Valida o JSON de criação/edição e preenche o modelo de horário. Na
+    criação (sem id) os CAMPOS_OBRIGATORIOS são exigidos; na edição só muda
+    o que vier. Levanta ParametroInvalido (400 na rota).
+    """
+    if horario.id is None:
+        faltando = [campo for campo in CAMPOS_OBRIGATORIOS if data.get(campo) is None]
+        if faltando:
+            raise ParametroInvalido(f"Campos obrigatórios: {', '.join(faltando)}.")
+
+    for campo, (modelo, erro) in REFERENCIAS.items():
+        if campo not in data:
+            continue
+        try:
+            id = int(data[campo])
+        except (TypeError, ValueError):
+            raise ParametroInvalido(f"'{campo}' deve ser um inteiro.")
+        if db.session.get(modelo, id) is None:
+            raise ParametroInvalido(erro)
+        setattr(horario, campo, id)
+
+    if 'hora_partida' in data:
+        try:
+            horario.hora_partida = time.fromisoformat(data['hora_partida'])
+        except (TypeError, ValueError):
+            raise ParametroInvalido("'hora_partida' deve estar no formato HH:MM.")
+    if 'duracao_minutos' in data:
+        try:
+            duracao = int(data['duracao_minutos'])
+        except (TypeError, ValueError):
+            duracao = 0
+        if duracao <= 0:
+            raise ParametroInvalido("'duracao_minutos' deve ser um inteiro maior que zero.")
+        horario.duracao_minutos = duracao
+    if 'dias_semana' in data:
+        # Lista de números ([1, 2, 3]) ou texto com os dígitos ("123")
+        try:
+            dias = sorted({int(dia) for dia in data['dias_semana']})
+        except (TypeError, ValueError):
+            dias = []
+        if not dias or dias[0] < 0 or dias[-1] > 6:
+            raise ParametroInvalido("'dias_semana' deve listar dias de 0 (domingo) a 6 (sábado).")
+        horario.dias_semana = ''.join(map(str, dias))
+    for campo in ('vigente_de', 'vigente_ate'):
+        if campo in data:
+            setattr(horario, campo, parse_data(data[campo], campo) if data[campo] else None)
+    if 'ativo' in data:
+        horario.ativo = bool(data['ativo'])
+
+    if horario.vigente_de and horario.vigente_ate and horario.vigente_ate < horario.vigente_de:
+        raise ParametroInvalido("'vigente_ate' não pode ser antes de 'vigente_de'.")
+
+
+def expandir(horarios, data_inicio, data_fim):
+    """
+    Viagens dos modelos de horário entre data_inicio e data_fim (date,
+    inclusive), em ordem de partida: [(horario_id, linha), ...], com 'linha'
+    já no formato do INSERT em Viagem.
+    """
+    viagens = []
+    for horario in horarios:
+        dias_semana = {int(dia) for dia in horario.dias_semana}
+        duracao = timedelta(minutes=horario.duracao_minutos)
+        dia = max(data_inicio, horario.vigente_de or data_inicio)
+        fim = min(data_fim, horario.vigente_ate or data_fim)
+        while dia <= fim:
+            # isoweekday(): 1 = segunda ... 7 = domingo; aqui 0 = domingo
+            if dia.isoweekday() % 7 in dias_semana:
+                partida = datetime.combine(dia, horario.hora_partida)
+                viagens.append((horario.id, {
+                    'rota_id': horario.rota_id,
+                    'onibus_id': horario.onibus_id,
+                    'motorista_id': horario.motorista_id,
+                    'data_partida_prevista': partida,
+                    'data_chegada_prevista': partida + duracao,
+                    'status': 'Agendada',
+                }))
+            dia += timedelta(days=1)
+    viagens.sort(key=lambda item: (item[1]['data_partida_prevista'], item[0]))
+    return viagens
+
+
+def gerar_viagens(horarios, data_inicio, data_fim, simular=False):
+    """
+    Expande os modelos no período e separa as viagens em: novas, já
+    existentes (mesma rota e partida, com qualquer status: uma viagem
+    cancelada não é recriada) e em conflito de escala. Sem 'simular', grava
+    as novas em lotes; quem chama faz o commit.
+    Retorna {'viagens': [(horario_id, linha)], 'existentes': n, 'conflitos': [...]}.
+    """
+    resultado = {'viagens': [], 'existentes': 0, 'conflitos': []}
+    candidatas = expandir(horarios, data_inicio, data_fim)
+    if not candidatas:
+        return resultado
+
+    inicio = candidatas[0][1]['data_partida_prevista']
+    fim = max(linha['data_chegada_prevista'] for _, linha in candidatas)
+
+    # Uma consulta por índice (rota_id, partida) para as viagens já criadas no período
+    rotas = {linha['rota_id'] for _, linha in candidatas}
+    existentes = set(db.session.query(Viagem.rota_id, Viagem.data_partida_prevista).filter(
+        Viagem.rota_id.in_(rotas),
+        Viagem.data_partida_prevista >= inicio,
+        Viagem.data_partida_prevista < fim,
+    ).tuples())
+    # Escala atual de cada ônibus/motorista envolvido, em listas ordenadas por partida
+    escalas = {
+        recurso: escala_ocupada(recurso, {linha[coluna.key] for _, linha in candidatas}, inicio, fim)
+        for recurso, coluna in RECURSOS.items()
+    }
+
+    for horario_id, linha in candidatas:
+        chave = (linha['rota_id'], linha['data_partida_prevista'])
+        if chave in existentes:
+            resultado['existentes'] += 1
+            continue
+
+        posicoes, ocupados = {}, []
+        for recurso, coluna in RECURSOS.items():
+            partidas, chegadas = escalas[recurso][linha[coluna.key]]
+            posicao = posicao_livre(partidas, chegadas, linha['data_partida_prevista'], linha['data_chegada_prevista'])
+            if posicao is None:
+                ocupados.append(recurso)
+            else:
+                posicoes[recurso] = posicao
+        if ocupados:
+            resultado['conflitos'].append({
+                'horario_id': horario_id,
+                'recursos': ocupados,
+                'data_partida_prevista': linha['data_partida_prevista'],
+                'data_chegada_prevista': linha['data_chegada_prevista'],
+            })
+            continue
+
+        # A viagem aceita passa a ocupar a escala das seguintes
+        for recurso, posicao in posicoes.items():
+            partidas, chegadas = escalas[recurso][linha[RECURSOS[recurso].key]]
+            partidas.insert(posicao, linha['data_partida_prevista'])
+            chegadas.insert(posicao, linha['data_chegada_prevista'])
+        existentes.add(chave)
+        resultado['viagens'].append((horario_id, linha))
+
+    if not simular:
+        linhas = [linha for _, linha in resultado['viagens']]
+        lote = current_app.config['GERADOR_VIAGENS_LOTE']
+        for i in range(0, len(linhas), lote):
+            db.session.execute(insert(Viagem), linhas[i:i + lote])
+    return resultado
+
+
+def horarios_para_gerar(ids=None):
+    """ Modelos ativos (todos ou só os de 'ids'), para gerar_viagens() """
+    query = HorarioViagem.query.filter(HorarioViagem.ativo.is_(True))
+    if ids is not None:
+        query = query.filter(HorarioViagem.id.in_(ids))
+    return query.order_by(HorarioViagem.id).all()
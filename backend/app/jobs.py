@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Configuração copiada do app web para o app de cada processo do pool
+CONFIG_WORKER = ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_ENGINE_OPTIONS', 'SQLITE_PRAGMAS')
+
+# App do processo do pool, criado no primeiro job e reaproveitado nos seguintes
+_app_worker = None
+
+
+def _app_do_worker(config):
+    global _app_worker
+    if _app_worker is None:
+        from app import create_app
+        from config import Config
+        _app_worker = create_app(type('ConfigWorker', (Config,), {
+            **config, 'EVENTOS_HABILITADOS': False, 'METRICAS_HABILITADAS': False
+        }))
+    return _app_worker
+
+
+def _executar_job(fn, args, caminho, config):
+    """
+    Corre num processo do pool: lê os dados e gera o arquivo (dentro de um app
+    context, com o mesmo banco do app web) e grava-o no disco.
+    Grava num temporário e renomeia, para nunca servir um arquivo pela metade.
+    """
+    with _app_do_worker(config).app_context():
+        conteudo = fn(*args)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+    return len(conteudo)
+
+
+class Job:
+    """ Um pedido de relatório e o estado da sua geração """
+
+    def __init__(self, tipo, chave, nome_arquivo, mimetype, pasta):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.chave = chave
+        self.nome_arquivo = nome_arquivo
+        self.mimetype = mimetype
+        # O resultado fica em <pasta>/<id>.<extensão do arquivo>
+        self.caminho = os.path.join(pasta, self.id + os.path.splitext(nome_arquivo)[1])
+        self.criado_em = datetime.utcnow()
+        self.concluido_em = None
+        self.concluido_monotonic = None
+        self.erro = None
+        self.futuro = None
+
+    @property
+    def status(self):
+        if self.concluido_em is not None:
+            return 'erro' if self.erro else 'concluido'
+        if self.futuro is not None and (self.futuro.running() or self.futuro.done()):
+            return 'executando'
+        return 'pendente'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'status': self.status,
+            'nome_arquivo': self.nome_arquivo,
+            'criado_em': self.criado_em.isoformat(),
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None,
+            'erro': self.erro
+        }
+
+
+class FilaRelatorios:
+    """
+    Fila de jobs de relatórios.
+
+    A consulta e a renderização correm num pool de processos
+    (RELATORIOS_JOBS_WORKERS), fora dos workers do servidor web; cada processo
+    do pool tem o seu app, ligado ao mesmo banco. O resultado fica numa pasta local
+    (RELATORIOS_JOBS_DIR) e é apagado RELATORIOS_JOBS_TTL segundos depois de
+    pronto. Pedidos iguais (mesma chave) feitos enquanto um job ainda está a
+    correr recebem o job existente em vez de um novo.
+
+    O registo dos jobs fica na memória do processo web.
+    """
+
+    def __init__(self, app=None):
+        self._jobs = {}
+        self._em_curso_por_chave = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RELATORIOS_JOBS_DIR', os.path.join(app.instance_path, 'relatorios'))
+        app.config.setdefault('RELATORIOS_JOBS_WORKERS', 2)
+        app.config.setdefault('RELATORIOS_JOBS_TTL', 3600)
+
+        self.pasta = app.config['RELATORIOS_JOBS_DIR']
+        self.workers = app.config['RELATORIOS_JOBS_WORKERS']
+        self.ttl = app.config['RELATORIOS_JOBS_TTL']
+        self.config_worker = {chave: app.config[chave] for chave in CONFIG_WORKER if chave in app.config}
+        app.extensions['fila_relatorios'] = self
+
+    def _pool(self):
+        # Criado só no primeiro job, para não abrir processos em cada create_app()
+        if self._executor is None:
+            os.makedirs(self.pasta, exist_ok=True)
+            self._limpar_pasta()
+            # 'spawn': os processos não herdam threads nem conexões do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def em_curso(self, chave):
+        """ Job ainda em curso com a chave (ou None), para evitar preparar um pedido repetido """
+        with self._lock:
+            return self._em_curso_por_chave.get(chave)
+
+    def submeter(self, tipo, chave, nome_arquivo, mimetype, fn, *args):
+        """
+        Agenda fn(*args) -> bytes no pool e retorna o Job. fn corre no
+        processo do pool, com um app context próprio: pode consultar o banco.
+        Se já houver um job em curso com a mesma chave, retorna esse.
+        """
+        with self._lock:
+            self._expirar()
+            existente = self._em_curso_por_chave.get(chave)
+            if existente is not None:
+                return existente
+
+            job = Job(tipo, chave, nome_arquivo, mimetype, self.pasta)
+            job.futuro = self._pool().submit(_executar_job, fn, args, job.caminho, self.config_worker)
+            self._jobs[job.id] = job
+            self._em_curso_por_chave[chave] = job
+
+        job.futuro.add_done_callback(lambda futuro: self._concluir(job, futuro))
+        return job
+
+    def _concluir(self, job, futuro):
+        with self._lock:
+            excecao = futuro.exception()
+            if excecao is not None:
+                job.erro = str(excecao) or excecao.__class__.__name__
+            job.concluido_em = datetime.utcnow()
+            job.concluido_monotonic = time.monotonic()
+            if self._em_curso_por_chave.get(job.chave) is job:
+                del self._em_curso_por_chave[job.chave]
+
+    def obter(self, job_id):
+        """ Retorna o Job (ou None se não existir ou já tiver expirado) """
+        with self._lock:
+            self._expirar()
+            return self._jobs.get(job_id)
+
+    def _expirar(self):
+        """ Descarta os jobs concluídos há mais de TTL segundos (e os seus arquivos) """
+        limite = time.monotonic() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.concluido_monotonic is not None and job.concluido_monotonic < limite:
+                del self._jobs[job_id]
+                self._remover_arquivo(job.caminho)
+
+    def _limpar_pasta(self):
+        """ Apaga resultados antigos deixados por execuções anteriores do servidor """
+        limite = time.time() - self.ttl
+        for nome in os.listdir(self.pasta):
+            caminho = os.path.join(self.pasta, nome)
+            if os.path.isfile(caminho) and os.path.getmtime(caminho) < limite:
+                self._remover_arquivo(caminho)
+
+    @staticmethod
+    def _remover_arquivo(caminho):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,199 @@
+import logging
+import threading
+from bisect import bisect_left
+import time
+from flask import g, has_app_context, request
+from flask.signals import got_request_exception
+from sqlalchemy import event
+
+logger_sql_lento = logging.getLogger('app.sql_lento')
+
+# Limites (em segundos / em número de statements) dos buckets dos histogramas
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+class Histograma:
+    """ Histograma cumulativo no formato do Prometheus (buckets 'le', soma e contagem) """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Contagem só do próprio bucket (a última posição é o +Inf); acumulada na exportação
+        self.contagens = [0] * (len(buckets) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip(self.buckets, self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{_rotulos(rotulos, le=_numero(limite))} {acumulado}'
+        yield f'{nome}_bucket{_rotulos(rotulos, le="+Inf")} {self.total}'
+        yield f'{nome}_sum{_rotulos(rotulos)} {_numero(self.soma)}'
+        yield f'{nome}_count{_rotulos(rotulos)} {self.total}'
+
+
+class _EstadoPedido:
+    """ Acumuladores de um pedido (guardados em g enquanto ele corre) """
+    __slots__ = ('inicio', 'queries', 'tempo_sql')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.queries = 0
+        self.tempo_sql = 0.0
+
+
+class Metricas:
+    """
+    Métricas por pedido, expostas em texto do Prometheus (GET /metrics):
+      - latência por blueprint/endpoint/método (histograma);
+      - pedidos por status e exceções não tratadas (contadores);
+      - statements SQL e tempo de SQL por pedido (histogramas), medidos pelos
+        eventos before/after_cursor_execute do engine;
+      - statements acima de METRICAS_SQL_LENTA_MS, registados no logger
+        'app.sql_lento' e contados.
+
+    O pedido só é contabilizado quando a resposta é fechada, para incluir o
+    SQL e o tempo de respostas em streaming (ex.: listagem de vendas).
+    Os valores são do processo: com vários workers, cada um tem os seus.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._trava = threading.Lock()
+        self._latencia = {}
+        self._queries = {}
+        self._tempo_sql = {}
+        self._pedidos = {}
+        self._excecoes = {}
+        self._sql_lentas = 0
+        self.sql_lenta = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('METRICAS_HABILITADAS', True)
+        app.config.setdefault('METRICAS_SQL_LENTA_MS', 200)
+        app.extensions['metricas'] = self
+        if not app.config['METRICAS_HABILITADAS']:
+            return
+        self.sql_lenta = app.config['METRICAS_SQL_LENTA_MS'] / 1000
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._antes_sql)
+        event.listen(engine, 'after_cursor_execute', self._depois_sql)
+
+        app.before_request(self._inicio_pedido)
+        app.after_request(self._fim_pedido)
+        got_request_exception.connect(self._excecao, app, weak=False)
+
+    # --- Pedidos ---
+
+    def _inicio_pedido(self):
+        g._metricas = _EstadoPedido()
+
+    def _fim_pedido(self, resposta):
+        # Fica em g até o fim do contexto: o SQL de respostas em streaming ainda conta
+        estado = g.get('_metricas')
+        if estado is not None:
+            rotulos = (
+                request.blueprint or '',
+                request.endpoint or '<sem rota>',
+                request.method,
+            )
+            status = resposta.status_code
+            resposta.call_on_close(lambda: self._registrar(estado, rotulos, status))
+        return resposta
+
+    def _registrar(self, estado, rotulos, status):
+        duracao = time.perf_counter() - estado.inicio
+        with self._trava:
+            self._observar(self._latencia, rotulos, BUCKETS_LATENCIA, duracao)
+            self._observar(self._queries, rotulos, BUCKETS_QUERIES, estado.queries)
+            self._observar(self._tempo_sql, rotulos, BUCKETS_LATENCIA, estado.tempo_sql)
+            chave = rotulos + (str(status),)
+            self._pedidos[chave] = self._pedidos.get(chave, 0) + 1
+
+    def _excecao(self, app, exception, **extra):
+        chave = (request.blueprint or '', request.endpoint or '<sem rota>', type(exception).__name__)
+        with self._trava:
+            self._excecoes[chave] = self._excecoes.get(chave, 0) + 1
+
+    @staticmethod
+    def _observar(histogramas, rotulos, buckets, valor):
+        histograma = histogramas.get(rotulos)
+        if histograma is None:
+            histograma = histogramas[rotulos] = Histograma(buckets)
+        histograma.observar(valor)
+
+    # --- SQL ---
+
+    def _antes_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metricas_inicio = time.perf_counter()
+
+    def _depois_sql(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, '_metricas_inicio', None)
+        if inicio is None:
+            return
+        duracao = time.perf_counter() - inicio
+        estado = g.get('_metricas') if has_app_context() else None
+        if estado is not None:
+            estado.queries += 1
+            estado.tempo_sql += duracao
+        if duracao >= self.sql_lenta:
+            with self._trava:
+                self._sql_lentas += 1
+            logger_sql_lento.warning('SQL lento (%.0f ms): %s | parâmetros: %.200r',
+                                     duracao * 1000, ' '.join(statement.split()), parameters)
+
+    # --- Exportação ---
+
+    def exportar(self):
+        """ Todas as métricas no formato de texto do Prometheus (0.0.4) """
+        nomes_rotulos = ('blueprint', 'endpoint', 'method')
+        linhas = []
+        with self._trava:
+            for nome, ajuda, histogramas in (
+                ('http_request_duration_seconds', 'Latência dos pedidos', self._latencia),
+                ('http_request_sql_statements', 'Statements SQL por pedido', self._queries),
+                ('http_request_sql_duration_seconds', 'Tempo de SQL por pedido', self._tempo_sql),
+            ):
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} histogram']
+                for rotulos, histograma in sorted(histogramas.items()):
+                    linhas += histograma.linhas(nome, dict(zip(nomes_rotulos, rotulos)))
+
+            linhas += ['# HELP http_requests_total Pedidos por status', '# TYPE http_requests_total counter']
+            for rotulos, total in sorted(self._pedidos.items()):
+                linhas.append(f'http_requests_total{_rotulos(dict(zip(nomes_rotulos + ("status",), rotulos)))} {total}')
+
+            linhas += ['# HELP http_request_exceptions_total Exceções não tratadas',
+                       '# TYPE http_request_exceptions_total counter']
+            for rotulos, total in sorted(self._excecoes.items()):
+                linhas.append(f'http_request_exceptions_total'
+                              f'{_rotulos(dict(zip(("blueprint", "endpoint", "exception"), rotulos)))} {total}')
+
+            linhas += ['# HELP sql_slow_statements_total Statements acima de METRICAS_SQL_LENTA_MS',
+                       '# TYPE sql_slow_statements_total counter',
+                       f'sql_slow_statements_total {self._sql_lentas}']
+        return '\n'.join(linhas) + '\n'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _rotulos(rotulos, **extras):
+    rotulos = {**rotulos, **extras}
+    if not rotulos:
+        return ''
+    partes = []
+    for nome, valor in rotulos.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nome}="{valor}"')
+    return '{' + ','.join(partes) + '}'
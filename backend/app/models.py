@@ -1,5 +1,6 @@
 # Importa do novo arquivo extensions.py
 from app.extensions import db, bcrypt 
+from app.referencias import cache_referencias
 from datetime import datetime
 
 # --- Modelos de Dados (Baseados no gestao_transportes_design.md) ---
@@ -116,21 +117,70 @@ class Viagem(db.Model):
     
     status = db.Column(db.String(30), default='Agendada') # "Agendada", "Em Trânsito", "Concluída", "Cancelada"
 
+    __table_args__ = (
+        # Listagem/relatórios por período, ordenados por (partida, id)
+        db.Index('ix_viagem_partida_id', 'data_partida_prevista', 'id'),
+        # Filtros da listagem combinados com o período
+        db.Index('ix_viagem_status_partida', 'status', 'data_partida_prevista'),
+        db.Index('ix_viagem_rota_partida', 'rota_id', 'data_partida_prevista'),
+        db.Index('ix_viagem_onibus_partida', 'onibus_id', 'data_partida_prevista'),
+        db.Index('ix_viagem_motorista_partida', 'motorista_id', 'data_partida_prevista'),
+    )
+
     # Relacionamentos
     registros = db.relationship('RegistroOperacional', backref='viagem', lazy=True)
     vendas = db.relationship('Venda', backref='viagem', lazy=True)
     
     def to_dict(self):
+        # Rota, ônibus e motorista vêm do cache de referências (app/referencias.py),
+        # pelos ids: serializar a viagem não carrega os relacionamentos
         return {
             'id': self.id,
-            'rota': self.rota.to_dict() if self.rota else None,
-            'onibus': self.onibus.to_dict() if self.onibus else None,
-            'motorista': self.motorista.to_dict() if self.motorista else None,
+            'rota': cache_referencias.obter(Rota, self.rota_id),
+            'onibus': cache_referencias.obter(Onibus, self.onibus_id),
+            'motorista': cache_referencias.obter(Motorista, self.motorista_id),
             'data_partida_prevista': self.data_partida_prevista.isoformat(),
             'data_chegada_prevista': self.data_chegada_prevista.isoformat(),
             'status': self.status
         }
 
+class HorarioViagem(db.Model):
+    """
+    Modelo de horário (grade que se repete): a mesma rota, ônibus, motorista
+    e hora de partida nos dias da semana indicados, dentro da vigência.
+    Expandido em viagens por app/horarios.py.
+    """
+    __tablename__ = 'horario_viagem'
+    id = db.Column(db.Integer, primary_key=True)
+
+    rota_id = db.Column(db.Integer, db.ForeignKey('rota.id'), nullable=False)
+    onibus_id = db.Column(db.Integer, db.ForeignKey('onibus.id'), nullable=False)
+    motorista_id = db.Column(db.Integer, db.ForeignKey('motorista.id'), nullable=False)
+
+    hora_partida = db.Column(db.Time, nullable=False)
+    duracao_minutos = db.Column(db.Integer, nullable=False)
+    # Dígitos dos dias da semana em que há viagem, 0 = domingo ... 6 = sábado (ex.: "12345")
+    dias_semana = db.Column(db.String(7), nullable=False, default='0123456')
+
+    # Vigência (opcional nas duas pontas)
+    vigente_de = db.Column(db.Date, nullable=True)
+    vigente_ate = db.Column(db.Date, nullable=True)
+    ativo = db.Column(db.Boolean, nullable=False, default=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rota': cache_referencias.obter(Rota, self.rota_id),
+            'onibus': cache_referencias.obter(Onibus, self.onibus_id),
+            'motorista': cache_referencias.obter(Motorista, self.motorista_id),
+            'hora_partida': self.hora_partida.strftime('%H:%M'),
+            'duracao_minutos': self.duracao_minutos,
+            'dias_semana': [int(dia) for dia in self.dias_semana],
+            'vigente_de': self.vigente_de.isoformat() if self.vigente_de else None,
+            'vigente_ate': self.vigente_ate.isoformat() if self.vigente_ate else None,
+            'ativo': self.ativo
+        }
+
 class RegistroOperacional(db.Model):
     # ... (sem alterações) ...
     """ Anotações do Bilheteiro sobre a passagem do ônibus """
@@ -150,6 +200,10 @@ class RegistroOperacional(db.Model):
     
     observacoes = db.Column(db.Text, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_registro_operacional_viagem', 'viagem_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -183,6 +237,15 @@ class Venda(db.Model):
     valor_passagem = db.Column(db.Float, nullable=False)
     metodo_pagamento = db.Column(db.String(30), nullable=False) # "Dinheiro", "Pix", "Cartão"
 
+    __table_args__ = (
+        # Impede vender a mesma poltrona duas vezes na mesma viagem
+        # (serve também aos filtros por viagem_id)
+        db.Index('ix_venda_viagem_poltrona', 'viagem_id', 'numero_poltrona', unique=True),
+        # Listagem em ordem de (data_hora_venda, id) e filtros por período
+        db.Index('ix_venda_data_hora_id', 'data_hora_venda', 'id'),
+        db.Index('ix_venda_bilheteiro_data_hora', 'bilheteiro_id', 'data_hora_venda'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -196,6 +259,32 @@ class Venda(db.Model):
             'metodo_pagamento': self.metodo_pagamento
         }
 
+class ReceitaDiaria(db.Model):
+    """
+    Vendas agregadas por dia (de data_hora_venda), rota, bilheteiro e método
+    de pagamento: quantidade de bilhetes e valor total. Mantida por
+    app/receita.py na mesma transação das vendas; reconstruída a partir do
+    histórico com 'flask receita reconstruir'.
+    """
+    __tablename__ = 'receita_diaria'
+    data = db.Column(db.Date, primary_key=True)
+    rota_id = db.Column(db.Integer, db.ForeignKey('rota.id'), primary_key=True)
+    bilheteiro_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), primary_key=True)
+    metodo_pagamento = db.Column(db.String(30), primary_key=True)
+
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+
+    def to_dict(self):
+        return {
+            'data': self.data.isoformat(),
+            'rota_id': self.rota_id,
+            'bilheteiro_id': self.bilheteiro_id,
+            'metodo_pagamento': self.metodo_pagamento,
+            'quantidade': self.quantidade,
+            'total': self.total
+        }
+
 class CaixaDiario(db.Model):
     # ... (sem alterações) ...
     """ Controle de Caixa do Bilheteiro """
@@ -215,6 +304,13 @@ class CaixaDiario(db.Model):
     total_geral_vendas = db.Column(db.Float, default=0.0)
     
     status = db.Column(db.String(20), default='Aberto') # "Aberto", "Fechado"
+
+    __table_args__ = (
+        # Caixa aberto do bilheteiro: consultado em toda venda
+        db.Index('ix_caixa_diario_bilheteiro_status', 'bilheteiro_id', 'status'),
+        # Histórico e relatório consolidado por período de abertura
+        db.Index('ix_caixa_diario_data_abertura', 'data_abertura'),
+    )
     
     def to_dict(self):
         return {
@@ -229,4 +325,28 @@ class CaixaDiario(db.Model):
             'total_vendas_cartao': self.total_vendas_cartao,
             'total_geral_vendas': self.total_geral_vendas,
             'status': self.status
-        }
\ No newline at end of file
+        }
+
+class Alteracao(db.Model):
+    """
+    Registro de alterações para a sincronização incremental dos clientes:
+    uma linha por registro alterado de cada tabela, com a última operação
+    ('upsert' ou 'delete'). Mantido por gatilhos no banco (app/sincronizacao.py),
+    que cobrem também os INSERT/UPDATE/DELETE em lote. O id é o cursor: cada
+    alteração apaga a linha anterior do mesmo registro e entra com um id maior.
+    """
+    __tablename__ = 'alteracao'
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(40), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False) # "upsert", "delete"
+
+    __table_args__ = (
+        # Alterações de uma tabela depois de um cursor
+        db.Index('ix_alteracao_tabela_id', 'tabela', 'id'),
+        # Uma linha por registro (a do gatilho anterior é apagada)
+        db.Index('ix_alteracao_tabela_registro', 'tabela', 'registro_id', unique=True),
+        # No SQLite, AUTOINCREMENT impede reaproveitar o id da última linha
+        # apagada: um cursor já entregue nunca volta a ser usado
+        {'sqlite_autoincrement': True},
+    )
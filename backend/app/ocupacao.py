@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from app.extensions import db
+from app.models import Venda, Viagem, Onibus
+
+# Capacidade assumida quando o ônibus não tem 'capacidade' preenchida (mesmo default do modelo)
+CAPACIDADE_PADRAO = 46
+
+
+class MapaOcupacao:
+    """
+    Índice em memória das poltronas vendidas por viagem.
+
+    Cada viagem tem um bitmap (um int do Python): o bit N ligado significa que
+    a poltrona N já foi vendida, então verificar uma poltrona é O(1). O bitmap é
+    carregado do banco na primeira consulta da viagem e mantido a par a cada
+    venda. Só as viagens usadas mais recentemente ficam em memória (LRU).
+
+    O índice é apenas um atalho: a garantia final contra venda dupla é o índice
+    único (viagem_id, numero_poltrona) na tabela 'venda'.
+    """
+
+    def __init__(self, max_viagens=2048):
+        self.max_viagens = max_viagens
+        self._bitmaps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _carregar(self, viagem_id):
+        """ Monta o bitmap da viagem a partir das vendas gravadas """
+        bitmap = 0
+        poltronas = db.session.query(Venda.numero_poltrona).filter(Venda.viagem_id == viagem_id)
+        for (poltrona,) in poltronas:
+            bitmap |= 1 << poltrona
+        return bitmap
+
+    def bitmap(self, viagem_id):
+        """ Retorna o bitmap de poltronas ocupadas da viagem """
+        with self._lock:
+            if viagem_id in self._bitmaps:
+                self._bitmaps.move_to_end(viagem_id)
+                return self._bitmaps[viagem_id]
+
+        bitmap = self._carregar(viagem_id)
+
+        with self._lock:
+            # Outra thread pode ter carregado/marcado entretanto: junta os dois
+            bitmap |= self._bitmaps.get(viagem_id, 0)
+            self._bitmaps[viagem_id] = bitmap
+            self._bitmaps.move_to_end(viagem_id)
+            while len(self._bitmaps) > self.max_viagens:
+                self._bitmaps.popitem(last=False)
+        return bitmap
+
+    def ocupada(self, viagem_id, poltrona):
+        """ True se a poltrona da viagem já foi vendida """
+        return bool(self.bitmap(viagem_id) >> poltrona & 1)
+
+    def marcar(self, viagem_id, poltronas):
+        """ Marca poltronas como vendidas (chamar depois do commit da venda) """
+        with self._lock:
+            if viagem_id not in self._bitmaps:
+                # Ainda não carregada: será lida do banco (já com a venda) quando for usada
+                return
+            bitmap = self._bitmaps[viagem_id]
+            for poltrona in poltronas:
+                bitmap |= 1 << poltrona
+            self._bitmaps[viagem_id] = bitmap
+
+    def invalidar(self, viagem_id=None):
+        """ Descarta o bitmap de uma viagem (ou de todas), forçando nova leitura do banco """
+        with self._lock:
+            if viagem_id is None:
+                self._bitmaps.clear()
+            else:
+                self._bitmaps.pop(viagem_id, None)
+
+
+def capacidade_viagem(viagem_id):
+    """ Capacidade do ônibus da viagem, ou None se a viagem não existir """
+    resultado = db.session.query(Viagem.id, Onibus.capacidade) \
+        .join(Onibus, Viagem.onibus_id == Onibus.id) \
+        .filter(Viagem.id == viagem_id).first()
+    if resultado is None:
+        return None
+    return resultado.capacidade if resultado.capacidade is not None else CAPACIDADE_PADRAO
+
+
+def poltronas_ocupadas(bitmap):
+    """ Lista os números das poltronas com o bit ligado """
+    ocupadas = []
+    poltrona = 0
+    while bitmap:
+        if bitmap & 1:
+            ocupadas.append(poltrona)
+        bitmap >>= 1
+        poltrona += 1
+    return ocupadas
+
+
+mapa_ocupacao = MapaOcupacao()
@@ -0,0 +1,264 @@
+import csv
+import io
+from datetime import datetime
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import Motorista, Onibus, Rota, Viagem
+from app.conflitos import RECURSOS, NOMES_RECURSO, STATUS_SEM_ESCALA, escala_ocupada, posicao_livre
+
+# --- Importação e exportação em CSV (cadastros e viagens) ---
+#
+# A importação lê o arquivo enviado linha a linha (csv.DictReader sobre o
+# stream) e grava em lotes de IMPORTACAO_CSV_LOTE linhas, um INSERT em lote
+# (executemany) por lote: a memória usada não depende do tamanho do arquivo.
+# Cada linha com problema (campo faltando, valor inválido, duplicado) é
+# descartada e informada, sem interromper as outras. A exportação gera o CSV
+# em blocos, a partir de um cursor do banco.
+
+
+class LinhaInvalida(ValueError):
+    """ Erro de uma linha do CSV (vai para a lista de erros da importação) """
+    pass
+
+
+class TabelaCsv:
+    """
+    Formato CSV de uma tabela: as colunas (cabeçalho da exportação e campos
+    lidos na importação), as obrigatórias, as de valor único (conferidas no
+    banco e no próprio arquivo), os valores padrão e as colunas inteiras.
+    """
+
+    def __init__(self, modelo, colunas, obrigatorias=(), unicas=(), padroes=None, inteiras=()):
+        self.modelo = modelo
+        self.colunas = colunas
+        self.obrigatorias = obrigatorias
+        self.unicas = unicas
+        self.padroes = padroes or {}
+        self.inteiras = inteiras
+
+    def preparar(self):
+        """ Dados lidos uma vez por importação e passados a converter() """
+        return None
+
+    def converter(self, registro, contexto=None):
+        """ Linha do DictReader -> dict para o INSERT. Levanta LinhaInvalida. """
+        linha = {}
+        for coluna in self.colunas:
+            if coluna == 'id':
+                continue
+            valor = (registro.get(coluna) or '').strip()
+            if not valor:
+                if coluna in self.obrigatorias:
+                    raise LinhaInvalida(f"'{coluna}' é obrigatório.")
+                valor = self.padroes.get(coluna)
+            elif coluna in self.inteiras:
+                try:
+                    valor = int(valor)
+                except ValueError:
+                    raise LinhaInvalida(f"'{coluna}' deve ser um inteiro.")
+            linha[coluna] = valor
+        return linha
+
+    def filtrar_lote(self, itens):
+        """
+        Separa do lote [(numero_linha, linha)] as linhas que repetem um valor
+        único, já gravado (inclusive por lotes anteriores do mesmo arquivo)
+        ou repetido dentro do lote. Uma consulta (IN) por coluna única.
+        Retorna (aceitas, erros).
+        """
+        vistos = {}
+        for coluna in self.unicas:
+            valores = {linha[coluna] for _, linha in itens if linha[coluna] is not None}
+            atributo = getattr(self.modelo, coluna)
+            vistos[coluna] = {valor for (valor,) in db.session.query(atributo).filter(atributo.in_(valores))} \
+                if valores else set()
+
+        aceitas, erros = [], []
+        for numero, linha in itens:
+            repetida = next((coluna for coluna in self.unicas
+                             if linha[coluna] is not None and linha[coluna] in vistos[coluna]), None)
+            if repetida:
+                erros.append({'linha': numero, 'error': f"Já existe cadastro com {repetida} '{linha[repetida]}'."})
+                continue
+            for coluna in self.unicas:
+                vistos[coluna].add(linha[coluna])
+            aceitas.append(linha)
+        return aceitas, erros
+
+    def consulta(self):
+        """ Colunas da exportação, em ordem de id """
+        return db.session.query(*(getattr(self.modelo, coluna) for coluna in self.colunas)) \
+            .order_by(self.modelo.id)
+
+    def formatar(self, linha):
+        return linha
+
+
+class ViagensCsv(TabelaCsv):
+    """
+    Viagens: referências (rota, ônibus, motorista) conferidas contra os ids
+    existentes e escala de ônibus/motorista sem sobreposições, como no POST
+    de uma viagem. Datas em ISO 8601 (YYYY-MM-DDTHH:MM[:SS] ou com espaço).
+    """
+
+    REFERENCIAS = {'rota_id': Rota, 'onibus_id': Onibus, 'motorista_id': Motorista}
+
+    def __init__(self):
+        super().__init__(Viagem, (
+            'id', 'rota_id', 'onibus_id', 'motorista_id', 'data_partida_prevista', 'data_chegada_prevista', 'status'
+        ), obrigatorias=('rota_id', 'onibus_id', 'motorista_id', 'data_partida_prevista', 'data_chegada_prevista'),
+            padroes={'status': 'Agendada'}, inteiras=('rota_id', 'onibus_id', 'motorista_id'))
+
+    def preparar(self):
+        # Ids dos cadastros (tabelas pequenas), para conferir as referências sem uma consulta por linha
+        return {coluna: {id for (id,) in db.session.query(modelo.id)} for coluna, modelo in self.REFERENCIAS.items()}
+
+    def converter(self, registro, contexto=None):
+        linha = super().converter(registro)
+        for coluna in self.REFERENCIAS:
+            if linha[coluna] not in contexto[coluna]:
+                raise LinhaInvalida(f"'{coluna}' {linha[coluna]} não existe.")
+        for coluna in ('data_partida_prevista', 'data_chegada_prevista'):
+            try:
+                # fromisoformat é bem mais rápido que o dateutil, linha a linha
+                linha[coluna] = datetime.fromisoformat(linha[coluna])
+            except ValueError:
+                raise LinhaInvalida(f"'{coluna}' deve estar no formato YYYY-MM-DDTHH:MM.")
+        if linha['data_chegada_prevista'] <= linha['data_partida_prevista']:
+            raise LinhaInvalida('A chegada prevista deve ser depois da partida prevista.')
+        return linha
+
+    def filtrar_lote(self, itens):
+        """
+        Separa as viagens que chocariam com a escala do ônibus ou do motorista
+        (gravada, incluindo os lotes anteriores, ou de outra linha do lote).
+        Escala dos recursos do lote carregada uma vez e conferida em memória.
+        """
+        ativas = [(numero, linha) for numero, linha in itens if linha['status'] not in STATUS_SEM_ESCALA]
+        if not ativas:
+            return [linha for _, linha in itens], []
+        inicio = min(linha['data_partida_prevista'] for _, linha in ativas)
+        fim = max(linha['data_chegada_prevista'] for _, linha in ativas)
+        escalas = {
+            recurso: escala_ocupada(recurso, {linha[coluna.key] for _, linha in ativas}, inicio, fim)
+            for recurso, coluna in RECURSOS.items()
+        }
+
+        aceitas, erros = [], []
+        for numero, linha in itens:
+            if linha['status'] in STATUS_SEM_ESCALA:
+                aceitas.append(linha)
+                continue
+            posicoes, ocupados = {}, []
+            for recurso, coluna in RECURSOS.items():
+                partidas, chegadas = escalas[recurso][linha[coluna.key]]
+                posicao = posicao_livre(partidas, chegadas, linha['data_partida_prevista'], linha['data_chegada_prevista'])
+                if posicao is None:
+                    ocupados.append(recurso)
+                else:
+                    posicoes[recurso] = (partidas, chegadas, posicao)
+            if ocupados:
+                nomes = ' e '.join(NOMES_RECURSO[recurso] for recurso in ocupados)
+                erros.append({'linha': numero, 'error': f'Escala em conflito: {nomes} já em outra viagem no mesmo horário.'})
+                continue
+            for partidas, chegadas, posicao in posicoes.values():
+                partidas.insert(posicao, linha['data_partida_prevista'])
+                chegadas.insert(posicao, linha['data_chegada_prevista'])
+            aceitas.append(linha)
+        return aceitas, erros
+
+    def formatar(self, linha):
+        return [valor.isoformat() if isinstance(valor, datetime) else valor for valor in linha]
+
+
+# Recurso da URL -> formato CSV
+TABELAS_CSV = {
+    'motoristas': TabelaCsv(Motorista, ('id', 'nome_completo', 'contato'),
+                            obrigatorias=('nome_completo',), unicas=('nome_completo',)),
+    'onibus': TabelaCsv(Onibus, ('id', 'numero_onibus', 'placa', 'empresa_parceira', 'capacidade'),
+                        obrigatorias=('numero_onibus',), unicas=('numero_onibus', 'placa'),
+                        padroes={'empresa_parceira': 'Guanabara', 'capacidade': 46}, inteiras=('capacidade',)),
+    'rotas': TabelaCsv(Rota, ('id', 'origem', 'destino', 'tipo_rota'),
+                       obrigatorias=('origem', 'destino'), padroes={'tipo_rota': 'Interestadual'}),
+}
+
+VIAGENS_CSV = ViagensCsv()
+
+
+def importar(texto, tabela):
+    """
+    Importa o CSV (arquivo de texto) para a tabela. Retorna
+    {'importadas': n, 'total_erros': n, 'erros': [{'linha': n, 'error': ...}]};
+    só os primeiros IMPORTACAO_CSV_MAX_ERROS erros são listados. Quem chama
+    faz o commit (ou o rollback).
+    """
+    tamanho_lote = current_app.config['IMPORTACAO_CSV_LOTE']
+    max_erros = current_app.config['IMPORTACAO_CSV_MAX_ERROS']
+    resultado = {'importadas': 0, 'total_erros': 0, 'erros': []}
+
+    def erro(item):
+        resultado['total_erros'] += 1
+        if len(resultado['erros']) < max_erros:
+            resultado['erros'].append(item)
+
+    def gravar(lote):
+        aceitas, erros = tabela.filtrar_lote(lote)
+        for item in erros:
+            erro(item)
+        if aceitas:
+            db.session.execute(insert(tabela.modelo), aceitas)
+            resultado['importadas'] += len(aceitas)
+
+    leitor = csv.DictReader(texto)
+    faltando = [coluna for coluna in tabela.obrigatorias if coluna not in (leitor.fieldnames or ())]
+    if faltando:
+        raise LinhaInvalida(f"Colunas obrigatórias ausentes no cabeçalho: {', '.join(faltando)}.")
+
+    contexto = tabela.preparar()
+    lote = []
+    for registro in leitor:
+        # Linha 1 é o cabeçalho
+        numero = leitor.line_num
+        try:
+            lote.append((numero, tabela.converter(registro, contexto)))
+        except LinhaInvalida as e:
+            erro({'linha': numero, 'error': str(e)})
+        if len(lote) == tamanho_lote:
+            gravar(lote)
+            lote = []
+    if lote:
+        gravar(lote)
+    # Os de conversão saem antes dos de cada lote
+    resultado['erros'].sort(key=lambda item: item['linha'])
+    return resultado
+
+
+def exportar(tabela, query=None, tamanho_bloco=1000):
+    """ Gera o CSV da tabela (cabeçalho + linhas da query) em blocos de texto """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(tabela.colunas)
+    query = tabela.consulta() if query is None else query
+    for i, linha in enumerate(query.yield_per(tamanho_bloco), 1):
+        escritor.writerow(tabela.formatar(linha))
+        if i % tamanho_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# --- Helpers das rotas ---
+
+def ler_upload(request):
+    """ CSV do pedido: arquivo multipart no campo 'arquivo' ou o próprio corpo (text/csv) """
+    arquivo = request.files.get('arquivo')
+    # Lido aos poucos do stream; utf-8-sig ignora o BOM dos CSV salvos pelo Excel
+    return io.TextIOWrapper(arquivo.stream if arquivo else request.stream, encoding='utf-8-sig', newline='')
+
+
+def resposta_csv(tabela, nome_arquivo, query=None):
+    """ Exportação em streaming, como download """
+    return Response(stream_with_context(exportar(tabela, query)), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'})
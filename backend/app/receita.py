@@ -0,0 +1,192 @@
+import click
+from datetime import datetime, time
+from flask.cli import AppGroup
+from sqlalchemy import select, literal, func, cast, and_
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import sqlite, postgresql
+from app.extensions import db
+from app.models import ReceitaDiaria, Venda, Viagem
+
+# --- Agregado diário de receita (tabela receita_diaria) ---
+#
+# Cada venda soma 1 na quantidade e o seu valor no total da linha
+# (dia, rota da viagem, bilheteiro, método). As funções daqui só executam
+# statements na sessão: quem chama faz o commit, junto com as vendas.
+
+# Dimensões aceitas em ?agrupar= (nome -> coluna do agregado)
+DIMENSOES = {
+    'data': ReceitaDiaria.data,
+    'rota': ReceitaDiaria.rota_id,
+    'bilheteiro': ReceitaDiaria.bilheteiro_id,
+    'metodo_pagamento': ReceitaDiaria.metodo_pagamento,
+}
+
+
+# Bancos com INSERT ... ON CONFLICT (upsert) -> construtor do INSERT
+INSERTS_UPSERT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def verificar_banco(app):
+    """
+    Falha no create_app() se o banco configurado não tiver suporte ao upsert
+    do agregado, em vez de na primeira venda.
+    """
+    dialeto = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if dialeto not in INSERTS_UPSERT:
+        raise RuntimeError(f'Agregado de receita sem suporte ao banco {dialeto} '
+                           f'(suportados: {", ".join(INSERTS_UPSERT)}).')
+
+
+def _dialeto():
+    return db.session.get_bind().dialect.name
+
+
+def _insert():
+    """ INSERT com suporte a ON CONFLICT (upsert) no banco em uso (verificado em verificar_banco) """
+    return INSERTS_UPSERT[_dialeto()](ReceitaDiaria)
+
+
+def _dia(coluna):
+    """ Dia (DATE) de uma coluna DateTime. No SQLite, CAST AS DATE não serve: date() dá 'YYYY-MM-DD'. """
+    if _dialeto() == 'sqlite':
+        return func.date(coluna)
+    return cast(coluna, db.Date)
+
+
+def _somar(insert_stmt):
+    """ Upsert: na linha que já existe, soma quantidade e total aos atuais """
+    return insert_stmt.on_conflict_do_update(
+        index_elements=['data', 'rota_id', 'bilheteiro_id', 'metodo_pagamento'],
+        set_={
+            'quantidade': ReceitaDiaria.quantidade + insert_stmt.excluded.quantidade,
+            'total': ReceitaDiaria.total + insert_stmt.excluded.total,
+        }
+    )
+
+
+def registrar_vendas(viagem_id, bilheteiro_id, data_hora, totais_por_metodo):
+    """
+    Soma vendas de uma viagem ao agregado. totais_por_metodo = {metodo: (quantidade, valor)}.
+    A rota vem da própria viagem no INSERT ... SELECT, sem uma consulta a mais.
+    """
+    for metodo, (quantidade, valor) in totais_por_metodo.items():
+        origem = select(
+            literal(data_hora.date(), db.Date),
+            Viagem.rota_id,
+            literal(int(bilheteiro_id)),
+            literal(metodo, db.String),
+            literal(quantidade),
+            literal(float(valor), db.Float),
+        ).where(Viagem.id == viagem_id)
+        db.session.execute(_somar(_insert().from_select(
+            ['data', 'rota_id', 'bilheteiro_id', 'metodo_pagamento', 'quantidade', 'total'], origem)))
+
+
+def mover_viagem(viagem_id, rota_antiga_id, rota_nova_id):
+    """
+    Passa as vendas de uma viagem que mudou de rota da rota antiga para a nova
+    no agregado. Linhas que ficam sem vendas são apagadas.
+    """
+    grupos = db.session.query(
+        _dia(Venda.data_hora_venda), Venda.bilheteiro_id, Venda.metodo_pagamento,
+        func.count(Venda.id), func.sum(Venda.valor_passagem)
+    ).filter(Venda.viagem_id == viagem_id) \
+     .group_by(_dia(Venda.data_hora_venda), Venda.bilheteiro_id, Venda.metodo_pagamento).all()
+    if not grupos:
+        return
+
+    for dia, bilheteiro_id, metodo, quantidade, valor in grupos:
+        dia = _como_data(dia)
+        chave = and_(ReceitaDiaria.data == dia, ReceitaDiaria.rota_id == rota_antiga_id,
+                     ReceitaDiaria.bilheteiro_id == bilheteiro_id, ReceitaDiaria.metodo_pagamento == metodo)
+        ReceitaDiaria.query.filter(chave).update({
+            ReceitaDiaria.quantidade: ReceitaDiaria.quantidade - quantidade,
+            ReceitaDiaria.total: ReceitaDiaria.total - valor,
+        }, synchronize_session=False)
+        db.session.execute(_somar(_insert().values(
+            data=dia, rota_id=rota_nova_id, bilheteiro_id=bilheteiro_id,
+            metodo_pagamento=metodo, quantidade=quantidade, total=valor)))
+
+    ReceitaDiaria.query.filter(ReceitaDiaria.rota_id == rota_antiga_id, ReceitaDiaria.quantidade <= 0) \
+        .delete(synchronize_session=False)
+
+
+def _como_data(valor):
+    # date() do SQLite devolve texto
+    return datetime.strptime(valor, '%Y-%m-%d').date() if isinstance(valor, str) else valor
+
+
+def reconstruir(data_inicio=None, data_fim=None):
+    """
+    Recalcula o agregado a partir das vendas, para os dias entre data_inicio
+    e data_fim (date, ambos opcionais; sem eles, todo o histórico): apaga as
+    linhas desses dias e insere com um único INSERT ... SELECT ... GROUP BY.
+    Retorna quantas linhas do agregado foram gravadas.
+    """
+    apagar = ReceitaDiaria.query
+    vendas = select(
+        _dia(Venda.data_hora_venda), Viagem.rota_id, Venda.bilheteiro_id, Venda.metodo_pagamento,
+        func.count(Venda.id), func.sum(Venda.valor_passagem)
+    ).join(Viagem, Venda.viagem_id == Viagem.id)
+    if data_inicio:
+        apagar = apagar.filter(ReceitaDiaria.data >= data_inicio)
+        vendas = vendas.where(Venda.data_hora_venda >= datetime.combine(data_inicio, time.min))
+    if data_fim:
+        apagar = apagar.filter(ReceitaDiaria.data <= data_fim)
+        vendas = vendas.where(Venda.data_hora_venda <= datetime.combine(data_fim, time.max))
+    vendas = vendas.group_by(
+        _dia(Venda.data_hora_venda), Viagem.rota_id, Venda.bilheteiro_id, Venda.metodo_pagamento)
+
+    apagar.delete(synchronize_session=False)
+    resultado = db.session.execute(_insert().from_select(
+        ['data', 'rota_id', 'bilheteiro_id', 'metodo_pagamento', 'quantidade', 'total'], vendas))
+    return resultado.rowcount
+
+
+def consultar(data_inicio=None, data_fim=None, agrupar=('data', 'rota', 'metodo_pagamento'), filtros=None):
+    """
+    Soma do agregado no intervalo [data_inicio, data_fim] (date), agrupada
+    pelas dimensões de 'agrupar' (chaves de DIMENSOES) e filtrada por
+    filtros = {dimensão: valor}. Retorna tuplas (*dimensões, quantidade, total),
+    ordenadas pelas dimensões.
+    """
+    colunas = [DIMENSOES[nome] for nome in agrupar]
+    query = db.session.query(*colunas, func.sum(ReceitaDiaria.quantidade), func.sum(ReceitaDiaria.total))
+    if data_inicio:
+        query = query.filter(ReceitaDiaria.data >= data_inicio)
+    if data_fim:
+        query = query.filter(ReceitaDiaria.data <= data_fim)
+    for nome, valor in (filtros or {}).items():
+        query = query.filter(DIMENSOES[nome] == valor)
+    if colunas:
+        query = query.group_by(*colunas).order_by(*colunas)
+    # Sem dimensões e sem linhas no intervalo, o SUM devolve uma linha de NULLs
+    return [linha for linha in query if linha[-2] is not None]
+
+
+# --- Linha de comando: flask receita ... ---
+
+receita_cli = AppGroup('receita', help='Agregado diário de receita (receita_diaria).')
+
+
+def _data_opcional(ctx, param, valor):
+    if valor is None:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.BadParameter('use o formato YYYY-MM-DD')
+
+
+@receita_cli.command('reconstruir')
+@click.option('--data-inicio', callback=_data_opcional, help='Primeiro dia (YYYY-MM-DD). Padrão: início do histórico.')
+@click.option('--data-fim', callback=_data_opcional, help='Último dia (YYYY-MM-DD). Padrão: fim do histórico.')
+def reconstruir_comando(data_inicio, data_fim):
+    """ Recalcula o agregado a partir das vendas (backfill ou correção) """
+    inicio = datetime.now()
+    linhas = reconstruir(data_inicio, data_fim)
+    db.session.commit()
+    click.echo(f'{linhas} linhas gravadas em receita_diaria em {(datetime.now() - inicio).total_seconds():.1f}s.')
@@ -0,0 +1,110 @@
+import threading
+import time
+from app.extensions import db
+from app.versoes import versoes_cadastros
+
+TABELAS_REFERENCIA = ('rota', 'onibus', 'motorista')
+
+
+class CacheReferencias:
+    """
+    Cache, por processo, dos dicts já serializados (to_dict) de Rota, Onibus
+    e Motorista, indexados pelo id. Serve a serialização das viagens, que
+    aninha os três: com o cache, listar viagens só precisa das linhas da
+    própria viagem.
+
+    Cada tabela é carregada inteira de uma vez (são poucas dezenas ou
+    centenas de linhas) e guardada junto com a versão de versoes_cadastros
+    lida antes da carga. Uma escrita em cadastros sobe a versão; o próximo
+    acesso vê a diferença, descarta a tabela (uma invalidação) e recarrega.
+    Um id que não esteja na carga (linha criada fora de cadastros.py) é
+    buscado sozinho e acrescentado.
+
+    A versão só vê as escritas feitas por cadastros.py neste processo. As
+    outras (outro worker, 'flask shell', migrações) aparecem quando a carga
+    expira: cada tabela é recarregada no máximo 'ttl' segundos depois de lida.
+
+    Os dicts devolvidos são partilhados entre pedidos: não os altere.
+    """
+
+    def __init__(self, ttl=60):
+        self._tabelas = {}  # tabela -> (versao, expira_em, {id: dict})
+        self._ttl = ttl
+        self._trava = threading.Lock()
+        # Contadores sem trava no caminho quente: sob concorrência podem perder
+        # um incremento raro, o que não importa para acompanhar a taxa de acerto
+        self.acertos = dict.fromkeys(TABELAS_REFERENCIA, 0)
+        self.faltas = dict.fromkeys(TABELAS_REFERENCIA, 0)
+        self.invalidacoes = dict.fromkeys(TABELAS_REFERENCIA, 0)
+
+    def obter(self, modelo, id):
+        """ Dict serializado de modelo com esse id (None se não existir) """
+        if id is None:
+            return None
+        tabela = modelo.__tablename__
+        carga = self._tabelas.get(tabela)
+        if not self._valida(carga, versoes_cadastros.versao(tabela)):
+            carga = self._carregar(modelo, tabela)
+        dados = carga[2].get(id)
+        if dados is not None:
+            self.acertos[tabela] += 1
+            return dados
+
+        self.faltas[tabela] += 1
+        objeto = db.session.get(modelo, id)
+        if objeto is None:
+            return None
+        dados = carga[2][id] = objeto.to_dict()
+        return dados
+
+    @staticmethod
+    def _valida(carga, versao):
+        return carga is not None and carga[0] == versao and carga[1] > time.monotonic()
+
+    def _carregar(self, modelo, tabela):
+        with self._trava:
+            versao = versoes_cadastros.versao(tabela)
+            carga = self._tabelas.get(tabela)
+            if self._valida(carga, versao):
+                return carga  # outra thread já recarregou
+            if carga is not None and carga[0] != versao:
+                self.invalidacoes[tabela] += 1
+            self.faltas[tabela] += 1
+            carga = (versao, time.monotonic() + self._ttl,
+                     {objeto.id: objeto.to_dict() for objeto in modelo.query.all()})
+            self._tabelas[tabela] = carga
+            return carga
+
+    def limpar(self):
+        with self._trava:
+            self._tabelas.clear()
+
+    def estatisticas(self):
+        """ Acertos, faltas, invalidações, taxa de acerto e itens em cache, por tabela """
+        resultado = {}
+        for tabela in TABELAS_REFERENCIA:
+            consultas = self.acertos[tabela] + self.faltas[tabela]
+            carga = self._tabelas.get(tabela)
+            resultado[tabela] = {
+                'acertos': self.acertos[tabela],
+                'faltas': self.faltas[tabela],
+                'invalidacoes': self.invalidacoes[tabela],
+                'taxa_acerto': round(self.acertos[tabela] / consultas, 4) if consultas else None,
+                'itens': len(carga[2]) if carga else 0,
+            }
+        return resultado
+
+    def exportar_metricas(self):
+        """ Contadores no formato de texto do Prometheus (acrescentados a /metrics) """
+        linhas = []
+        for nome, ajuda, valores in (
+            ('cache_referencias_acertos_total', 'Consultas servidas pelo cache de referências', self.acertos),
+            ('cache_referencias_faltas_total', 'Consultas que foram ao banco', self.faltas),
+            ('cache_referencias_invalidacoes_total', 'Tabelas descartadas após escrita em cadastros', self.invalidacoes),
+        ):
+            linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} counter']
+            linhas += [f'{nome}{{tabela="{tabela}"}} {valores[tabela]}' for tabela in TABELAS_REFERENCIA]
+        return '\n'.join(linhas) + '\n'
+
+
+cache_referencias = CacheReferencias()
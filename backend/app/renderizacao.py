@@ -0,0 +1,283 @@
+import io
+
+# Libs para PDF
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+
+# Libs para DOCX
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from xml.sax.saxutils import escape
+
+# --- Renderização dos relatórios ---
+# Funções puras: recebem dados simples (dicts, tuplas, strings) e devolvem os
+# bytes do arquivo (ou escrevem-no no arquivo recebido). Não usam o Flask nem
+# o banco, por isso podem correr tanto dentro do pedido como num processo do
+# pool de jobs (app/jobs.py).
+
+MIMETYPE_PDF = 'application/pdf'
+MIMETYPE_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+def renderizar_fecho_caixa_pdf(caixa):
+    """
+    Gera o PDF de fecho de caixa.
+    'caixa' é um dict com id, bilheteiro_nome, status, data_abertura,
+    data_fechamento (datetime ou None), saldo_inicial e os totais de vendas.
+    """
+    # Cria um buffer de bytes na memória para o PDF
+    buffer = io.BytesIO()
+
+    # Cria o canvas do PDF
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4 # (595.27, 841.89)
+
+    # --- Conteúdo do PDF ---
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(width / 2.0, height - 2*cm, f"Relatório de Fecho de Caixa - ID: {caixa['id']}")
+
+    c.setFont("Helvetica", 12)
+    y_pos = height - 3.5*cm
+
+    # Função auxiliar para desenhar linhas
+    def draw_line(label, value, y):
+        c.drawString(2*cm, y, f"{label}:")
+        c.drawString(7*cm, y, value)
+        return y - 0.7*cm
+
+    y_pos = draw_line("Bilheteiro", f"{caixa['bilheteiro_nome'] or 'N/A'}", y_pos)
+    y_pos = draw_line("Status", caixa['status'], y_pos)
+    y_pos = draw_line("Abertura", f"{caixa['data_abertura'].strftime('%d/%m/%Y %H:%M')}", y_pos)
+
+    if caixa['data_fechamento']:
+        y_pos = draw_line("Fechamento", f"{caixa['data_fechamento'].strftime('%d/%m/%Y %H:%M')}", y_pos)
+
+    y_pos -= 0.5*cm # Espaçamento
+
+    c.setFont("Helvetica-Bold", 12)
+    y_pos = draw_line("Valores", "", y_pos)
+    c.setFont("Helvetica", 12)
+
+    y_pos = draw_line("Saldo Inicial", f"R$ {caixa['saldo_inicial']:.2f}", y_pos)
+    y_pos = draw_line("Vendas (Dinheiro)", f"R$ {caixa['total_vendas_dinheiro']:.2f}", y_pos)
+    y_pos = draw_line("Vendas (Pix)", f"R$ {caixa['total_vendas_pix']:.2f}", y_pos)
+    y_pos = draw_line("Vendas (Cartão)", f"R$ {caixa['total_vendas_cartao']:.2f}", y_pos)
+
+    y_pos -= 0.2*cm
+    c.setStrokeColorRGB(0,0,0)
+    c.line(2*cm, y_pos, width - 2*cm, y_pos) # Linha horizontal
+    y_pos -= 0.7*cm
+
+    c.setFont("Helvetica-Bold", 14)
+    y_pos = draw_line("Total Geral em Vendas", f"R$ {caixa['total_geral_vendas']:.2f}", y_pos)
+    # --- Fim do Conteúdo ---
+
+    c.showPage()
+    c.save()
+
+    return buffer.getvalue()
+
+
+def renderizar_viagens_docx(periodo_str, linhas):
+    """
+    Gera o DOCX do relatório de viagens.
+    'linhas' é uma lista de tuplas de textos, uma por viagem, na ordem das
+    colunas: ID, Rota, Partida Prevista, Motorista, Ônibus, Status.
+    """
+    # Cria documento DOCX na memória
+    document = Document()
+    buffer = io.BytesIO()
+
+    # --- Conteúdo do DOCX ---
+    document.add_heading('Relatório de Viagens', 0)
+    document.add_paragraph(periodo_str)
+    document.add_paragraph(f"Total de viagens encontradas: {len(linhas)}")
+
+    if len(linhas) > 0:
+        table = document.add_table(rows=1, cols=6)
+        table.style = 'Table Grid'
+
+        # Cabeçalho
+        hdr_cells = table.rows[0].cells
+        hdr_cells[0].text = 'ID'
+        hdr_cells[1].text = 'Rota (Origem-Destino)'
+        hdr_cells[2].text = 'Partida Prevista'
+        hdr_cells[3].text = 'Motorista'
+        hdr_cells[4].text = 'Ônibus (Nº)'
+        hdr_cells[5].text = 'Status'
+
+        # Adiciona dados
+        _adicionar_linhas_tabela(table, linhas)
+
+    # --- Fim do Conteúdo ---
+
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+# Quantas linhas de tabela são convertidas de XML para elementos de cada vez
+LINHAS_POR_BLOCO_XML = 1000
+
+def _adicionar_linhas_tabela(table, linhas):
+    """
+    Acrescenta linhas (sequências de textos) a uma tabela python-docx.
+
+    Equivale a 'table.add_row()' + 'cell.text = ...' para cada linha, mas gera
+    o XML <w:tr> das linhas como texto e converte blocos inteiros de uma vez.
+    O add_row() percorre a tabela toda a cada chamada (fica quadrático em
+    tabelas grandes) e cria vários objetos por célula.
+    """
+    # Largura de cada coluna em twips, como está no <w:gridCol> da tabela
+    larguras = [col.get(qn('w:w')) for col in table._tbl.tblGrid.gridCol_lst]
+    abertura_celulas = [
+        f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{largura}"/></w:tcPr><w:p><w:r><w:t xml:space="preserve">'
+        if largura is not None else
+        '<w:tc><w:p><w:r><w:t xml:space="preserve">'
+        for largura in larguras
+    ]
+    fecho_celula = '</w:t></w:r></w:p></w:tc>'
+
+    def converter_bloco(bloco):
+        fragmento = parse_xml(f'<w:tbl {nsdecls("w")}>{"".join(bloco)}</w:tbl>')
+        table._tbl.extend(list(fragmento))
+
+    bloco = []
+    for linha in linhas:
+        bloco.append('<w:tr>' + ''.join(
+            abertura + escape(texto) + fecho_celula
+            for abertura, texto in zip(abertura_celulas, linha)
+        ) + '</w:tr>')
+        if len(bloco) >= LINHAS_POR_BLOCO_XML:
+            converter_bloco(bloco)
+            bloco = []
+    if bloco:
+        converter_bloco(bloco)
+
+
+# Colunas do relatório consolidado de caixas: (título, posição x em cm, alinhado à direita)
+COLUNAS_CAIXAS_CONSOLIDADO = [
+    ('Caixa', 1.5, False),
+    ('Abertura', 3.0, False),
+    ('Fechamento', 6.0, False),
+    ('Dinheiro', 11.5, True),
+    ('Pix', 14.0, True),
+    ('Cartão', 16.5, True),
+    ('Total', 19.5, True),
+]
+TOTAIS_CAIXA = ('total_vendas_dinheiro', 'total_vendas_pix', 'total_vendas_cartao', 'total_geral_vendas')
+
+
+def renderizar_caixas_consolidado_pdf(saida, periodo_str, caixas):
+    """
+    Gera o PDF consolidado de fecho de vários caixas, escrevendo em 'saida'
+    (arquivo ou buffer).
+
+    'caixas' é um iterável de linhas com bilheteiro_id, bilheteiro_nome, id,
+    data_abertura, data_fechamento e os quatro totais, ORDENADAS por
+    bilheteiro. As linhas são consumidas uma a uma: o iterável pode vir
+    direto de um cursor do banco, sem carregar todos os caixas de uma vez
+    (as páginas, essas, ficam no canvas do ReportLab até o save()).
+    Subtotais por bilheteiro e o total geral são somados das próprias linhas,
+    na mesma passagem, e por isso sempre batem com elas.
+    Retorna o número de caixas processados.
+    """
+    c = canvas.Canvas(saida, pagesize=A4)
+    width, height = A4
+    margem_inferior = 2*cm
+    estado = {'y': 0, 'pagina': 0, 'bilheteiro': None}
+
+    def formatar_valor(valor):
+        return f"R$ {(valor or 0.0):.2f}"
+
+    def nova_pagina():
+        if estado['pagina']:
+            c.showPage()
+        estado['pagina'] += 1
+        c.setFont("Helvetica-Bold", 14)
+        c.drawCentredString(width / 2.0, height - 1.5*cm, "Relatório Consolidado de Fecho de Caixas")
+        c.setFont("Helvetica", 10)
+        c.drawCentredString(width / 2.0, height - 2.1*cm, periodo_str)
+        c.drawRightString(width - 1.5*cm, 1*cm, f"Página {estado['pagina']}")
+        y = height - 3*cm
+        c.setFont("Helvetica-Bold", 9)
+        for titulo, x, direita in COLUNAS_CAIXAS_CONSOLIDADO:
+            (c.drawRightString if direita else c.drawString)(x*cm, y, titulo)
+        c.line(1.5*cm, y - 0.15*cm, width - 1.5*cm, y - 0.15*cm)
+        estado['y'] = y - 0.6*cm
+        if estado['bilheteiro']:
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(1.5*cm, estado['y'], f"Bilheteiro: {estado['bilheteiro']} (continuação)")
+            estado['y'] -= 0.6*cm
+
+    def reservar(altura):
+        """ Garante espaço para a próxima linha, abrindo outra página se preciso """
+        if estado['y'] - altura < margem_inferior:
+            nova_pagina()
+
+    def linha_valores(textos, fonte="Helvetica", tamanho=9):
+        reservar(0.5*cm)
+        c.setFont(fonte, tamanho)
+        for texto, (_, x, direita) in zip(textos, COLUNAS_CAIXAS_CONSOLIDADO):
+            if texto:
+                (c.drawRightString if direita else c.drawString)(x*cm, estado['y'], texto)
+        estado['y'] -= 0.5*cm
+
+    def linha_subtotal(rotulo, totais, quantidade):
+        linha_valores(
+            [f"{rotulo} ({quantidade} caixas)", '', ''] + [formatar_valor(v) for v in totais],
+            fonte="Helvetica-Bold"
+        )
+        estado['y'] -= 0.3*cm
+
+    nova_pagina()
+    total_geral = [0.0] * len(TOTAIS_CAIXA)
+    quantidade_geral = 0
+    bilheteiro_atual = object()
+    subtotal = None
+    quantidade_bilheteiro = 0
+    nome_atual = None
+
+    for caixa in caixas:
+        if caixa.bilheteiro_id != bilheteiro_atual:
+            if subtotal is not None:
+                linha_subtotal(f"Subtotal {nome_atual}", subtotal, quantidade_bilheteiro)
+            bilheteiro_atual = caixa.bilheteiro_id
+            nome_atual = caixa.bilheteiro_nome or 'N/A'
+            subtotal = [0.0] * len(TOTAIS_CAIXA)
+            quantidade_bilheteiro = 0
+            estado['bilheteiro'] = None
+            reservar(1.2*cm)
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(1.5*cm, estado['y'], f"Bilheteiro: {nome_atual}")
+            estado['y'] -= 0.6*cm
+            estado['bilheteiro'] = nome_atual
+
+        valores = [getattr(caixa, campo) or 0.0 for campo in TOTAIS_CAIXA]
+        for i, valor in enumerate(valores):
+            subtotal[i] += valor
+            total_geral[i] += valor
+        quantidade_bilheteiro += 1
+        quantidade_geral += 1
+
+        linha_valores([
+            str(caixa.id),
+            caixa.data_abertura.strftime('%d/%m/%Y %H:%M') if caixa.data_abertura else '',
+            caixa.data_fechamento.strftime('%d/%m/%Y %H:%M') if caixa.data_fechamento else '(aberto)',
+        ] + [formatar_valor(v) for v in valores])
+
+    if subtotal is not None:
+        linha_subtotal(f"Subtotal {nome_atual}", subtotal, quantidade_bilheteiro)
+    estado['bilheteiro'] = None
+
+    reservar(1*cm)
+    c.line(1.5*cm, estado['y'] + 0.3*cm, width - 1.5*cm, estado['y'] + 0.3*cm)
+    linha_valores(
+        [f"TOTAL GERAL ({quantidade_geral} caixas)", '', ''] + [formatar_valor(v) for v in total_geral],
+        fonte="Helvetica-Bold", tamanho=10
+    )
+
+    c.showPage()
+    c.save()
+    return quantidade_geral
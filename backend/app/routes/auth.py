@@ -1,10 +1,14 @@
-from flask import Blueprint, request, jsonify
-from app.extensions import db, bcrypt 
+from flask import Blueprint, request, jsonify, current_app
+from app.extensions import db, bcrypt, pool_senhas
+from app.senhas import PoolSenhasOcupado, custo_do_hash
 from app.models import Usuario
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 # Importa o novo decorator
-from app.decorators import admin_required
+from app.decorators import admin_required, registrar_papel
+from app.consultas import ParametroInvalido
+from app.serializacao import resposta_json, ESQUEMA_USUARIO
 
 bp = Blueprint('auth', __name__)
 
@@ -20,8 +24,18 @@ def login():
         
     usuario = Usuario.query.filter_by(usuario=data['usuario']).first()
     
-    if not usuario or not usuario.check_password(data['senha']):
-        return jsonify({'error': 'Credenciais inválidas'}), 401
+    try:
+        # O bcrypt corre no pool limitado; o objeto do ORM não sai desta thread
+        if not usuario or not pool_senhas.executar(bcrypt.check_password_hash, usuario.senha_hash, data['senha']):
+            return jsonify({'error': 'Credenciais inválidas'}), 401
+    except PoolSenhasOcupado:
+        return jsonify({'error': 'Servidor ocupado. Tente novamente em instantes.'}), 503, {'Retry-After': '1'}
+
+    # Refaz o hash se o work factor configurado mudou desde que a senha foi
+    # gravada, em segundo plano (pool cheio: fica para o próximo login)
+    if custo_do_hash(usuario.senha_hash) != current_app.config['BCRYPT_LOG_ROUNDS']:
+        pool_senhas.enviar(_refazer_hash, current_app._get_current_object(), usuario.id,
+                           usuario.senha_hash, data['senha'])
         
     # Adiciona o nível de acesso ao token
     access_token = create_access_token(
@@ -35,6 +49,20 @@ def login():
         'usuario': usuario.to_dict()
     }), 200
 
+def _refazer_hash(app, usuario_id, hash_antigo, senha):
+    """
+    Corre no pool de senhas: gera o hash com o custo atual e grava-o com um
+    UPDATE próprio, só se a senha não tiver sido trocada entretanto.
+    """
+    novo_hash = bcrypt.generate_password_hash(senha).decode('utf-8')
+    with app.app_context():
+        db.session.execute(
+            update(Usuario)
+            .where(Usuario.id == usuario_id, Usuario.senha_hash == hash_antigo)
+            .values(senha_hash=novo_hash)
+        )
+        db.session.commit()
+
 @bp.route('/perfil', methods=['GET'])
 @jwt_required() 
 def perfil():
@@ -78,10 +106,12 @@ def register():
 @bp.route('/usuarios', methods=['GET'])
 @admin_required() # Protegido
 def get_usuarios():
-    """ Lista todos os usuários (LISTAR) """
+    """ Lista todos os usuários (LISTAR). Campos (opcional): ?fields=id,usuario,... """
     try:
-        usuarios = Usuario.query.all()
-        return jsonify([u.to_dict() for u in usuarios]), 200
+        selecao = ESQUEMA_USUARIO.selecionar(request.args)
+        return resposta_json(selecao.lista(Usuario.query.order_by(Usuario.id)))
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -98,6 +128,8 @@ def update_usuario(id):
         usuario.nivel_acesso = data.get('nivel_acesso', usuario.nivel_acesso)
         
         db.session.commit()
+        # O novo papel passa a valer também para os tokens já emitidos
+        registrar_papel(usuario.id, usuario.nivel_acesso)
         return jsonify(usuario.to_dict()), 200
     
     except IntegrityError:
@@ -118,6 +150,7 @@ def delete_usuario(id):
     try:
         db.session.delete(usuario)
         db.session.commit()
+        registrar_papel(id, None)
         return jsonify({'message': 'Usuário deletado'}), 200
     except IntegrityError:
         db.session.rollback()
@@ -136,6 +169,9 @@ def reset_password(id):
     try:
         usuario.set_password(data['nova_senha'])
         db.session.commit()
+        # Reafirma o papel atual: descartar a entrada faria um token antigo
+        # (ex.: de antes de um rebaixamento) voltar a valer pelo claim
+        registrar_papel(usuario.id, usuario.nivel_acesso)
         return jsonify({'message': f'Senha do usuário {usuario.usuario} atualizada.'}), 200
     except Exception as e:
         db.session.rollback()
@@ -1,12 +1,47 @@
-from flask import Blueprint, jsonify, request
+import csv
+from flask import Blueprint, jsonify, request, current_app
 from app.extensions import db 
 from app.models import Motorista, Onibus, Rota
+from app.versoes import versoes_cadastros
+from app.consultas import ParametroInvalido
+from app.serializacao import dumps, ESQUEMA_MOTORISTA, ESQUEMA_ONIBUS, ESQUEMA_ROTA
+from app.planilhas import TABELAS_CSV, LinhaInvalida, importar, ler_upload, resposta_csv
+from app.decorators import admin_required
 from sqlalchemy.exc import IntegrityError
 # Importa o decorator de login
 from flask_jwt_extended import jwt_required
 
 bp = Blueprint('cadastros', __name__)
 
+
+def _resposta_condicional(tabela, chave, gerar):
+    """
+    Resposta de leitura de um cadastro com ETag pela versão da tabela.
+    If-None-Match igual ao ETag atual -> 304, sem consultar o banco.
+    Senão, o JSON vem do cache da versão atual ou de gerar() (consulta ao banco).
+    """
+    versao = versoes_cadastros.versao(tabela)
+    etag = versoes_cadastros.etag(tabela, versao)
+    if request.if_none_match.contains(etag):
+        resposta = current_app.response_class(status=304)
+    else:
+        corpo = versoes_cadastros.payload(tabela, chave, versao, lambda: dumps(gerar()))
+        resposta = current_app.response_class(corpo, mimetype='application/json')
+    resposta.set_etag(etag)
+    # O navegador guarda a resposta, mas revalida (If-None-Match) a cada uso
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+
+def _resposta_lista(modelo, esquema):
+    """ Listagem de um cadastro por colunas, com ?fields= opcional (a seleção entra na chave do cache) """
+    try:
+        selecao = esquema.selecionar(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return _resposta_condicional(modelo.__tablename__, ('lista',) + selecao.nomes,
+                                 lambda: selecao.lista(modelo.query.order_by(modelo.id)))
+
 # --- API CRUD: Motoristas ---
 
 @bp.route('/motoristas', methods=['POST'])
@@ -23,6 +58,7 @@ def create_motorista():
     try:
         db.session.add(novo_motorista)
         db.session.commit()
+        versoes_cadastros.registrar_alteracao(Motorista.__tablename__)
         return jsonify(novo_motorista.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -31,14 +67,13 @@ def create_motorista():
 @bp.route('/motoristas', methods=['GET'])
 @jwt_required() # Protegido
 def get_motoristas():
-    motoristas = Motorista.query.all()
-    return jsonify([m.to_dict() for m in motoristas]), 200
+    return _resposta_lista(Motorista, ESQUEMA_MOTORISTA)
 
 @bp.route('/motoristas/<int:id>', methods=['GET'])
 @jwt_required() # Protegido
 def get_motorista(id):
-    motorista = Motorista.query.get_or_404(id)
-    return jsonify(motorista.to_dict()), 200
+    return _resposta_condicional(Motorista.__tablename__, id,
+                                 lambda: Motorista.query.get_or_404(id).to_dict())
 
 @bp.route('/motoristas/<int:id>', methods=['PUT'])
 @jwt_required() # Protegido
@@ -51,6 +86,7 @@ def update_motorista(id):
     
     try:
         db.session.commit()
+        versoes_cadastros.registrar_alteracao(Motorista.__tablename__)
         return jsonify(motorista.to_dict()), 200
     except IntegrityError:
         db.session.rollback()
@@ -62,6 +98,7 @@ def delete_motorista(id):
     motorista = Motorista.query.get_or_404(id)
     db.session.delete(motorista)
     db.session.commit()
+    versoes_cadastros.registrar_alteracao(Motorista.__tablename__)
     return jsonify({'message': 'Motorista deletado'}), 200
 
 # --- API CRUD: Ônibus ---
@@ -82,6 +119,7 @@ def create_onibus():
     try:
         db.session.add(novo_onibus)
         db.session.commit()
+        versoes_cadastros.registrar_alteracao(Onibus.__tablename__)
         return jsonify(novo_onibus.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -90,14 +128,13 @@ def create_onibus():
 @bp.route('/onibus', methods=['GET'])
 @jwt_required() # Protegido
 def get_onibus_lista():
-    onibus_lista = Onibus.query.all()
-    return jsonify([o.to_dict() for o in onibus_lista]), 200
+    return _resposta_lista(Onibus, ESQUEMA_ONIBUS)
 
 @bp.route('/onibus/<int:id>', methods=['GET'])
 @jwt_required() # Protegido
 def get_onibus(id):
-    onibus = Onibus.query.get_or_404(id)
-    return jsonify(onibus.to_dict()), 200
+    return _resposta_condicional(Onibus.__tablename__, id,
+                                 lambda: Onibus.query.get_or_404(id).to_dict())
 
 @bp.route('/onibus/<int:id>', methods=['PUT'])
 @jwt_required() # Protegido
@@ -112,6 +149,7 @@ def update_onibus(id):
     
     try:
         db.session.commit()
+        versoes_cadastros.registrar_alteracao(Onibus.__tablename__)
         return jsonify(onibus.to_dict()), 200
     except IntegrityError:
         db.session.rollback()
@@ -123,6 +161,7 @@ def delete_onibus(id):
     onibus = Onibus.query.get_or_404(id)
     db.session.delete(onibus)
     db.session.commit()
+    versoes_cadastros.registrar_alteracao(Onibus.__tablename__)
     return jsonify({'message': 'Ônibus deletado'}), 200
 
 # --- API CRUD: Rotas ---
@@ -141,19 +180,19 @@ def create_rota():
     )
     db.session.add(nova_rota)
     db.session.commit()
+    versoes_cadastros.registrar_alteracao(Rota.__tablename__)
     return jsonify(nova_rota.to_dict()), 201
 
 @bp.route('/rotas', methods=['GET'])
 @jwt_required() # Protegido
 def get_rotas():
-    rotas = Rota.query.all()
-    return jsonify([r.to_dict() for r in rotas]), 200
+    return _resposta_lista(Rota, ESQUEMA_ROTA)
 
 @bp.route('/rotas/<int:id>', methods=['GET'])
 @jwt_required() # Protegido
 def get_rota(id):
-    rota = Rota.query.get_or_404(id)
-    return jsonify(rota.to_dict()), 200
+    return _resposta_condicional(Rota.__tablename__, id,
+                                 lambda: Rota.query.get_or_404(id).to_dict())
 
 @bp.route('/rotas/<int:id>', methods=['PUT'])
 @jwt_required() # Protegido
@@ -166,6 +205,7 @@ def update_rota(id):
     rota.tipo_rota = data.get('tipo_rota', rota.tipo_rota)
     
     db.session.commit()
+    versoes_cadastros.registrar_alteracao(Rota.__tablename__)
     return jsonify(rota.to_dict()), 200
 
 @bp.route('/rotas/<int:id>', methods=['DELETE'])
@@ -174,4 +214,38 @@ def delete_rota(id):
     rota = Rota.query.get_or_404(id)
     db.session.delete(rota)
     db.session.commit()
-    return jsonify({'message': 'Rota deletada'}), 200
\ No newline at end of file
+    versoes_cadastros.registrar_alteracao(Rota.__tablename__)
+    return jsonify({'message': 'Rota deletada'}), 200
+
+# --- Importação e exportação em CSV ---
+
+@bp.route('/<any(motoristas, onibus, rotas):recurso>/csv', methods=['GET'])
+@jwt_required() # Protegido
+def exportar_cadastro_csv(recurso):
+    """ Exporta o cadastro inteiro em CSV (streaming), com as colunas de TABELAS_CSV """
+    return resposta_csv(TABELAS_CSV[recurso], f'{recurso}.csv')
+
+@bp.route('/<any(motoristas, onibus, rotas):recurso>/csv', methods=['POST'])
+@admin_required() # Protegido
+def importar_cadastro_csv(recurso):
+    """
+    Importa um CSV (multipart no campo 'arquivo', ou o corpo em text/csv) com
+    cabeçalho nas colunas da exportação ('id' é ignorado). Linhas inválidas ou
+    duplicadas são puladas e listadas em 'erros'; as outras são gravadas.
+    """
+    tabela = TABELAS_CSV[recurso]
+    try:
+        resultado = importar(ler_upload(request), tabela)
+        db.session.commit()
+    except LinhaInvalida as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Arquivo CSV inválido (use UTF-8): {e}'}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Nenhuma linha importada: conflito com um cadastro gravado durante a importação.'}), 409
+    if resultado['importadas']:
+        versoes_cadastros.registrar_alteracao(tabela.modelo.__tablename__)
+    return jsonify(resultado), 200
@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, Response
+from app.extensions import metricas, hub_eventos
+from app.referencias import cache_referencias
 from datetime import datetime
 
 bp = Blueprint('main', __name__)
@@ -11,4 +13,10 @@ def index():
 @bp.route('/status') # ROTA ALTERADA: de '/api/status' para '/status'
 def status():
     """ Rota de status da API """
-    return jsonify({"status": "OK", "timestamp": datetime.utcnow()})
\ No newline at end of file
+    return jsonify({"status": "OK", "timestamp": datetime.utcnow()})
+
+@bp.route('/metrics')
+def metrics():
+    """ Métricas do processo no formato de texto do Prometheus """
+    corpo = metricas.exportar() + cache_referencias.exportar_metricas() + hub_eventos.exportar_metricas()
+    return Response(corpo, mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,14 +1,61 @@
-from flask import Blueprint, jsonify, request
-from app.extensions import db
-from app.models import Viagem, RegistroOperacional
+import csv
+from flask import Blueprint, jsonify, request, current_app
+from app.extensions import db, hub_eventos
+from app.models import Viagem, RegistroOperacional, Onibus, Motorista, HorarioViagem
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from dateutil import parser
 from sqlalchemy.exc import IntegrityError
+from app.consultas import (
+    ParametroInvalido, parse_intervalo_datas, parse_limite, parse_inteiro,
+    codificar_cursor, filtro_keyset_desc
+)
+from app.serializacao import resposta_json, ESQUEMA_VIAGEM, ESQUEMA_REGISTRO
+from app.receita import mover_viagem
+from app.conflitos import conflitos_viagem, listar_conflitos, RECURSOS, NOMES_RECURSO
+from app.referencias import cache_referencias
+from app.horarios import aplicar_dados, gerar_viagens, horarios_para_gerar, parse_data
+from app.decorators import admin_required
+from app.planilhas import VIAGENS_CSV, LinhaInvalida, importar, ler_upload, resposta_csv
 
 bp = Blueprint('operacional', __name__)
 
 # --- API CRUD: Viagens ---
 
+def _publicar_status(viagem, status_anterior):
+    """ Evento 'viagem_status' do stream (app/eventos.py), depois do commit """
+    hub_eventos.publicar('viagem_status', {
+        'viagem_id': viagem.id,
+        'rota_id': viagem.rota_id,
+        'status': viagem.status,
+        'status_anterior': status_anterior,
+        'data_partida_prevista': viagem.data_partida_prevista,
+    })
+
+def _verificar_escala(viagem):
+    """
+    Valida o horário da viagem e procura conflitos de ônibus/motorista.
+    Retorna a resposta de erro (400/409) ou None se a escala estiver livre.
+    A viagem é gravada (flush) antes da busca: no SQLite a transação passa a
+    deter a trava de escrita, e nenhuma outra viagem entra entre a
+    verificação e o commit. Quem chama faz o rollback se houver erro.
+    """
+    if viagem.data_chegada_prevista <= viagem.data_partida_prevista:
+        return jsonify({'error': 'A chegada prevista deve ser depois da partida prevista.'}), 400
+    db.session.flush()
+    conflitos = conflitos_viagem(viagem)
+    if not conflitos:
+        return None
+    recursos = [nome for nome in RECURSOS if any(recurso == nome for recurso, _ in conflitos)]
+    return resposta_json({
+        'error': f"Escala em conflito: {' e '.join(NOMES_RECURSO[r] for r in recursos)} já em outra viagem no mesmo horário.",
+        'conflitos': [
+            {'recurso': recurso, 'viagem_id': outra.id,
+             'data_partida_prevista': outra.data_partida_prevista,
+             'data_chegada_prevista': outra.data_chegada_prevista}
+            for recurso, outra in conflitos
+        ]
+    }, 409)
+
 @bp.route('/viagens', methods=['POST'])
 @jwt_required()
 def create_viagem():
@@ -25,6 +72,10 @@ def create_viagem():
             status=data.get('status', 'Agendada')
         )
         db.session.add(nova_viagem)
+        erro = _verificar_escala(nova_viagem)
+        if erro is not None:
+            db.session.rollback()
+            return erro
         db.session.commit()
         return jsonify(nova_viagem.to_dict()), 201
     except IntegrityError:
@@ -37,13 +88,127 @@ def create_viagem():
 @bp.route('/viagens', methods=['GET'])
 @jwt_required()
 def get_viagens():
-    """ (LISTAR) Lista todas as viagens """
+    """
+    (LISTAR) Lista as viagens, da partida mais recente para a mais antiga.
+    Filtros (opcionais): ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD&status=&rota_id=&onibus_id=&motorista_id=
+    Paginação (opcional): ?limite=N&cursor=<next_cursor>
+    Campos (opcional): ?fields=id,status,... (só os campos pedidos)
+    Sem 'limite' devolve a lista completa; com 'limite' devolve {'items': [...], 'next_cursor': ...}.
+    """
     try:
-        viagens = Viagem.query.order_by(Viagem.data_partida_prevista.desc()).all()
-        return jsonify([v.to_dict() for v in viagens]), 200
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+        limite = parse_limite(request.args)
+        selecao = ESQUEMA_VIAGEM.selecionar(request.args)
+
+        # Só a tabela viagem: rota, ônibus e motorista saem do cache de referências
+        query = Viagem.query
+
+        if data_inicio:
+            query = query.filter(Viagem.data_partida_prevista >= data_inicio)
+        if data_fim:
+            query = query.filter(Viagem.data_partida_prevista <= data_fim)
+        if request.args.get('status'):
+            query = query.filter(Viagem.status == request.args['status'])
+        for campo in ('rota_id', 'onibus_id', 'motorista_id'):
+            valor = parse_inteiro(request.args, campo)
+            if valor is not None:
+                query = query.filter(getattr(Viagem, campo) == valor)
+
+        if request.args.get('cursor'):
+            query = query.filter(filtro_keyset_desc(Viagem.data_partida_prevista, Viagem.id, request.args['cursor']))
+
+        query = query.order_by(Viagem.data_partida_prevista.desc(), Viagem.id.desc())
+
+        if limite is None:
+            return resposta_json(selecao.lista(query))
+
+        # Busca um item a mais só para saber se existe próxima página; a chave
+        # do cursor vai como colunas extras, mesmo que não esteja em 'fields'
+        linhas = selecao.consulta(query, Viagem.data_partida_prevista, Viagem.id).limit(limite + 1).all()
+        next_cursor = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            next_cursor = codificar_cursor(linhas[-1][-2], linhas[-1][-1])
+
+        return resposta_json({'items': list(selecao.dicts(linhas)), 'next_cursor': next_cursor})
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/viagens/conflitos', methods=['GET'])
+@jwt_required()
+def get_conflitos_escala():
+    """
+    Lista os pares de viagens (não canceladas) que usam o mesmo ônibus ou
+    motorista em horários sobrepostos.
+    Filtros (opcionais): ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD (viagens que ocupam
+    algum momento do período) &recurso=onibus|motorista
+    """
+    try:
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    recursos = tuple(RECURSOS)
+    if request.args.get('recurso'):
+        if request.args['recurso'] not in RECURSOS:
+            return jsonify({'error': f"Recurso inválido. Use: {', '.join(RECURSOS)}."}), 400
+        recursos = (request.args['recurso'],)
+
+    conflitos = listar_conflitos(data_inicio, data_fim, recursos)
+    for conflito in conflitos:
+        if conflito['recurso'] == 'onibus':
+            onibus = cache_referencias.obter(Onibus, conflito['recurso_id'])
+            conflito['recurso_nome'] = onibus['numero_onibus'] if onibus else None
+        else:
+            motorista = cache_referencias.obter(Motorista, conflito['recurso_id'])
+            conflito['recurso_nome'] = motorista['nome_completo'] if motorista else None
+    return resposta_json(conflitos)
+
+@bp.route('/viagens/csv', methods=['GET'])
+@jwt_required()
+def exportar_viagens_csv():
+    """
+    Exporta as viagens em CSV (streaming), em ordem de partida.
+    Filtros (opcionais): ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD&status=
+    """
+    try:
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    query = VIAGENS_CSV.consulta().order_by(None)
+    if data_inicio:
+        query = query.filter(Viagem.data_partida_prevista >= data_inicio)
+    if data_fim:
+        query = query.filter(Viagem.data_partida_prevista <= data_fim)
+    if request.args.get('status'):
+        query = query.filter(Viagem.status == request.args['status'])
+    query = query.order_by(Viagem.data_partida_prevista, Viagem.id)
+    return resposta_csv(VIAGENS_CSV, 'viagens.csv', query)
+
+@bp.route('/viagens/csv', methods=['POST'])
+@admin_required()
+def importar_viagens_csv():
+    """
+    Importa viagens de um CSV (multipart no campo 'arquivo', ou o corpo em
+    text/csv) com as colunas da exportação ('id' é ignorado; 'status' é
+    opcional). Linhas inválidas, com referências inexistentes ou em conflito
+    de escala são puladas e listadas em 'erros'; as outras são gravadas.
+    """
+    try:
+        resultado = importar(ler_upload(request), VIAGENS_CSV)
+        db.session.commit()
+    except LinhaInvalida as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Arquivo CSV inválido (use UTF-8): {e}'}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Nenhuma viagem importada: conflito com um cadastro alterado durante a importação.'}), 409
+    return jsonify(resultado), 200
+
 @bp.route('/viagens/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_viagem(id):
@@ -52,6 +217,8 @@ def update_viagem(id):
     data = request.get_json()
 
     try:
+        rota_antiga_id = viagem.rota_id
+        status_anterior = viagem.status
         viagem.rota_id = data.get('rota_id', viagem.rota_id)
         viagem.onibus_id = data.get('onibus_id', viagem.onibus_id)
         viagem.motorista_id = data.get('motorista_id', viagem.motorista_id)
@@ -61,8 +228,20 @@ def update_viagem(id):
             viagem.data_partida_prevista = parser.parse(data['data_partida_prevista'])
         if 'data_chegada_prevista' in data:
             viagem.data_chegada_prevista = parser.parse(data['data_chegada_prevista'])
-            
+
+        if {'onibus_id', 'motorista_id', 'data_partida_prevista', 'data_chegada_prevista', 'status'} & set(data):
+            erro = _verificar_escala(viagem)
+            if erro is not None:
+                db.session.rollback()
+                return erro
+
+        # As vendas já feitas passam para a nova rota no agregado de receita
+        if viagem.rota_id != rota_antiga_id:
+            mover_viagem(viagem.id, rota_antiga_id, viagem.rota_id)
+
         db.session.commit()
+        if viagem.status != status_anterior:
+            _publicar_status(viagem, status_anterior)
         return jsonify(viagem.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -89,6 +268,119 @@ def delete_viagem(id):
         return jsonify({'error': str(e)}), 500
 
 
+# --- API CRUD: Modelos de horário (grade que gera viagens) ---
+
+@bp.route('/horarios', methods=['POST'])
+@jwt_required()
+def create_horario():
+    """
+    (CRIAR) Cria um modelo de horário.
+    Body: {"rota_id", "onibus_id", "motorista_id", "hora_partida": "HH:MM", "duracao_minutos",
+           "dias_semana": [1, 2, 3, 4, 5] (0 = domingo; padrão: todos), "vigente_de", "vigente_ate",
+           "ativo"}
+    """
+    horario = HorarioViagem()
+    try:
+        aplicar_dados(horario, request.get_json() or {})
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    db.session.add(horario)
+    db.session.commit()
+    return jsonify(horario.to_dict()), 201
+
+@bp.route('/horarios', methods=['GET'])
+@jwt_required()
+def get_horarios():
+    """ (LISTAR) Lista os modelos de horário. Filtros (opcionais): ?rota_id=&ativo=1|0 """
+    try:
+        rota_id = parse_inteiro(request.args, 'rota_id')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    query = HorarioViagem.query
+    if rota_id is not None:
+        query = query.filter(HorarioViagem.rota_id == rota_id)
+    if request.args.get('ativo') in ('0', '1'):
+        query = query.filter(HorarioViagem.ativo.is_(request.args['ativo'] == '1'))
+    horarios = query.order_by(HorarioViagem.rota_id, HorarioViagem.hora_partida, HorarioViagem.id).all()
+    return resposta_json([horario.to_dict() for horario in horarios])
+
+@bp.route('/horarios/<int:id>', methods=['GET'])
+@jwt_required()
+def get_horario(id):
+    return jsonify(HorarioViagem.query.get_or_404(id).to_dict()), 200
+
+@bp.route('/horarios/<int:id>', methods=['PUT'])
+@jwt_required()
+def update_horario(id):
+    """ (ATUALIZAR) Atualiza um modelo de horário. As viagens já geradas não mudam. """
+    horario = HorarioViagem.query.get_or_404(id)
+    try:
+        aplicar_dados(horario, request.get_json() or {})
+    except ParametroInvalido as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    return jsonify(horario.to_dict()), 200
+
+@bp.route('/horarios/<int:id>', methods=['DELETE'])
+@jwt_required()
+def delete_horario(id):
+    """ (DELETAR) Deleta um modelo de horário. As viagens já geradas ficam. """
+    horario = HorarioViagem.query.get_or_404(id)
+    db.session.delete(horario)
+    db.session.commit()
+    return jsonify({'message': 'Horário deletado'}), 200
+
+@bp.route('/horarios/gerar', methods=['POST'])
+@admin_required()
+def gerar_viagens_horarios():
+    """
+    Gera as viagens dos modelos de horário ativos num período, em lote.
+    Body: {"data_inicio": "YYYY-MM-DD", "data_fim": "YYYY-MM-DD",
+           "horario_ids": [...] (opcional, padrão: todos os ativos),
+           "simular": false (true = só mostra o que seria criado)}
+    Viagens que já existem (mesma rota e partida) são puladas; as que
+    chocariam com a escala do ônibus/motorista não são criadas e vêm em 'conflitos'.
+    """
+    data = request.get_json() or {}
+    try:
+        data_inicio = parse_data(data.get('data_inicio'), 'data_inicio')
+        data_fim = parse_data(data.get('data_fim'), 'data_fim')
+        if data_fim < data_inicio:
+            raise ParametroInvalido("'data_fim' não pode ser antes de 'data_inicio'.")
+        max_dias = current_app.config['GERADOR_VIAGENS_MAX_DIAS']
+        if (data_fim - data_inicio).days + 1 > max_dias:
+            raise ParametroInvalido(f'O período pode ter no máximo {max_dias} dias.')
+        ids = data.get('horario_ids')
+        if ids is not None:
+            try:
+                ids = [int(id) for id in ids]
+            except (TypeError, ValueError):
+                raise ParametroInvalido("'horario_ids' deve ser uma lista de inteiros.")
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    simular = bool(data.get('simular', False))
+
+    try:
+        resultado = gerar_viagens(horarios_para_gerar(ids), data_inicio, data_fim, simular=simular)
+        if not simular:
+            db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Erro de integridade, verifique os modelos de horário.'}), 400
+
+    resposta = {
+        'simulacao': simular,
+        # Viagens criadas (ou que seriam criadas, na simulação)
+        'novas': len(resultado['viagens']),
+        'existentes': resultado['existentes'],
+        'conflitos': resultado['conflitos'],
+    }
+    if simular:
+        resposta['viagens'] = [dict(linha, horario_id=horario_id) for horario_id, linha in resultado['viagens']]
+    return resposta_json(resposta, 200 if simular else 201)
+
+
 # --- API CRUD: Registros Operacionais ---
 
 @bp.route('/registros', methods=['POST'])
@@ -120,13 +412,19 @@ def create_registro():
         db.session.add(novo_registro)
         
         # Atualiza o status da viagem se foi fornecido
+        viagem, status_anterior = None, None
         if 'novo_status_viagem' in data:
             viagem = Viagem.query.get(data['viagem_id'])
             if viagem:
+                status_anterior = viagem.status
                 viagem.status = data['novo_status_viagem']
             
         db.session.commit()
-        return jsonify(novo_registro.to_dict()), 201
+        registro = novo_registro.to_dict()
+        hub_eventos.publicar('registro', registro)
+        if viagem is not None and viagem.status != status_anterior:
+            _publicar_status(viagem, status_anterior)
+        return jsonify(registro), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
@@ -134,10 +432,13 @@ def create_registro():
 @bp.route('/registros', methods=['GET'])
 @jwt_required()
 def get_registros():
-    """ (LISTAR) Lista todos os registros """
+    """ (LISTAR) Lista todos os registros. Campos (opcional): ?fields=id,viagem_id,... """
     try:
-        registros = RegistroOperacional.query.order_by(RegistroOperacional.id.desc()).all()
-        return jsonify([r.to_dict() for r in registros]), 200
+        selecao = ESQUEMA_REGISTRO.selecionar(request.args)
+        query = RegistroOperacional.query.order_by(RegistroOperacional.id.desc())
+        return resposta_json(selecao.lista(query))
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,21 +1,110 @@
 import io
-from flask import Blueprint, request, jsonify, send_file
+import json
+import tempfile
+from flask import Blueprint, request, jsonify, send_file, url_for, Response
+from werkzeug.http import is_resource_modified
 from app import db
-from app.models import CaixaDiario, Viagem, Usuario
+from app.extensions import fila_relatorios
+from app.cache import CacheTTL, AUSENTE
+from app.referencias import cache_referencias
+from app.serializacao import resposta_json
+from app import receita, analises
+from app.models import CaixaDiario, Viagem, Usuario, Rota, Motorista, Onibus
+from app.renderizacao import (
+    renderizar_fecho_caixa_pdf, renderizar_viagens_docx, renderizar_caixas_consolidado_pdf,
+    MIMETYPE_PDF, MIMETYPE_DOCX
+)
+from app.consultas import ParametroInvalido, parse_intervalo_datas, parse_inteiro
 from flask_jwt_extended import jwt_required
 from dateutil import parser
 from datetime import datetime
 
-# Libs para PDF
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
+bp = Blueprint('relatorios', __name__)
 
-# Libs para DOCX
-from docx import Document
-from docx.shared import Inches
+# PDFs de fecho de caixas já fechados (não mudam mais). Limitado em bytes:
+# os usados há mais tempo saem primeiro quando passa do limite.
+cache_pdfs_caixa = CacheTTL(max_itens=4096, ttl=24 * 3600, max_bytes=64 * 2**20)
+
+
+class DadosRelatorioInvalidos(ValueError):
+    """ Parâmetros de relatório inválidos (vira um 400) """
+    pass
+
+
+def _dados_fecho_caixa(caixa):
+    """ Dados do caixa usados no PDF de fecho (dict simples, sem objetos ORM) """
+    return {
+        'id': caixa.id,
+        'bilheteiro_nome': caixa.bilheteiro.nome_completo if caixa.bilheteiro else None,
+        'status': caixa.status,
+        'data_abertura': caixa.data_abertura,
+        'data_fechamento': caixa.data_fechamento,
+        'saldo_inicial': caixa.saldo_inicial,
+        'total_vendas_dinheiro': caixa.total_vendas_dinheiro,
+        'total_vendas_pix': caixa.total_vendas_pix,
+        'total_vendas_cartao': caixa.total_vendas_cartao,
+        'total_geral_vendas': caixa.total_geral_vendas
+    }
+
+
+def _periodo_relatorio_viagens(data_inicio_str, data_fim_str):
+    """ Valida o período do relatório. Retorna (data_inicio, data_fim, periodo_str); datas podem ser None. """
+    data_inicio = data_fim = None
+    periodo_str = "Período: Todas as viagens"
+
+    try:
+        if data_inicio_str:
+            data_inicio = parser.parse(data_inicio_str).replace(hour=0, minute=0, second=0)
+            periodo_str = f"Período de: {data_inicio.strftime('%d/%m/%Y')}"
+
+        if data_fim_str:
+            data_fim = parser.parse(data_fim_str).replace(hour=23, minute=59, second=59)
+
+            if data_inicio_str:
+                periodo_str += f" até {data_fim.strftime('%d/%m/%Y')}"
+            else:
+                periodo_str = f"Período até: {data_fim.strftime('%d/%m/%Y')}"
+
+    except Exception as e:
+        raise DadosRelatorioInvalidos(f"Formato de data inválido: {e}")
+    return data_inicio, data_fim, periodo_str
+
+
+def _dados_relatorio_viagens(data_inicio_str, data_fim_str):
+    """
+    Busca as viagens do relatório numa única query só na tabela viagem, com as
+    colunas usadas; rota, motorista e ônibus saem do cache de referências.
+    Retorna (periodo_str, linhas), com as linhas já formatadas como texto.
+    """
+    data_inicio, data_fim, periodo_str = _periodo_relatorio_viagens(data_inicio_str, data_fim_str)
+    query = db.session.query(
+        Viagem.id,
+        Viagem.rota_id,
+        Viagem.motorista_id,
+        Viagem.onibus_id,
+        Viagem.data_partida_prevista,
+        Viagem.status
+    ).order_by(Viagem.data_partida_prevista.desc())
+    if data_inicio:
+        query = query.filter(Viagem.data_partida_prevista >= data_inicio)
+    if data_fim:
+        query = query.filter(Viagem.data_partida_prevista <= data_fim)
+
+    linhas = []
+    for v in query:
+        rota = cache_referencias.obter(Rota, v.rota_id)
+        motorista = cache_referencias.obter(Motorista, v.motorista_id)
+        onibus = cache_referencias.obter(Onibus, v.onibus_id)
+        linhas.append((
+            str(v.id),
+            f"{rota['origem']} - {rota['destino']}" if rota else "N/A",
+            v.data_partida_prevista.strftime('%d/%m/%Y %H:%M'),
+            motorista['nome_completo'] if motorista else "N/A",
+            onibus['numero_onibus'] if onibus else "N/A",
+            v.status or ""
+        ))
+    return periodo_str, linhas
 
-bp = Blueprint('relatorios', __name__)
 
 @bp.route('/caixa/<int:caixa_id>/pdf', methods=['GET'])
 @jwt_required()
@@ -24,65 +113,39 @@ def relatorio_fecho_caixa_pdf(caixa_id):
     Gera um relatório PDF para um fecho de caixa específico.
     """
     caixa = CaixaDiario.query.get_or_404(caixa_id)
-    
-    # Cria um buffer de bytes na memória para o PDF
-    buffer = io.BytesIO()
-    
-    # Cria o canvas do PDF
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4 # (595.27, 841.89)
-    
-    # --- Conteúdo do PDF ---
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2.0, height - 2*cm, f"Relatório de Fecho de Caixa - ID: {caixa.id}")
-    
-    c.setFont("Helvetica", 12)
-    y_pos = height - 3.5*cm
-    
-    # Função auxiliar para desenhar linhas
-    def draw_line(label, value, y):
-        c.drawString(2*cm, y, f"{label}:")
-        c.drawString(7*cm, y, value)
-        return y - 0.7*cm
-
-    y_pos = draw_line("Bilheteiro", f"{caixa.bilheteiro.nome_completo if caixa.bilheteiro else 'N/A'}", y_pos)
-    y_pos = draw_line("Status", caixa.status, y_pos)
-    y_pos = draw_line("Abertura", f"{caixa.data_abertura.strftime('%d/%m/%Y %H:%M')}", y_pos)
-    
-    if caixa.data_fechamento:
-        y_pos = draw_line("Fechamento", f"{caixa.data_fechamento.strftime('%d/%m/%Y %H:%M')}", y_pos)
-    
-    y_pos -= 0.5*cm # Espaçamento
-    
-    c.setFont("Helvetica-Bold", 12)
-    y_pos = draw_line("Valores", "", y_pos)
-    c.setFont("Helvetica", 12)
-
-    y_pos = draw_line("Saldo Inicial", f"R$ {caixa.saldo_inicial:.2f}", y_pos)
-    y_pos = draw_line("Vendas (Dinheiro)", f"R$ {caixa.total_vendas_dinheiro:.2f}", y_pos)
-    y_pos = draw_line("Vendas (Pix)", f"R$ {caixa.total_vendas_pix:.2f}", y_pos)
-    y_pos = draw_line("Vendas (Cartão)", f"R$ {caixa.total_vendas_cartao:.2f}", y_pos)
-    
-    y_pos -= 0.2*cm
-    c.setStrokeColorRGB(0,0,0)
-    c.line(2*cm, y_pos, width - 2*cm, y_pos) # Linha horizontal
-    y_pos -= 0.7*cm
-    
-    c.setFont("Helvetica-Bold", 14)
-    y_pos = draw_line("Total Geral em Vendas", f"R$ {caixa.total_geral_vendas:.2f}", y_pos)
-    # --- Fim do Conteúdo ---
-
-    c.showPage()
-    c.save()
-    
-    # Retorna o buffer ao início
-    buffer.seek(0)
-    
+
+    if caixa.status != 'Fechado' or not caixa.data_fechamento:
+        # Caixa aberto: os totais ainda mudam, gera sempre na hora
+        pdf = renderizar_fecho_caixa_pdf(_dados_fecho_caixa(caixa))
+        return send_file(
+            io.BytesIO(pdf),
+            as_attachment=True,
+            download_name=f'relatorio_caixa_{caixa_id}.pdf',
+            mimetype=MIMETYPE_PDF
+        )
+
+    # Caixa fechado não muda mais: o PDF é identificado por (id, data_fechamento)
+    etag = f'caixa-{caixa.id}-{caixa.data_fechamento.strftime("%Y%m%d%H%M%S%f")}'
+    if not is_resource_modified(request.environ, etag=etag, last_modified=caixa.data_fechamento):
+        resposta = Response(status=304)
+        resposta.set_etag(etag)
+        resposta.last_modified = caixa.data_fechamento
+        return resposta
+
+    chave = (caixa.id, caixa.data_fechamento)
+    pdf = cache_pdfs_caixa.obter(chave)
+    if pdf is AUSENTE:
+        pdf = renderizar_fecho_caixa_pdf(_dados_fecho_caixa(caixa))
+        cache_pdfs_caixa.definir(chave, pdf)
+
     return send_file(
-        buffer,
+        io.BytesIO(pdf),
         as_attachment=True,
         download_name=f'relatorio_caixa_{caixa_id}.pdf',
-        mimetype='application/pdf'
+        mimetype=MIMETYPE_PDF,
+        etag=etag,
+        last_modified=caixa.data_fechamento,
+        conditional=False
     )
 
 @bp.route('/viagens/docx', methods=['GET'])
@@ -91,74 +154,303 @@ def relatorio_viagens_docx():
     """
     Gera um relatório DOCX das viagens (opcionalmente filtradas por data).
     Query Params: ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD
+
+    Os dados vêm de uma única query só na tabela viagem, com as colunas
+    usadas; rota, ônibus e motorista saem do cache de referências. As linhas
+    da tabela são escritas em blocos de XML (ver renderizacao.py).
+    O tempo de geração cresce linearmente com o número de viagens (~20.000
+    linhas/s). A memória de pico também, porque o documento inteiro fica em
+    memória até ser salvo: ~8-9 MB de RSS por 1.000 viagens (ex.: ~90 MB para
+    10.000 e ~420 MB para 50.000), medido com benchmarks/relatorio_docx.py.
+    Para períodos grandes, prefira o job assíncrono (POST /jobs).
     """
-    data_inicio_str = request.args.get('data_inicio')
-    data_fim_str = request.args.get('data_fim')
-    
-    query = Viagem.query.order_by(Viagem.data_partida_prevista.desc())
-    
-    periodo_str = "Período: Todas as viagens"
-    
     try:
-        if data_inicio_str:
-            data_inicio = parser.parse(data_inicio_str).replace(hour=0, minute=0, second=0)
-            query = query.filter(Viagem.data_partida_prevista >= data_inicio)
-            periodo_str = f"Período de: {data_inicio.strftime('%d/%m/%Y')}"
-            
-        if data_fim_str:
-            data_fim = parser.parse(data_fim_str).replace(hour=23, minute=59, second=59)
-            query = query.filter(Viagem.data_partida_prevista <= data_fim)
-            
-            if data_inicio_str:
-                periodo_str += f" até {data_fim.strftime('%d/%m/%Y')}"
-            else:
-                periodo_str = f"Período até: {data_fim.strftime('%d/%m/%Y')}"
-                
-    except Exception as e:
-        return jsonify({"error": f"Formato de data inválido: {e}"}), 400
-
-    viagens = query.all()
-    
-    # Cria documento DOCX na memória
-    document = Document()
-    buffer = io.BytesIO()
-
-    # --- Conteúdo do DOCX ---
-    document.add_heading('Relatório de Viagens', 0)
-    document.add_paragraph(periodo_str)
-    document.add_paragraph(f"Total de viagens encontradas: {len(viagens)}")
-    
-    if len(viagens) > 0:
-        table = document.add_table(rows=1, cols=6)
-        table.style = 'Table Grid'
-        
-        # Cabeçalho
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'ID'
-        hdr_cells[1].text = 'Rota (Origem-Destino)'
-        hdr_cells[2].text = 'Partida Prevista'
-        hdr_cells[3].text = 'Motorista'
-        hdr_cells[4].text = 'Ônibus (Nº)'
-        hdr_cells[5].text = 'Status'
-        
-        # Adiciona dados
-        for v in viagens:
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(v.id)
-            row_cells[1].text = f"{v.rota.origem} - {v.rota.destino}" if v.rota else "N/A"
-            row_cells[2].text = v.data_partida_prevista.strftime('%d/%m/%Y %H:%M')
-            row_cells[3].text = v.motorista.nome_completo if v.motorista else "N/A"
-            row_cells[4].text = v.onibus.numero_onibus if v.onibus else "N/A"
-            row_cells[5].text = v.status
-            
-    # --- Fim do Conteúdo ---
-    
-    document.save(buffer)
-    buffer.seek(0)
-    
+        periodo_str, linhas = _dados_relatorio_viagens(
+            request.args.get('data_inicio'), request.args.get('data_fim'))
+    except DadosRelatorioInvalidos as e:
+        return jsonify({"error": str(e)}), 400
+
+    docx = renderizar_viagens_docx(periodo_str, linhas)
+
     return send_file(
-        buffer,
+        io.BytesIO(docx),
         as_attachment=True,
         download_name='relatorio_viagens.docx',
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    )
\ No newline at end of file
+        mimetype=MIMETYPE_DOCX
+    )
+
+
+@bp.route('/caixas/pdf', methods=['GET'])
+@jwt_required()
+def relatorio_caixas_consolidado_pdf():
+    """
+    Gera um único PDF com o fecho de todos os caixas abertos no período, com
+    subtotais por bilheteiro e total geral.
+    Query Params: ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD&bilheteiro_id=N (todos opcionais)
+
+    Os caixas vêm de uma única query (caixa + nome do bilheteiro), lida do
+    cursor em blocos; subtotais e total geral são somados das mesmas linhas
+    durante a renderização, então batem sempre com elas, mesmo com caixas
+    abertos a receber vendas. O PDF é gravado num arquivo temporário (em
+    memória só até 8 MB) e enviado dali.
+    """
+    try:
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+        bilheteiro_id = parse_inteiro(request.args, 'bilheteiro_id')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = db.session.query(
+        CaixaDiario.bilheteiro_id,
+        Usuario.nome_completo.label('bilheteiro_nome'),
+        CaixaDiario.id,
+        CaixaDiario.data_abertura,
+        CaixaDiario.data_fechamento,
+        CaixaDiario.total_vendas_dinheiro,
+        CaixaDiario.total_vendas_pix,
+        CaixaDiario.total_vendas_cartao,
+        CaixaDiario.total_geral_vendas
+    ).outerjoin(Usuario, CaixaDiario.bilheteiro_id == Usuario.id)
+
+    filtros = []
+    periodo_str = "Período: Todos os caixas"
+    if data_inicio:
+        filtros.append(CaixaDiario.data_abertura >= data_inicio)
+    if data_fim:
+        filtros.append(CaixaDiario.data_abertura <= data_fim)
+    if data_inicio and data_fim:
+        periodo_str = f"Período de: {data_inicio.strftime('%d/%m/%Y')} até {data_fim.strftime('%d/%m/%Y')}"
+    elif data_inicio:
+        periodo_str = f"Período de: {data_inicio.strftime('%d/%m/%Y')}"
+    elif data_fim:
+        periodo_str = f"Período até: {data_fim.strftime('%d/%m/%Y')}"
+
+    if bilheteiro_id is not None:
+        filtros.append(CaixaDiario.bilheteiro_id == bilheteiro_id)
+
+    # Agrupado por bilheteiro (a renderização escreve o subtotal ao mudar de bilheteiro)
+    query = query.filter(*filtros).order_by(Usuario.nome_completo, CaixaDiario.bilheteiro_id, CaixaDiario.data_abertura)
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=8 * 2**20)
+    renderizar_caixas_consolidado_pdf(arquivo, periodo_str, query.yield_per(500))
+    arquivo.seek(0)
+
+    return send_file(
+        arquivo,
+        as_attachment=True,
+        download_name='relatorio_caixas_consolidado.pdf',
+        mimetype=MIMETYPE_PDF
+    )
+
+
+@bp.route('/receita', methods=['GET'])
+@jwt_required()
+def relatorio_receita():
+    """
+    Receita (quantidade de bilhetes e valor) por dia, rota, bilheteiro e/ou
+    método de pagamento, lida do agregado diário (receita_diaria) em vez das vendas.
+    Query Params (todos opcionais):
+      ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD
+      &agrupar=data,rota,bilheteiro,metodo_pagamento   (padrão: data,rota,metodo_pagamento)
+      &rota_id=N&bilheteiro_id=N&metodo_pagamento=Pix
+    """
+    try:
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+        filtros = {}
+        for dimensao, parametro in (('rota', 'rota_id'), ('bilheteiro', 'bilheteiro_id')):
+            valor = parse_inteiro(request.args, parametro)
+            if valor is not None:
+                filtros[dimensao] = valor
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    agrupar = ('data', 'rota', 'metodo_pagamento')
+    if 'agrupar' in request.args:
+        agrupar = tuple(dict.fromkeys(n.strip() for n in request.args['agrupar'].split(',') if n.strip()))
+        invalidas = [n for n in agrupar if n not in receita.DIMENSOES]
+        if invalidas:
+            return jsonify({'error': f"Dimensão inválida em 'agrupar': {', '.join(invalidas)}. "
+                                     f"Disponíveis: {', '.join(receita.DIMENSOES)}."}), 400
+
+    if request.args.get('metodo_pagamento'):
+        filtros['metodo_pagamento'] = request.args['metodo_pagamento']
+
+    linhas = receita.consultar(data_inicio.date() if data_inicio else None,
+                               data_fim.date() if data_fim else None, agrupar, filtros)
+
+    nomes_bilheteiros = {}
+    if 'bilheteiro' in agrupar:
+        ids = {linha[agrupar.index('bilheteiro')] for linha in linhas}
+        nomes_bilheteiros = dict(db.session.query(Usuario.id, Usuario.nome_completo).filter(Usuario.id.in_(ids)))
+
+    itens = []
+    quantidade_total = 0
+    valor_total = 0.0
+    for linha in linhas:
+        item = {}
+        for dimensao, valor in zip(agrupar, linha):
+            if dimensao == 'rota':
+                rota = cache_referencias.obter(Rota, valor)
+                item['rota_id'] = valor
+                item['rota'] = f"{rota['origem']} - {rota['destino']}" if rota else None
+            elif dimensao == 'bilheteiro':
+                item['bilheteiro_id'] = valor
+                item['bilheteiro_nome'] = nomes_bilheteiros.get(valor)
+            else:
+                item[dimensao] = valor
+        item['quantidade'] = linha[-2]
+        item['total'] = round(linha[-1], 2)
+        quantidade_total += linha[-2]
+        valor_total += linha[-1]
+        itens.append(item)
+
+    return resposta_json({
+        'data_inicio': data_inicio.date() if data_inicio else None,
+        'data_fim': data_fim.date() if data_fim else None,
+        'agrupar': list(agrupar),
+        'itens': itens,
+        'total': {'quantidade': quantidade_total, 'total': round(valor_total, 2)},
+    })
+
+
+@bp.route('/ocupacao', methods=['GET'])
+@jwt_required()
+def relatorio_ocupacao():
+    """
+    Lotação e fator de carga das viagens com registro operacional, no total e
+    por rota, ônibus, dia da semana e hora da partida prevista.
+    Query Params (todos opcionais):
+      ?data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD   (período da partida prevista)
+      &dimensoes=rota,onibus,dia_semana,hora         (padrão: todas)
+      &rota_id=N&onibus_id=N
+    """
+    try:
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+        rota_id = parse_inteiro(request.args, 'rota_id')
+        onibus_id = parse_inteiro(request.args, 'onibus_id')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    dimensoes = tuple(analises.DIMENSOES)
+    if 'dimensoes' in request.args:
+        dimensoes = tuple(dict.fromkeys(n.strip() for n in request.args['dimensoes'].split(',') if n.strip()))
+        invalidas = [n for n in dimensoes if n not in analises.DIMENSOES]
+        if invalidas:
+            return jsonify({'error': f"Dimensão inválida em 'dimensoes': {', '.join(invalidas)}. "
+                                     f"Disponíveis: {', '.join(analises.DIMENSOES)}."}), 400
+
+    matriz = analises.carregar_registros(data_inicio, data_fim, rota_id, onibus_id)
+    resultado = analises.analisar(matriz, dimensoes)
+
+    # Nomes legíveis das chaves (poucas linhas por dimensão)
+    for item in resultado.get('por_rota', []):
+        rota = cache_referencias.obter(Rota, item['rota'])
+        item['rota_id'] = item.pop('rota')
+        item['rota'] = f"{rota['origem']} - {rota['destino']}" if rota else None
+    for item in resultado.get('por_onibus', []):
+        onibus = cache_referencias.obter(Onibus, item['onibus'])
+        item['onibus_id'] = item.pop('onibus')
+        item['numero_onibus'] = onibus['numero_onibus'] if onibus else None
+    for item in resultado.get('por_dia_semana', []):
+        item['nome'] = analises.NOMES_DIA_SEMANA[item['dia_semana']]
+
+    resultado['data_inicio'] = data_inicio.date() if data_inicio else None
+    resultado['data_fim'] = data_fim.date() if data_fim else None
+    return resposta_json(resultado)
+
+
+# --- Jobs assíncronos de relatório ---
+#
+# As funções _job_* correm no processo do pool (ver app/jobs.py), com um app
+# context próprio: a consulta e a renderização saem do pedido HTTP, que só
+# valida os parâmetros.
+
+def _job_viagens_docx(data_inicio_str, data_fim_str):
+    return renderizar_viagens_docx(*_dados_relatorio_viagens(data_inicio_str, data_fim_str))
+
+
+def _job_fecho_caixa_pdf(caixa_id):
+    caixa = db.session.get(CaixaDiario, caixa_id)
+    if caixa is None:
+        raise ValueError(f'Caixa {caixa_id} não encontrado.')
+    return renderizar_fecho_caixa_pdf(_dados_fecho_caixa(caixa))
+
+
+@bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def criar_job_relatorio():
+    """
+    Agenda a geração de um relatório e retorna o job (202).
+    Body: {"tipo": "viagens_docx", "parametros": {"data_inicio": "...", "data_fim": "..."}}
+      ou: {"tipo": "fecho_caixa_pdf", "parametros": {"caixa_id": 1}}
+    Um pedido igual a um job ainda em curso devolve esse mesmo job, sem
+    nenhuma consulta ao banco.
+    """
+    data = request.get_json() or {}
+    tipo = data.get('tipo')
+    parametros = data.get('parametros') or {}
+
+    if tipo == 'viagens_docx':
+        parametros = {chave: parametros.get(chave) for chave in ('data_inicio', 'data_fim')}
+    elif tipo == 'fecho_caixa_pdf':
+        try:
+            parametros = {'caixa_id': int(parametros['caixa_id'])}
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'caixa_id é obrigatório'}), 400
+    else:
+        return jsonify({'error': "Tipo de relatório inválido. Use 'viagens_docx' ou 'fecho_caixa_pdf'."}), 400
+
+    chave = tipo + ':' + json.dumps(parametros, sort_keys=True)
+    job = fila_relatorios.em_curso(chave)
+    if job is not None:
+        return jsonify(_job_to_dict(job)), 202
+
+    if tipo == 'viagens_docx':
+        try:
+            _periodo_relatorio_viagens(parametros['data_inicio'], parametros['data_fim'])
+        except DadosRelatorioInvalidos as e:
+            return jsonify({"error": str(e)}), 400
+        fn, args = _job_viagens_docx, (parametros['data_inicio'], parametros['data_fim'])
+        nome_arquivo, mimetype = 'relatorio_viagens.docx', MIMETYPE_DOCX
+    else:
+        # Só a existência (chave primária); os dados são lidos no processo do job
+        if db.session.query(CaixaDiario.id).filter_by(id=parametros['caixa_id']).first() is None:
+            return jsonify({'error': 'Caixa não encontrado'}), 404
+        fn, args = _job_fecho_caixa_pdf, (parametros['caixa_id'],)
+        nome_arquivo, mimetype = f"relatorio_caixa_{parametros['caixa_id']}.pdf", MIMETYPE_PDF
+
+    job = fila_relatorios.submeter(tipo, chave, nome_arquivo, mimetype, fn, *args)
+    return jsonify(_job_to_dict(job)), 202
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job_relatorio(job_id):
+    """ Estado de um job de relatório """
+    job = fila_relatorios.obter(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado ou expirado.'}), 404
+    return jsonify(_job_to_dict(job)), 200
+
+@bp.route('/jobs/<job_id>/arquivo', methods=['GET'])
+@jwt_required()
+def download_job_relatorio(job_id):
+    """ Download do arquivo de um job concluído """
+    job = fila_relatorios.obter(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado ou expirado.'}), 404
+    if job.status != 'concluido':
+        return jsonify({'error': f'O relatório ainda não está disponível (status: {job.status}).', 'job': _job_to_dict(job)}), 409
+
+    return send_file(
+        job.caminho,
+        as_attachment=True,
+        download_name=job.nome_arquivo,
+        mimetype=job.mimetype
+    )
+
+def _job_to_dict(job):
+    dados = job.to_dict()
+    dados['status_url'] = url_for('relatorios.get_job_relatorio', job_id=job.id)
+    dados['download_url'] = url_for('relatorios.download_job_relatorio', job_id=job.id) \
+        if dados['status'] == 'concluido' else None
+    return dados
@@ -0,0 +1,54 @@
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import jwt_required
+from app.consultas import ParametroInvalido
+from app.extensions import db
+from app.serializacao import resposta_json, Selecao
+from app.sincronizacao import RECURSOS, alteracoes, disponivel
+from app.decorators import admin_required
+
+bp = Blueprint('sincronizacao', __name__)
+
+
+def _resposta_alteracoes(recurso):
+    """
+    Alterações de um recurso depois de ?cursor=N (0 ou ausente: desde o início,
+    ou seja, todos os registros). ?limite=N alterações por página (máximo
+    SINCRONIZACAO_LIMITE) e ?fields= como na listagem ('id' sempre vem).
+    """
+    if not disponivel(db.engine.dialect.name):
+        return jsonify({'error': 'Sincronização incremental disponível apenas com SQLite.'}), 501
+    modelo, esquema = RECURSOS[recurso]
+    maximo = current_app.config['SINCRONIZACAO_LIMITE']
+    try:
+        try:
+            cursor = int(request.args.get('cursor') or 0)
+            limite = min(int(request.args.get('limite') or maximo), maximo)
+        except ValueError:
+            raise ParametroInvalido("Os parâmetros 'cursor' e 'limite' devem ser inteiros.")
+        if cursor < 0 or limite < 1:
+            raise ParametroInvalido("'cursor' não pode ser negativo e 'limite' deve ser maior que zero.")
+        selecao = esquema.selecionar(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    if 'id' not in selecao.nomes:
+        # Sem o id o cliente não sabe qual registro local atualizar
+        selecao = Selecao(esquema, ('id',) + selecao.nomes)
+    return resposta_json(alteracoes(modelo, selecao, cursor, limite))
+
+# --- Alterações desde um cursor (upserts e tombstones) ---
+
+@bp.route('/usuarios', methods=['GET'])
+@admin_required() # Protegido
+def get_alteracoes_usuarios():
+    return _resposta_alteracoes('usuarios')
+
+@bp.route('/<any(motoristas, onibus, rotas, viagens, horarios, registros, vendas, caixas):recurso>', methods=['GET'])
+@jwt_required()
+def get_alteracoes(recurso):
+    """
+    Resposta: {"upserts": [registros novos ou alterados, no formato da listagem],
+               "tombstones": [ids apagados], "cursor": N, "mais": true|false}
+    O cliente aplica a página na sua cópia local e guarda 'cursor' para o
+    próximo pedido; com "mais": true, pede de novo logo em seguida.
+    """
+    return _resposta_alteracoes(recurso)
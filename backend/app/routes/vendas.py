@@ -1,12 +1,23 @@
-from flask import Blueprint, jsonify, request
-from app.extensions import db
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from app.extensions import db, hub_eventos
 from app.models import Venda, CaixaDiario
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy import func, insert
 from sqlalchemy.exc import IntegrityError
+from app.ocupacao import mapa_ocupacao, capacidade_viagem, poltronas_ocupadas
+from app.receita import registrar_vendas
+from app.consultas import (
+    ParametroInvalido, parse_intervalo_datas, parse_limite, parse_inteiro,
+    codificar_cursor, filtro_keyset_desc
+)
+from app.serializacao import dumps, resposta_json, ESQUEMA_VENDA, ESQUEMA_CAIXA
 
 bp = Blueprint('vendas', __name__)
 
+# Quantas linhas o cursor do banco entrega por vez na listagem em streaming
+TAMANHO_LOTE_STREAMING = 500
+
 # --- API: Caixa Diário ---
 
 @bp.route('/caixa/abrir', methods=['POST'])
@@ -28,7 +39,9 @@ def abrir_caixa():
         )
         db.session.add(novo_caixa)
         db.session.commit()
-        return jsonify(novo_caixa.to_dict()), 201
+        caixa = novo_caixa.to_dict()
+        hub_eventos.publicar('caixa', caixa)
+        return jsonify(caixa), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
@@ -47,7 +60,9 @@ def fechar_caixa():
         caixa.status = 'Fechado'
         caixa.data_fechamento = datetime.utcnow()
         db.session.commit()
-        return jsonify(caixa.to_dict()), 200
+        dados = caixa.to_dict()
+        hub_eventos.publicar('caixa', dados)
+        return jsonify(dados), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -55,10 +70,13 @@ def fechar_caixa():
 @bp.route('/caixa', methods=['GET'])
 @jwt_required()
 def get_caixas():
-    """ (LISTAR) Lista todos os caixas (histórico) """
+    """ (LISTAR) Lista todos os caixas (histórico). Campos (opcional): ?fields=id,status,... """
     try:
-        caixas = CaixaDiario.query.order_by(CaixaDiario.data_abertura.desc()).all()
-        return jsonify([c.to_dict() for c in caixas]), 200
+        selecao = ESQUEMA_CAIXA.selecionar(request.args)
+        query = CaixaDiario.query.order_by(CaixaDiario.data_abertura.desc())
+        return resposta_json(selecao.lista(query))
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -75,6 +93,34 @@ def get_caixa_ativo():
 
 # --- API: Vendas ---
 
+# Coluna do caixa que acumula cada método de pagamento
+COLUNAS_TOTAL_POR_METODO = {
+    'Dinheiro': CaixaDiario.total_vendas_dinheiro,
+    'Pix': CaixaDiario.total_vendas_pix,
+    'Cartão': CaixaDiario.total_vendas_cartao,
+}
+
+def _somar_totais_caixa(caixa_id, valores_por_metodo):
+    """
+    Soma valores aos totais de um caixa aberto com um único UPDATE
+    (total = total + valor), calculado pelo próprio banco. Assim, duas vendas
+    simultâneas no mesmo caixa não sobrescrevem o total uma da outra.
+    Retorna False se o caixa já não estiver aberto.
+    """
+    total = sum(valores_por_metodo.values())
+    novos_valores = {
+        CaixaDiario.total_geral_vendas: func.coalesce(CaixaDiario.total_geral_vendas, 0.0) + total
+    }
+    for metodo, valor in valores_por_metodo.items():
+        coluna = COLUNAS_TOTAL_POR_METODO.get(metodo)
+        if coluna is not None:
+            novos_valores[coluna] = func.coalesce(coluna, 0.0) + valor
+
+    atualizados = CaixaDiario.query \
+        .filter(CaixaDiario.id == caixa_id, CaixaDiario.status == 'Aberto') \
+        .update(novos_valores, synchronize_session=False)
+    return atualizados == 1
+
 @bp.route('/vendas', methods=['POST'])
 @jwt_required()
 def create_venda():
@@ -87,45 +133,251 @@ def create_venda():
         return jsonify({'error': 'Caixa fechado. Abra o caixa para realizar vendas.'}), 400
 
     try:
+        viagem_id = int(data['viagem_id'])
+        numero_poltrona = int(data['numero_poltrona'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Viagem e número da poltrona são obrigatórios.'}), 400
+
+    capacidade = capacidade_viagem(viagem_id)
+    if capacidade is None:
+        return jsonify({'error': 'Viagem não encontrada.'}), 404
+    if not 1 <= numero_poltrona <= capacidade:
+        return jsonify({'error': f'Poltrona inválida. Este ônibus tem poltronas de 1 a {capacidade}.'}), 400
+    if mapa_ocupacao.ocupada(viagem_id, numero_poltrona):
+        return jsonify({'error': f'A poltrona {numero_poltrona} já foi vendida nesta viagem.'}), 409
+
+    try:
+        agora = datetime.utcnow()
         nova_venda = Venda(
-            viagem_id=data['viagem_id'],
+            viagem_id=viagem_id,
             bilheteiro_id=current_user_id,
+            data_hora_venda=agora,
             nome_passageiro=data['nome_passageiro'],
             documento_passageiro=data['documento_passageiro'],
-            numero_poltrona=data['numero_poltrona'],
+            numero_poltrona=numero_poltrona,
             valor_passagem=data['valor_passagem'],
             metodo_pagamento=data['metodo_pagamento']
         )
         
-        # Atualiza os totais do caixa em tempo real
-        valor = float(data['valor_passagem'])
-        if data['metodo_pagamento'] == 'Dinheiro':
-            caixa.total_vendas_dinheiro += valor
-        elif data['metodo_pagamento'] == 'Pix':
-            caixa.total_vendas_pix += valor
-        elif data['metodo_pagamento'] == 'Cartão':
-            caixa.total_vendas_cartao += valor
-        
-        caixa.total_geral_vendas += valor
-        
         db.session.add(nova_venda)
+
+        # Atualiza os totais do caixa em tempo real (incremento atômico no banco)
+        if not _somar_totais_caixa(caixa.id, {data['metodo_pagamento']: float(data['valor_passagem'])}):
+            db.session.rollback()
+            return jsonify({'error': 'Caixa fechado. Abra o caixa para realizar vendas.'}), 400
+
+        # Agregado diário de receita, no mesmo commit da venda
+        registrar_vendas(viagem_id, current_user_id, agora,
+                         {data['metodo_pagamento']: (1, float(data['valor_passagem']))})
+
         db.session.commit()
+        mapa_ocupacao.marcar(viagem_id, [numero_poltrona])
         return jsonify(nova_venda.to_dict()), 201
         
     except IntegrityError:
         db.session.rollback()
+        # Outra venda pode ter ocupado a poltrona entre a verificação e o commit
+        if Venda.query.filter_by(viagem_id=viagem_id, numero_poltrona=numero_poltrona).first():
+            mapa_ocupacao.marcar(viagem_id, [numero_poltrona])
+            return jsonify({'error': f'A poltrona {numero_poltrona} já foi vendida nesta viagem.'}), 409
         return jsonify({'error': 'Erro de integridade. Verifique o ID da Viagem.'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@bp.route('/vendas/lote', methods=['POST'])
+@jwt_required()
+def create_vendas_lote():
+    """
+    (CRIAR) Registra várias vendas de uma mesma viagem numa só transação
+    (grupos e excursões). Ou todas as vendas são gravadas, ou nenhuma.
+    Body: {
+        "viagem_id": 1,
+        "metodo_pagamento": "Pix",          (opcional, padrão para todos)
+        "valor_passagem": 120.0,            (opcional, padrão para todos)
+        "passageiros": [
+            {"nome_passageiro": "...", "documento_passageiro": "...", "numero_poltrona": 1,
+             "valor_passagem": 120.0, "metodo_pagamento": "Pix"}, ...
+        ]
+    }
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    caixa = CaixaDiario.query.filter_by(bilheteiro_id=current_user_id, status='Aberto').first()
+    if not caixa:
+        return jsonify({'error': 'Caixa fechado. Abra o caixa para realizar vendas.'}), 400
+
+    passageiros = data.get('passageiros')
+    if not isinstance(passageiros, list) or not passageiros:
+        return jsonify({'error': 'Informe a lista de passageiros.'}), 400
+    try:
+        viagem_id = int(data['viagem_id'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Viagem ID é obrigatório'}), 400
+
+    capacidade = capacidade_viagem(viagem_id)
+    if capacidade is None:
+        return jsonify({'error': 'Viagem não encontrada.'}), 404
+
+    # Valida todos os passageiros antes de gravar qualquer coisa
+    agora = datetime.utcnow()
+    bitmap_ocupadas = mapa_ocupacao.bitmap(viagem_id)
+    linhas = []
+    poltronas = set()
+    erros = []
+    for i, passageiro in enumerate(passageiros):
+        try:
+            numero_poltrona = int(passageiro['numero_poltrona'])
+            linha = {
+                'viagem_id': viagem_id,
+                'bilheteiro_id': current_user_id,
+                'data_hora_venda': agora,
+                'nome_passageiro': passageiro['nome_passageiro'],
+                'documento_passageiro': passageiro['documento_passageiro'],
+                'numero_poltrona': numero_poltrona,
+                'valor_passagem': float(passageiro.get('valor_passagem', data.get('valor_passagem'))),
+                'metodo_pagamento': passageiro.get('metodo_pagamento', data.get('metodo_pagamento')),
+            }
+        except (KeyError, TypeError, ValueError):
+            erros.append({'indice': i, 'error': 'Dados incompletos ou inválidos.'})
+            continue
+
+        if not linha['metodo_pagamento']:
+            erros.append({'indice': i, 'error': 'Método de pagamento é obrigatório.'})
+        elif not 1 <= numero_poltrona <= capacidade:
+            erros.append({'indice': i, 'error': f'Poltrona inválida. Este ônibus tem poltronas de 1 a {capacidade}.'})
+        elif numero_poltrona in poltronas:
+            erros.append({'indice': i, 'error': f'Poltrona {numero_poltrona} repetida no pedido.'})
+        elif bitmap_ocupadas >> numero_poltrona & 1:
+            erros.append({'indice': i, 'error': f'A poltrona {numero_poltrona} já foi vendida nesta viagem.'})
+        poltronas.add(numero_poltrona)
+        linhas.append(linha)
+
+    if erros:
+        return jsonify({'error': 'Nenhuma venda registrada. Corrija os passageiros indicados.', 'erros': erros}), 400
+
+    valores_por_metodo = {}
+    quantidades_por_metodo = {}
+    for linha in linhas:
+        metodo = linha['metodo_pagamento']
+        valores_por_metodo[metodo] = valores_por_metodo.get(metodo, 0.0) + linha['valor_passagem']
+        quantidades_por_metodo[metodo] = quantidades_por_metodo.get(metodo, 0) + 1
+
+    try:
+        # Um único INSERT em lote (executemany) para todas as vendas
+        db.session.execute(insert(Venda), linhas)
+        # (viagem_id, numero_poltrona) é único: recupera os ids gerados pela poltrona
+        ids_por_poltrona = dict(
+            db.session.query(Venda.numero_poltrona, Venda.id)
+            .filter(Venda.viagem_id == viagem_id, Venda.numero_poltrona.in_(poltronas))
+        )
+
+        if not _somar_totais_caixa(caixa.id, valores_por_metodo):
+            db.session.rollback()
+            return jsonify({'error': 'Caixa fechado. Abra o caixa para realizar vendas.'}), 400
+
+        registrar_vendas(viagem_id, current_user_id, agora, {
+            metodo: (quantidades_por_metodo[metodo], valor) for metodo, valor in valores_por_metodo.items()})
+
+        db.session.commit()
+        mapa_ocupacao.marcar(viagem_id, poltronas)
+    except IntegrityError:
+        db.session.rollback()
+        # Outra venda ocupou alguma das poltronas entre a validação e o commit
+        vendidas = [p for (p,) in db.session.query(Venda.numero_poltrona).filter(
+            Venda.viagem_id == viagem_id, Venda.numero_poltrona.in_(poltronas))]
+        mapa_ocupacao.marcar(viagem_id, vendidas)
+        return jsonify({'error': 'Nenhuma venda registrada. Poltronas já vendidas nesta viagem.', 'poltronas': sorted(vendidas)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    vendas = [Venda(id=ids_por_poltrona[linha['numero_poltrona']], **linha).to_dict() for linha in linhas]
+    return jsonify({'message': f'{len(vendas)} vendas registradas', 'vendas': vendas}), 201
+
 @bp.route('/vendas', methods=['GET'])
 @jwt_required()
 def get_vendas():
-    """ (LISTAR) Lista todas as vendas """
+    """
+    (LISTAR) Lista as vendas, da mais recente para a mais antiga.
+    Filtros (opcionais): ?viagem_id=&bilheteiro_id=&metodo_pagamento=&data_inicio=YYYY-MM-DD&data_fim=YYYY-MM-DD
+    Paginação (opcional): ?limite=N&cursor=<next_cursor>
+    Campos (opcional): ?fields=id,valor_passagem,... (só os campos pedidos)
+    A resposta é gerada em streaming a partir de um cursor do banco, sem montar
+    a lista inteira na memória. Sem 'limite' devolve uma lista JSON; com 'limite'
+    devolve {'items': [...], 'next_cursor': ...}.
+    """
     try:
-        # Filtra vendas por data, viagem, etc. (opcional)
-        vendas = Venda.query.order_by(Venda.data_hora_venda.desc()).all()
-        return jsonify([v.to_dict() for v in vendas]), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        data_inicio, data_fim = parse_intervalo_datas(request.args)
+        limite = parse_limite(request.args)
+        selecao = ESQUEMA_VENDA.selecionar(request.args)
+
+        query = Venda.query
+        for campo in ('viagem_id', 'bilheteiro_id'):
+            valor = parse_inteiro(request.args, campo)
+            if valor is not None:
+                query = query.filter(getattr(Venda, campo) == valor)
+        if request.args.get('metodo_pagamento'):
+            query = query.filter(Venda.metodo_pagamento == request.args['metodo_pagamento'])
+        if data_inicio:
+            query = query.filter(Venda.data_hora_venda >= data_inicio)
+        if data_fim:
+            query = query.filter(Venda.data_hora_venda <= data_fim)
+        if request.args.get('cursor'):
+            query = query.filter(filtro_keyset_desc(Venda.data_hora_venda, Venda.id, request.args['cursor']))
+
+        query = query.order_by(Venda.data_hora_venda.desc(), Venda.id.desc())
+        if limite is not None:
+            # Um item a mais só para saber se existe próxima página
+            query = query.limit(limite + 1)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Tuplas só com as colunas pedidas, mais a chave do cursor no fim
+    linhas = selecao.consulta(query, Venda.data_hora_venda, Venda.id).yield_per(TAMANHO_LOTE_STREAMING)
+
+    def gerar():
+        yield b'[' if limite is None else b'{"items":['
+        lote = []
+        ultima = None
+        next_cursor = None
+        separador = b''
+        for i, linha in enumerate(linhas):
+            if limite is not None and i == limite:
+                next_cursor = codificar_cursor(ultima[-2], ultima[-1])
+                break
+            lote.append(linha)
+            ultima = linha
+            if len(lote) == TAMANHO_LOTE_STREAMING:
+                # Um dumps por lote: a lista codificada sem os colchetes
+                yield separador + dumps(list(selecao.dicts(lote)))[1:-1]
+                separador = b','
+                lote = []
+        if lote:
+            yield separador + dumps(list(selecao.dicts(lote)))[1:-1]
+        if limite is None:
+            yield b']'
+        else:
+            yield b'],"next_cursor":' + dumps(next_cursor) + b'}'
+
+    return Response(stream_with_context(gerar()), status=200, mimetype='application/json')
+
+
+@bp.route('/viagens/<int:viagem_id>/poltronas', methods=['GET'])
+@jwt_required()
+def get_mapa_poltronas(viagem_id):
+    """ Mapa de poltronas de uma viagem (ocupadas e livres) """
+    capacidade = capacidade_viagem(viagem_id)
+    if capacidade is None:
+        return jsonify({'error': 'Viagem não encontrada.'}), 404
+
+    ocupadas = set(poltronas_ocupadas(mapa_ocupacao.bitmap(viagem_id)))
+    livres = [p for p in range(1, capacidade + 1) if p not in ocupadas]
+
+    return jsonify({
+        'viagem_id': viagem_id,
+        'capacidade': capacidade,
+        'ocupadas': sorted(ocupadas),
+        'livres': livres
+    }), 200
@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSenhasOcupado(Exception):
+    """ O pool de verificação de senhas está cheio (ou demorou demais) """
+    pass
+
+
+class PoolSenhas:
+    """
+    Pool limitado de threads para o trabalho de bcrypt (verificar/gerar hash).
+
+    O bcrypt é propositalmente lento. Executá-lo aqui limita quantos hashes
+    correm em paralelo (BCRYPT_POOL_WORKERS) e, sobretudo, quantas threads do
+    servidor podem ficar paradas à espera de um (BCRYPT_POOL_ESPERA, abaixo
+    do número de threads do servidor). Passado esse limite, ou se o hash não
+    terminar em BCRYPT_POOL_TIMEOUT (perto do tempo de um hash), o pedido
+    falha com PoolSenhasOcupado: uma rajada de logins recebe 503 e sobram
+    threads para as vendas.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._esperas = None
+        self._vagas = None
+        self.timeout = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_POOL_WORKERS', os.cpu_count() or 2)
+        app.config.setdefault('BCRYPT_POOL_ESPERA', 3)
+        app.config.setdefault('BCRYPT_POOL_TIMEOUT', 0.5)
+
+        workers = app.config['BCRYPT_POOL_WORKERS']
+        espera = app.config['BCRYPT_POOL_ESPERA']
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        # Threads de pedido paradas em executar()
+        self._esperas = threading.BoundedSemaphore(espera)
+        # Tarefas no pool (a correr + na fila), incluindo as de enviar()
+        self._vagas = threading.BoundedSemaphore(workers + espera)
+        self.timeout = app.config['BCRYPT_POOL_TIMEOUT']
+        app.extensions['pool_senhas'] = self
+
+    def _submeter(self, fn, *args):
+        if not self._vagas.acquire(blocking=False):
+            raise PoolSenhasOcupado()
+        try:
+            futuro = self._executor.submit(fn, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        return futuro
+
+    def executar(self, fn, *args):
+        """ Executa fn(*args) no pool e espera o resultado (no máximo BCRYPT_POOL_TIMEOUT) """
+        if not self._esperas.acquire(blocking=False):
+            raise PoolSenhasOcupado()
+        try:
+            futuro = self._submeter(fn, *args)
+            try:
+                return futuro.result(timeout=self.timeout)
+            except TimeoutError:
+                futuro.cancel()  # Se ainda estiver na fila, nem chega a correr
+                raise PoolSenhasOcupado()
+        finally:
+            self._esperas.release()
+
+    def enviar(self, fn, *args):
+        """
+        Executa fn(*args) no pool sem esperar (o pedido segue). Retorna False,
+        sem executar, se o pool estiver cheio. Erros de fn vão para o log.
+        """
+        try:
+            futuro = self._submeter(fn, *args)
+        except PoolSenhasOcupado:
+            return False
+        futuro.add_done_callback(_registrar_erro)
+        return True
+
+
+def _registrar_erro(futuro):
+    if not futuro.cancelled() and futuro.exception() is not None:
+        logger.error('Tarefa do pool de senhas falhou', exc_info=futuro.exception())
+
+
+def custo_do_hash(senha_hash):
+    """ Lê o work factor (log2 das rodadas) de um hash bcrypt: '$2b$12$...' -> 12 """
+    try:
+        return int(senha_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
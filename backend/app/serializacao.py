@@ -0,0 +1,240 @@
+import json
+from datetime import date
+from decimal import Decimal
+from flask import current_app
+from app.consultas import ParametroInvalido
+from app.models import Usuario, Motorista, Onibus, Rota, Viagem, HorarioViagem, RegistroOperacional, Venda, CaixaDiario
+from app.referencias import cache_referencias
+
+# orjson é opcional: serializa datetime nativamente e é bem mais rápido que o json
+# da stdlib. Sem ele, o fallback produz o mesmo JSON (datas em ISO 8601).
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+# --- Codificação JSON ---
+
+
+def _padrao(valor):
+    """ Tipos que nenhum dos codificadores serializa sozinho """
+    if isinstance(valor, date):  # só chega aqui no fallback (orjson trata datas)
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f'Objeto do tipo {type(valor).__name__} não é serializável em JSON')
+
+
+def dumps(dados):
+    """ JSON (bytes, UTF-8) de dados; datas e datetimes saem em ISO 8601, como no to_dict() """
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def resposta_json(dados, status=200):
+    """ Response JSON codificada por dumps() (substitui jsonify nas listagens) """
+    return current_app.response_class(dumps(dados), status=status, mimetype='application/json')
+
+
+# --- Serialização por colunas ---
+
+
+class Campo:
+    """
+    Campo calculado de um esquema: lê uma ou mais colunas e passa os valores
+    a converter(). Se precisar de outra tabela, juncao=(modelo, condição)
+    entra como LEFT OUTER JOIN só quando o campo é pedido.
+    """
+    __slots__ = ('colunas', 'converter', 'juncao')
+
+    def __init__(self, *colunas, converter, juncao=None):
+        self.colunas = colunas
+        self.converter = converter
+        self.juncao = juncao
+
+
+class Esquema:
+    """
+    Campos de saída de uma listagem: nome -> coluna (valor copiado como vem do
+    banco) ou Campo (valor calculado). A listagem consulta só as colunas dos
+    campos pedidos e monta os dicts a partir das tuplas, sem instanciar os
+    objetos do ORM nem chamar to_dict().
+    """
+
+    def __init__(self, campos):
+        self.campos = campos
+
+    def selecionar(self, args):
+        """
+        Seleção dos campos de ?fields=a,b,c (todos, sem o parâmetro).
+        Campo desconhecido -> ParametroInvalido (400 na rota).
+        """
+        if not args.get('fields'):
+            return Selecao(self, tuple(self.campos))
+        nomes = tuple(dict.fromkeys(n.strip() for n in args['fields'].split(',') if n.strip()))
+        desconhecidos = [n for n in nomes if n not in self.campos]
+        if desconhecidos or not nomes:
+            raise ParametroInvalido(
+                f"Campo(s) inválido(s) em 'fields': {', '.join(desconhecidos) or '(vazio)'}. "
+                f"Disponíveis: {', '.join(self.campos)}.")
+        return Selecao(self, nomes)
+
+
+class Selecao:
+    """
+    Campos escolhidos de um esquema. As colunas dos campos simples vêm primeiro
+    na tupla, na ordem dos nomes, para o dict sair de um zip(); as colunas dos
+    campos calculados e as colunas extras (ex.: chave do cursor) vêm depois.
+    """
+
+    def __init__(self, esquema, nomes):
+        self.nomes = nomes
+        self.simples = tuple(n for n in nomes if not isinstance(esquema.campos[n], Campo))
+        self.colunas = [esquema.campos[n] for n in self.simples]
+        self.calculados = []
+        self.juncoes = []
+        for nome in nomes:
+            campo = esquema.campos[nome]
+            if not isinstance(campo, Campo):
+                continue
+            indices = tuple(self._indice(coluna) for coluna in campo.colunas)
+            self.calculados.append((nome, indices, campo.converter))
+            if campo.juncao is not None and all(j[0] is not campo.juncao[0] for j in self.juncoes):
+                self.juncoes.append(campo.juncao)
+
+    def _indice(self, coluna):
+        for i, existente in enumerate(self.colunas):
+            if existente is coluna:
+                return i
+        self.colunas.append(coluna)
+        return len(self.colunas) - 1
+
+    def consulta(self, query, *extras):
+        """
+        A mesma query (filtros, ordem, limite), mas devolvendo só as colunas da
+        seleção seguidas de extras. As linhas ficam tuplas; linha[-1] etc. dão
+        acesso aos extras.
+        """
+        query = query.with_entities(*self.colunas, *extras)
+        for modelo, condicao in self.juncoes:
+            query = query.outerjoin(modelo, condicao)
+        return query
+
+    def dicts(self, linhas):
+        """ Gera um dict por linha de consulta() """
+        simples, calculados = self.simples, self.calculados
+        for linha in linhas:
+            item = dict(zip(simples, linha))
+            for nome, indices, converter in calculados:
+                item[nome] = converter(*[linha[i] for i in indices])
+            yield item
+
+    def lista(self, query):
+        return list(self.dicts(self.consulta(query)))
+
+
+def _nome_ou_na(nome):
+    return nome if nome is not None else 'N/A'
+
+
+def _referencia(modelo):
+    return lambda id: cache_referencias.obter(modelo, id)
+
+
+# Os esquemas reproduzem os to_dict() de models.py (mesmos campos e valores)
+
+ESQUEMA_USUARIO = Esquema({
+    'id': Usuario.id,
+    'nome_completo': Usuario.nome_completo,
+    'usuario': Usuario.usuario,
+    'nivel_acesso': Usuario.nivel_acesso,
+})
+
+ESQUEMA_MOTORISTA = Esquema({
+    'id': Motorista.id,
+    'nome_completo': Motorista.nome_completo,
+    'contato': Motorista.contato,
+})
+
+ESQUEMA_ONIBUS = Esquema({
+    'id': Onibus.id,
+    'numero_onibus': Onibus.numero_onibus,
+    'placa': Onibus.placa,
+    'empresa_parceira': Onibus.empresa_parceira,
+    'capacidade': Onibus.capacidade,
+})
+
+ESQUEMA_ROTA = Esquema({
+    'id': Rota.id,
+    'origem': Rota.origem,
+    'destino': Rota.destino,
+    'tipo_rota': Rota.tipo_rota,
+})
+
+ESQUEMA_VIAGEM = Esquema({
+    'id': Viagem.id,
+    'rota': Campo(Viagem.rota_id, converter=_referencia(Rota)),
+    'onibus': Campo(Viagem.onibus_id, converter=_referencia(Onibus)),
+    'motorista': Campo(Viagem.motorista_id, converter=_referencia(Motorista)),
+    'data_partida_prevista': Viagem.data_partida_prevista,
+    'data_chegada_prevista': Viagem.data_chegada_prevista,
+    'status': Viagem.status,
+})
+
+ESQUEMA_HORARIO = Esquema({
+    'id': HorarioViagem.id,
+    'rota': Campo(HorarioViagem.rota_id, converter=_referencia(Rota)),
+    'onibus': Campo(HorarioViagem.onibus_id, converter=_referencia(Onibus)),
+    'motorista': Campo(HorarioViagem.motorista_id, converter=_referencia(Motorista)),
+    'hora_partida': Campo(HorarioViagem.hora_partida, converter=lambda hora: hora.strftime('%H:%M')),
+    'duracao_minutos': HorarioViagem.duracao_minutos,
+    'dias_semana': Campo(HorarioViagem.dias_semana, converter=lambda dias: [int(dia) for dia in dias]),
+    'vigente_de': HorarioViagem.vigente_de,
+    'vigente_ate': HorarioViagem.vigente_ate,
+    'ativo': HorarioViagem.ativo,
+})
+
+_BILHETEIRO_REGISTRO = (Usuario, RegistroOperacional.bilheteiro_id == Usuario.id)
+
+ESQUEMA_REGISTRO = Esquema({
+    'id': RegistroOperacional.id,
+    'viagem_id': RegistroOperacional.viagem_id,
+    'bilheteiro_id': RegistroOperacional.bilheteiro_id,
+    'bilheteiro_nome': Campo(Usuario.nome_completo, converter=_nome_ou_na, juncao=_BILHETEIRO_REGISTRO),
+    'data_hora_chegada_real': RegistroOperacional.data_hora_chegada_real,
+    'data_hora_saida_real': RegistroOperacional.data_hora_saida_real,
+    'pass_chegaram': RegistroOperacional.pass_chegaram,
+    'pass_embarcaram': RegistroOperacional.pass_embarcaram,
+    'pass_desembarcaram': RegistroOperacional.pass_desembarcaram,
+    'pass_final': RegistroOperacional.pass_final,
+    'observacoes': RegistroOperacional.observacoes,
+})
+
+ESQUEMA_VENDA = Esquema({
+    'id': Venda.id,
+    'viagem_id': Venda.viagem_id,
+    'bilheteiro_id': Venda.bilheteiro_id,
+    'data_hora_venda': Venda.data_hora_venda,
+    'nome_passageiro': Venda.nome_passageiro,
+    'documento_passageiro': Venda.documento_passageiro,
+    'numero_poltrona': Venda.numero_poltrona,
+    'valor_passagem': Venda.valor_passagem,
+    'metodo_pagamento': Venda.metodo_pagamento,
+})
+
+_BILHETEIRO_CAIXA = (Usuario, CaixaDiario.bilheteiro_id == Usuario.id)
+
+ESQUEMA_CAIXA = Esquema({
+    'id': CaixaDiario.id,
+    'bilheteiro_id': CaixaDiario.bilheteiro_id,
+    'bilheteiro_nome': Campo(Usuario.nome_completo, converter=_nome_ou_na, juncao=_BILHETEIRO_CAIXA),
+    'data_abertura': CaixaDiario.data_abertura,
+    'data_fechamento': CaixaDiario.data_fechamento,
+    'saldo_inicial': CaixaDiario.saldo_inicial,
+    'total_vendas_dinheiro': CaixaDiario.total_vendas_dinheiro,
+    'total_vendas_pix': CaixaDiario.total_vendas_pix,
+    'total_vendas_cartao': CaixaDiario.total_vendas_cartao,
+    'total_geral_vendas': CaixaDiario.total_geral_vendas,
+    'status': CaixaDiario.status,
+})
@@ -0,0 +1,144 @@
+import logging
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+from app.extensions import db
+from app.models import (
+    Usuario, Motorista, Onibus, Rota, Viagem, HorarioViagem, RegistroOperacional, Venda, CaixaDiario, Alteracao
+)
+from app.serializacao import (
+    ESQUEMA_USUARIO, ESQUEMA_MOTORISTA, ESQUEMA_ONIBUS, ESQUEMA_ROTA, ESQUEMA_VIAGEM, ESQUEMA_HORARIO,
+    ESQUEMA_REGISTRO, ESQUEMA_VENDA, ESQUEMA_CAIXA
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Sincronização incremental (delta sync) ---
+#
+# Gatilhos no banco gravam em 'alteracao' cada INSERT, UPDATE e DELETE das
+# tabelas abaixo, inclusive os feitos em lote (executemany, query.update,
+# migrações). O cliente guarda o cursor (id da última alteração recebida) e
+# pede só o que mudou depois dele: os registros inseridos/alterados, no
+# formato da listagem, e os ids apagados (tombstones).
+#
+# Só no SQLite: lá as escritas são serializadas e os ids entram no log na
+# ordem do commit, o que torna o cursor seguro. Num banco com escritas
+# concorrentes (PostgreSQL), uma transação pode gravar um id menor e fazer
+# commit depois de outra já entregue, e o cliente nunca a receberia. Nos
+# outros bancos os gatilhos não são criados e as rotas respondem 501.
+DIALETOS_SUPORTADOS = ('sqlite',)
+
+# Recurso da URL -> (modelo, esquema da listagem)
+RECURSOS = {
+    'usuarios': (Usuario, ESQUEMA_USUARIO),
+    'motoristas': (Motorista, ESQUEMA_MOTORISTA),
+    'onibus': (Onibus, ESQUEMA_ONIBUS),
+    'rotas': (Rota, ESQUEMA_ROTA),
+    'viagens': (Viagem, ESQUEMA_VIAGEM),
+    'horarios': (HorarioViagem, ESQUEMA_HORARIO),
+    'registros': (RegistroOperacional, ESQUEMA_REGISTRO),
+    'vendas': (Venda, ESQUEMA_VENDA),
+    'caixas': (CaixaDiario, ESQUEMA_CAIXA),
+}
+
+TABELAS = tuple(modelo.__tablename__ for modelo, _ in RECURSOS.values())
+
+
+def disponivel(dialeto):
+    return dialeto in DIALETOS_SUPORTADOS
+
+
+def comandos_gatilhos(tabelas=TABELAS):
+    """
+    DDL (SQLite) dos gatilhos que mantêm 'alteracao'. Cada alteração
+    substitui a linha anterior do registro por outra (id novo, maior que
+    qualquer cursor já entregue), então o log tem no máximo uma linha por registro.
+    """
+    comandos = []
+    for tabela in tabelas:
+        for evento, linha, operacao in (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'),
+                                        ('DELETE', 'OLD', 'delete')):
+            comandos.append(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_alteracao_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    INSERT OR REPLACE INTO alteracao (tabela, registro_id, operacao)
+                    VALUES ('{tabela}', {linha}.id, '{operacao}');
+                END
+            """)
+    return comandos
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _criar_gatilhos(metadata, conexao, **kwargs):
+    """
+    Bancos criados por db.create_all() (benchmarks) recebem os gatilhos junto
+    com as tabelas; nos demais, eles vêm da migração e8c4a27d19f6.
+    Fora do SQLite a sincronização fica desativada e os gatilhos não são criados.
+    """
+    if not disponivel(conexao.dialect.name):
+        logger.warning('Sincronização incremental desativada: sem suporte ao banco %s.', conexao.dialect.name)
+        return
+    for comando in comandos_gatilhos():
+        conexao.exec_driver_sql(comando)
+
+
+def alteracoes(modelo, selecao, cursor=0, limite=1000):
+    """
+    Alterações da tabela do modelo depois do cursor, até 'limite'. Retorna
+    {'upserts': [dicts da seleção], 'tombstones': [ids], 'cursor': n, 'mais': bool};
+    com 'mais', há outra página a partir do cursor devolvido.
+    O log e os registros são lidos em dois SELECTs, sem transação comum (o
+    pysqlite não abre uma para leituras). Não faz mal: um registro alterado
+    entre os dois vem já na versão nova, e um apagado fica de fora dos
+    upserts; nos dois casos a alteração entrou no log com um id maior que o
+    cursor devolvido e chega na próxima página.
+    """
+    log = db.session.query(Alteracao.id, Alteracao.registro_id, Alteracao.operacao).filter(
+        Alteracao.tabela == modelo.__tablename__,
+        Alteracao.id > cursor,
+    ).order_by(Alteracao.id).limit(limite + 1).all()
+    mais = len(log) > limite
+    log = log[:limite]
+
+    ids = [registro_id for _, registro_id, operacao in log if operacao == 'upsert']
+    upserts = selecao.lista(modelo.query.filter(modelo.id.in_(ids)).order_by(modelo.id)) if ids else []
+    return {
+        'upserts': upserts,
+        'tombstones': [registro_id for _, registro_id, operacao in log if operacao == 'delete'],
+        'cursor': log[-1][0] if log else cursor,
+        'mais': mais,
+    }
+
+
+def reconstruir():
+    """
+    Refaz o log com um 'upsert' por registro existente (bancos que já
+    tinham dados quando ganharam os gatilhos). Os ids continuam a crescer:
+    quem tinha um cursor recebe de novo todos os registros, mas não os
+    tombstones anteriores; o seguro é os clientes sincronizarem do zero.
+    Retorna quantas linhas foram gravadas.
+    """
+    Alteracao.query.delete(synchronize_session=False)
+    total = 0
+    for tabela in TABELAS:
+        resultado = db.session.execute(db.text(
+            f"INSERT INTO alteracao (tabela, registro_id, operacao) SELECT '{tabela}', id, 'upsert' FROM {tabela} ORDER BY id"
+        ))
+        total += resultado.rowcount
+    return total
+
+
+# --- Linha de comando: flask sincronizacao ... ---
+
+sincronizacao_cli = AppGroup('sincronizacao', help='Log de alterações da sincronização incremental.')
+
+
+@sincronizacao_cli.command('reconstruir')
+def reconstruir_comando():
+    """ Refaz o log de alterações a partir dos registros atuais """
+    if not disponivel(db.engine.dialect.name):
+        raise click.ClickException(f'Sincronização incremental sem suporte ao banco {db.engine.dialect.name}.')
+    linhas = reconstruir()
+    db.session.commit()
+    click.echo(f'{linhas} linhas gravadas em alteracao.')
@@ -0,0 +1,35 @@
+from sqlalchemy import event
+
+
+class PragmasSQLite:
+    """
+    Aplica os PRAGMAs de SQLITE_PRAGMAS (config) a cada conexão nova do
+    engine, via evento 'connect' do SQLAlchemy. Os PRAGMAs do SQLite valem
+    por conexão, então precisam ser repetidos em todas as conexões do pool.
+    Não faz nada se o banco não for SQLite ou se a config estiver vazia.
+    """
+
+    def init_app(self, app, db):
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        with app.app_context():
+            engine = db.engine
+        if not pragmas or engine.dialect.name != 'sqlite':
+            return
+
+        @event.listens_for(engine, 'connect')
+        def aplicar_pragmas(conexao_dbapi, registro):
+            cursor = conexao_dbapi.cursor()
+            try:
+                for nome, valor in pragmas.items():
+                    cursor.execute(f'PRAGMA {nome} = {valor}')
+            finally:
+                cursor.close()
+
+
+def pragmas_ativos(conexao_dbapi, nomes):
+    """ Lê o valor atual de cada PRAGMA numa conexão DB-API (para conferência) """
+    cursor = conexao_dbapi.cursor()
+    try:
+        return {nome: cursor.execute(f'PRAGMA {nome}').fetchone()[0] for nome in nomes}
+    finally:
+        cursor.close()
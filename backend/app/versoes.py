@@ -0,0 +1,61 @@
+import threading
+import uuid
+from app.cache import CacheTTL, AUSENTE
+
+
+class VersoesCadastros:
+    """
+    Contador de versão por tabela de cadastro (motorista, onibus, rota) e
+    cache do JSON já serializado das respostas de leitura dessas tabelas.
+
+    Os handlers de escrita chamam registrar_alteracao(tabela) depois do
+    commit: a versão sobe e os JSONs guardados da tabela são descartados.
+    A versão entra no ETag, então um If-None-Match igual à versão atual
+    pode ser respondido com 304 sem ir ao banco.
+
+    É local ao processo (como o servidor corre hoje, num processo com várias
+    threads). O ETag leva um identificador do processo, para um ETag emitido
+    por outro processo ou antes de um reinício nunca ser tomado como atual.
+    """
+
+    def __init__(self, max_itens_por_tabela=2048, ttl=24 * 3600):
+        self._processo = uuid.uuid4().hex[:8]
+        self._versoes = {}
+        self._payloads = {}
+        self._max_itens = max_itens_por_tabela
+        self._ttl = ttl
+        self._trava = threading.Lock()
+
+    def versao(self, tabela):
+        return self._versoes.get(tabela, 0)
+
+    def etag(self, tabela, versao):
+        return f'{tabela}-{self._processo}-{versao}'
+
+    def registrar_alteracao(self, *tabelas):
+        """ Sobe a versão das tabelas e descarta os JSONs guardados delas """
+        with self._trava:
+            for tabela in tabelas:
+                self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+                if tabela in self._payloads:
+                    self._payloads[tabela].limpar()
+
+    def payload(self, tabela, chave, versao, gerar):
+        """
+        JSON (bytes) de uma leitura da tabela, gerado por gerar() só se não
+        houver um guardado para esta versão. Guardar junto a versão impede que
+        um JSON montado durante uma escrita concorrente seja servido depois dela.
+        """
+        cache = self._payloads.get(tabela)
+        if cache is None:
+            with self._trava:
+                cache = self._payloads.setdefault(tabela, CacheTTL(max_itens=self._max_itens, ttl=self._ttl))
+        guardado = cache.obter(chave)
+        if guardado is not AUSENTE and guardado[0] == versao:
+            return guardado[1]
+        corpo = gerar()
+        cache.definir(chave, (versao, corpo))
+        return corpo
+
+
+versoes_cadastros = VersoesCadastros()
@@ -0,0 +1,2 @@
+# Scripts de benchmark e de carga. Executar a partir da pasta 'backend':
+#   python -m benchmarks.<nome_do_script>
@@ -0,0 +1,51 @@
+import os
+import tempfile
+from flask_jwt_extended import create_access_token
+from config import Config
+from app import create_app
+from app.extensions import db
+from app.models import Usuario, Motorista, Onibus, Rota
+
+
+def config_temporaria(base=Config, **extras):
+    """
+    Cria uma classe de configuração que aponta para um SQLite novo numa pasta
+    temporária, para os benchmarks nunca tocarem no banco de desenvolvimento.
+    """
+    caminho = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+    atributos = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + caminho, 'BCRYPT_LOG_ROUNDS': 4}
+    atributos.update(extras)
+    return type('ConfigBenchmark', (base,), atributos)
+
+
+def criar_app_benchmark(base=Config, **extras):
+    """ Cria o app com um banco temporário já com as tabelas criadas """
+    app = create_app(config_temporaria(base, **extras))
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def criar_usuario(nome, nivel_acesso='bilheteiro', senha='123'):
+    """ Cria um usuário e retorna o seu id (precisa de app context) """
+    usuario = Usuario(nome_completo=nome, usuario=nome, nivel_acesso=nivel_acesso)
+    usuario.set_password(senha)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario.id
+
+
+def cabecalho_auth(usuario_id, nivel_acesso='bilheteiro'):
+    """ Cabeçalho Authorization com um token válido para o usuário (precisa de app context) """
+    token = create_access_token(identity=str(usuario_id), additional_claims={'nivel_acesso': nivel_acesso})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def criar_cadastros_basicos(capacidade=46):
+    """ Cria um motorista, um ônibus e uma rota. Retorna (motorista_id, onibus_id, rota_id). """
+    motorista = Motorista(nome_completo='Motorista Benchmark')
+    onibus = Onibus(numero_onibus='BENCH-1', placa='BEN0001', capacidade=capacidade)
+    rota = Rota(origem='Origem', destino='Destino')
+    db.session.add_all([motorista, onibus, rota])
+    db.session.commit()
+    return motorista.id, onibus.id, rota.id
@@ -0,0 +1,160 @@
+"""
+Benchmark de leitura/escrita concorrente no SQLite: perfil padrão x produção.
+
+Para cada perfil (Config e ConfigProducao) cria um banco temporário, abre um
+caixa para cada um dos N bilheteiros e, durante --segundos, põe os N a vender
+(POST /api/vendas/vendas) ao mesmo tempo que --leitores listam vendas e
+viagens. Cada bilheteiro/leitor é um processo com o seu próprio app, como
+vários guichês ou workers do servidor a usar o mesmo arquivo. Mostra vendas/s,
+leituras/s, latências p50/p95 e quantas requisições falharam
+(ex.: "database is locked").
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.concorrencia_sqlite [--bilheteiros 8] [--leitores 4] [--segundos 10]
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+import warnings
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from config import Config, ConfigProducao
+from app import create_app
+from app.extensions import db
+from app.models import Viagem
+from app.sqlite import pragmas_ativos
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+PERFIS = {'padrão': Config, 'produção': ConfigProducao}
+LEITURAS = ['/api/vendas/vendas?limite=50', '/api/operacional/viagens?limite=50']
+
+
+def preparar(base, n_bilheteiros):
+    """
+    Cria o banco com os bilheteiros (caixa aberto) e uma viagem por bilheteiro.
+    Retorna (uri do banco, pragmas ativos, headers do admin, [(headers, viagem_id)]).
+    """
+    app = criar_app_benchmark(base)
+    with app.app_context():
+        motorista_id, onibus_id, rota_id = criar_cadastros_basicos(capacidade=1_000_000)
+        admin = cabecalho_auth(criar_usuario('admin_concorrencia', 'admin'), 'admin')
+        bilheteiros = []
+        for i in range(n_bilheteiros):
+            headers = cabecalho_auth(criar_usuario(f'bilheteiro_{i}'))
+            partida = datetime(2030, 1, 1, 8, 0) + timedelta(hours=i)
+            viagem = Viagem(rota_id=rota_id, onibus_id=onibus_id, motorista_id=motorista_id,
+                            data_partida_prevista=partida, data_chegada_prevista=partida + timedelta(hours=4))
+            db.session.add(viagem)
+            db.session.commit()
+            bilheteiros.append((headers, viagem.id))
+        conexao = db.engine.raw_connection()
+        try:
+            pragmas = pragmas_ativos(conexao.driver_connection, ['journal_mode', 'synchronous', 'busy_timeout'])
+        finally:
+            conexao.close()
+
+    cliente = app.test_client()
+    for headers, _ in bilheteiros:
+        assert cliente.post('/api/vendas/caixa/abrir', json={'saldo_inicial': 0}, headers=headers).status_code == 201
+    with app.app_context():
+        db.engine.dispose()
+    return app.config['SQLALCHEMY_DATABASE_URI'], pragmas, admin, bilheteiros
+
+
+def criar_app_perfil(perfil, uri):
+    return create_app(type('ConfigConcorrencia', (PERFIS[perfil],), {'SQLALCHEMY_DATABASE_URI': uri}))
+
+
+def trabalhador(perfil, uri, headers, viagem_id, inicio_em, fim_em):
+    """
+    Processo de um bilheteiro (com viagem_id) ou de um leitor (viagem_id None).
+    Retorna (tipo, latências das respostas OK, contagem de erros).
+    """
+    warnings.simplefilter('ignore')
+    app = criar_app_perfil(perfil, uri)
+    # As falhas entram na contagem; o traceback de cada uma só poluiria a saída
+    app.logger.setLevel(logging.CRITICAL)
+    cliente = app.test_client()
+    latencias, erros = [], Counter()
+
+    time.sleep(max(inicio_em - time.time(), 0))
+    n = 0
+    while time.time() < fim_em:
+        n += 1
+        inicio = time.perf_counter()
+        if viagem_id is not None:
+            resposta = cliente.post('/api/vendas/vendas', headers=headers, json={
+                'viagem_id': viagem_id, 'numero_poltrona': n,
+                'nome_passageiro': 'Passageiro', 'documento_passageiro': f'{n:011d}',
+                'valor_passagem': 50.0, 'metodo_pagamento': 'Pix',
+            })
+            ok = resposta.status_code == 201
+        else:
+            resposta = cliente.get(LEITURAS[n % len(LEITURAS)], headers=headers)
+            resposta.get_data()
+            # Fecha a resposta em streaming para o app devolver a conexão ao pool
+            resposta.close()
+            ok = resposta.status_code == 200
+        if ok:
+            latencias.append(time.perf_counter() - inicio)
+        else:
+            erro = (resposta.get_json(silent=True) or {}).get('error') or str(resposta.status_code)
+            erros[erro[:60]] += 1
+    return ('venda' if viagem_id is not None else 'leitura'), latencias, erros
+
+
+def percentil(valores, q):
+    return valores[min(int(q * len(valores)), len(valores) - 1)] * 1000 if valores else float('nan')
+
+
+def executar(perfil, n_bilheteiros, n_leitores, segundos):
+    uri, pragmas, admin, bilheteiros = preparar(PERFIS[perfil], n_bilheteiros)
+    # Margem para todos os processos subirem o app antes de começar a medir
+    inicio_em = time.time() + 3 + 0.2 * (n_bilheteiros + n_leitores)
+    fim_em = inicio_em + segundos
+    tarefas = [(perfil, uri, headers, viagem_id, inicio_em, fim_em) for headers, viagem_id in bilheteiros]
+    tarefas += [(perfil, uri, admin, None, inicio_em, fim_em)] * n_leitores
+
+    with multiprocessing.get_context('spawn').Pool(len(tarefas)) as pool:
+        resultados = pool.starmap(trabalhador, tarefas)
+
+    latencias = {'venda': [], 'leitura': []}
+    erros = Counter()
+    for tipo, lista, contagem in resultados:
+        latencias[tipo].extend(lista)
+        erros.update(contagem)
+    for lista in latencias.values():
+        lista.sort()
+
+    app = criar_app_perfil(perfil, uri)
+    with app.app_context():
+        gravadas = db.session.execute(text('SELECT COUNT(*) FROM venda')).scalar()
+        db.engine.dispose()
+    return pragmas, latencias, erros, gravadas
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--bilheteiros', type=int, default=8)
+    argumentos.add_argument('--leitores', type=int, default=4)
+    argumentos.add_argument('--segundos', type=float, default=10)
+    args = argumentos.parse_args()
+
+    print(f"{args.bilheteiros} bilheteiros a vender + {args.leitores} leitores, {args.segundos:.0f}s por perfil\n")
+    for perfil in PERFIS:
+        pragmas, latencias, erros, gravadas = executar(perfil, args.bilheteiros, args.leitores, args.segundos)
+        vendas, leituras = latencias['venda'], latencias['leitura']
+        print(f"== Perfil {perfil} {pragmas}")
+        print(f"   vendas:   {len(vendas) / args.segundos:8.1f}/s (p50 {percentil(vendas, .5):.1f} ms, "
+              f"p95 {percentil(vendas, .95):.1f} ms) | gravadas: {gravadas}")
+        print(f"   leituras: {len(leituras) / args.segundos:8.1f}/s (p50 {percentil(leituras, .5):.1f} ms, "
+              f"p95 {percentil(leituras, .95):.1f} ms)")
+        print(f"   falhas: {sum(erros.values())}")
+        for erro, quantidade in erros.most_common(5):
+            print(f"     {quantidade:6d} x {erro}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+"""
+Suíte de benchmark dos endpoints de todos os blueprints.
+
+Corre cada endpoint de cadastros, operacional, vendas, relatorios e auth
+--repeticoes vezes contra uma CÓPIA do banco gerado por
+benchmarks.gerar_dados (o original não é alterado) e mede, por endpoint:
+latência p50/p95/p99, queries SQL por pedido e o pico de RSS do processo.
+
+Cada execução é gravada em --saida (JSON, um arquivo por execução) e
+comparada com a anterior: endpoints cujo p95 piorou mais que
+--limite-regressao, ou que passaram a fazer mais queries, são marcados.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.gerar_dados                 # uma vez
+    python -m benchmarks.endpoints [--banco instance/carga.db] [--repeticoes 20] [--filtro vendas]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import event, func
+from config import Config, basedir
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Usuario, Motorista, Onibus, Rota, Viagem, RegistroOperacional, Venda, CaixaDiario, ReceitaDiaria, Alteracao
+)
+from app.receita import reconstruir
+from app import sincronizacao
+from benchmarks.comum import cabecalho_auth
+from benchmarks.gerar_dados import BANCO_PADRAO
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+SAIDA_PADRAO = os.path.join(basedir, 'instance', 'benchmarks')
+
+
+class Caso:
+    """
+    Um endpoint a medir. 'pedido(ctx, i)' devolve (método, url, corpo_json, headers)
+    da i-ésima repetição; 'depois(ctx, resposta)' (opcional) guarda o que o pedido
+    criou para os casos seguintes (ex.: ids para o PUT e o DELETE).
+    """
+
+    def __init__(self, blueprint, nome, pedido, depois=None, repeticoes=None, status=(200,)):
+        self.blueprint = blueprint
+        self.nome = nome
+        self.pedido = pedido
+        self.depois = depois
+        self.repeticoes = repeticoes
+        self.status = status
+
+
+def guardar(chave, campo='id'):
+    """ 'depois' que acumula em ctx.criados[chave] o id devolvido pelo POST """
+    def depois(ctx, resposta):
+        dados = resposta.get_json()
+        for parte in campo.split('.'):
+            dados = dados[parte]
+        ctx.criados.setdefault(chave, []).append(dados)
+    return depois
+
+
+def criado(ctx, chave, i):
+    lista = ctx.criados.get(chave) or [0]
+    return lista[i % len(lista)]
+
+
+def dia(ctx, dias_atras=1):
+    return (ctx.hoje - timedelta(days=dias_atras)).strftime('%Y-%m-%d')
+
+
+def crud_cadastro(recurso, corpo):
+    """ POST, GET (lista e detalhe), PUT e DELETE de um cadastro, nessa ordem """
+    url = f'/api/cadastros/{recurso}'
+    return [
+        Caso('cadastros', f'POST {url}', lambda c, i: ('post', url, corpo(c, i), c.admin),
+             depois=guardar(recurso), status=(201,)),
+        Caso('cadastros', f'GET {url}', lambda c, i: ('get', url, None, c.admin)),
+        Caso('cadastros', f'GET {url}/<id>', lambda c, i: ('get', f'{url}/{c.ids[recurso][i % len(c.ids[recurso])]}', None, c.admin)),
+        Caso('cadastros', f'PUT {url}/<id>', lambda c, i: ('put', f'{url}/{criado(c, recurso, i)}', corpo(c, i + 10**6), c.admin)),
+        Caso('cadastros', f'DELETE {url}/<id>', lambda c, i: ('delete', f'{url}/{criado(c, recurso, i)}', None, c.admin)),
+    ]
+
+
+def nova_viagem(c, i):
+    # Uma por dia, além do horizonte gerado: sem conflito de escala com o ônibus/motorista
+    partida = c.hoje + timedelta(days=400 + i)
+    return {'rota_id': c.ids['rotas'][0], 'onibus_id': c.ids['onibus'][0], 'motorista_id': c.ids['motoristas'][0],
+            'data_partida_prevista': partida.isoformat(), 'data_chegada_prevista': (partida + timedelta(hours=5)).isoformat()}
+
+
+def nova_venda(c, i, poltrona):
+    return {'viagem_id': c.viagem_livre, 'nome_passageiro': f'Benchmark {i}', 'documento_passageiro': f'{i:011d}',
+            'numero_poltrona': poltrona, 'valor_passagem': 99.9, 'metodo_pagamento': 'Pix'}
+
+
+CASOS = [
+    # --- auth ---
+    Caso('auth', 'POST /api/auth/login', lambda c, i: ('post', '/api/auth/login', {'usuario': c.login, 'senha': '123'}, {}),
+         repeticoes=5),
+    Caso('auth', 'GET /api/auth/perfil', lambda c, i: ('get', '/api/auth/perfil', None, c.bilheteiro)),
+    Caso('auth', 'GET /api/auth/usuarios', lambda c, i: ('get', '/api/auth/usuarios', None, c.admin)),
+    Caso('auth', 'POST /api/auth/register', lambda c, i: ('post', '/api/auth/register', {
+        'usuario': f'bench_{c.execucao}_{i}', 'senha': '123', 'nome_completo': f'Benchmark {i}'}, c.admin),
+         depois=guardar('usuarios', 'usuario.id'), repeticoes=5, status=(201,)),
+    Caso('auth', 'PUT /api/auth/usuarios/<id>', lambda c, i: ('put', f'/api/auth/usuarios/{criado(c, "usuarios", i)}',
+                                                             {'nome_completo': f'Benchmark alterado {i}'}, c.admin)),
+    Caso('auth', 'POST /api/auth/usuarios/<id>/reset-password', lambda c, i: (
+        'post', f'/api/auth/usuarios/{criado(c, "usuarios", i)}/reset-password', {'nova_senha': '456'}, c.admin), repeticoes=5),
+    Caso('auth', 'DELETE /api/auth/usuarios/<id>', lambda c, i: ('delete', f'/api/auth/usuarios/{criado(c, "usuarios", i)}', None, c.admin),
+         repeticoes=5),
+
+    # --- cadastros ---
+    *crud_cadastro('motoristas', lambda c, i: {'nome_completo': f'Motorista Benchmark {c.execucao} {i}'}),
+    *crud_cadastro('onibus', lambda c, i: {'numero_onibus': f'B{c.execucao}-{i}', 'capacidade': 46}),
+    *crud_cadastro('rotas', lambda c, i: {'origem': 'Benchmark', 'destino': f'Destino {i}'}),
+
+    # --- operacional ---
+    Caso('operacional', 'GET /api/operacional/viagens (completa)', lambda c, i: ('get', '/api/operacional/viagens', None, c.admin),
+         repeticoes=3),
+    Caso('operacional', 'GET /api/operacional/viagens?limite=50', lambda c, i: ('get', '/api/operacional/viagens?limite=50', None, c.admin)),
+    Caso('operacional', 'GET /api/operacional/viagens?data_inicio=&data_fim= (1 dia)', lambda c, i: (
+        'get', f'/api/operacional/viagens?data_inicio={dia(c, i % 30 + 1)}&data_fim={dia(c, i % 30 + 1)}', None, c.admin)),
+    Caso('operacional', 'GET /api/operacional/viagens/conflitos (30 dias)', lambda c, i: (
+        'get', f'/api/operacional/viagens/conflitos?data_inicio={dia(c, 30)}', None, c.admin), repeticoes=3),
+    Caso('operacional', 'POST /api/operacional/viagens', lambda c, i: ('post', '/api/operacional/viagens', nova_viagem(c, i), c.admin),
+         depois=guardar('viagens'), status=(201,)),
+    Caso('operacional', 'PUT /api/operacional/viagens/<id>', lambda c, i: (
+        'put', f'/api/operacional/viagens/{criado(c, "viagens", i)}', {'status': 'Em Trânsito'}, c.admin)),
+    Caso('operacional', 'POST /api/operacional/registros', lambda c, i: ('post', '/api/operacional/registros', {
+        'viagem_id': c.ids['viagens'][i % len(c.ids['viagens'])], 'pass_embarcaram': 10, 'pass_final': 10}, c.bilheteiro),
+         depois=guardar('registros'), status=(201,)),
+    Caso('operacional', 'GET /api/operacional/registros', lambda c, i: ('get', '/api/operacional/registros', None, c.admin),
+         repeticoes=3),
+    Caso('operacional', 'PUT /api/operacional/registros/<id>', lambda c, i: (
+        'put', f'/api/operacional/registros/{criado(c, "registros", i)}', {'observacoes': 'benchmark'}, c.bilheteiro)),
+    Caso('operacional', 'DELETE /api/operacional/registros/<id>', lambda c, i: (
+        'delete', f'/api/operacional/registros/{criado(c, "registros", i)}', None, c.bilheteiro)),
+    Caso('operacional', 'DELETE /api/operacional/viagens/<id>', lambda c, i: (
+        'delete', f'/api/operacional/viagens/{criado(c, "viagens", i)}', None, c.admin)),
+
+    # --- vendas ---
+    Caso('vendas', 'POST /api/vendas/caixa/abrir', lambda c, i: ('post', '/api/vendas/caixa/abrir', {'saldo_inicial': 0}, c.vendedor),
+         repeticoes=1, status=(201,)),
+    Caso('vendas', 'GET /api/vendas/caixa/ativo', lambda c, i: ('get', '/api/vendas/caixa/ativo', None, c.vendedor)),
+    Caso('vendas', 'GET /api/vendas/caixa', lambda c, i: ('get', '/api/vendas/caixa', None, c.admin), repeticoes=3),
+    Caso('vendas', 'POST /api/vendas/vendas', lambda c, i: ('post', '/api/vendas/vendas', nova_venda(c, i, i + 1), c.vendedor),
+         status=(201,)),
+    Caso('vendas', 'POST /api/vendas/vendas/lote (4 passageiros)', lambda c, i: ('post', '/api/vendas/vendas/lote', {
+        'viagem_id': c.viagem_lote + i, 'metodo_pagamento': 'Cartão',
+        'passageiros': [{'nome_passageiro': f'Grupo {i}-{p}', 'documento_passageiro': f'{p:011d}',
+                         'numero_poltrona': p, 'valor_passagem': 80.0} for p in range(1, 5)]}, c.vendedor),
+         status=(201,)),
+    Caso('vendas', 'GET /api/vendas/vendas?limite=50', lambda c, i: ('get', '/api/vendas/vendas?limite=50', None, c.admin)),
+    Caso('vendas', 'GET /api/vendas/vendas?viagem_id=', lambda c, i: (
+        'get', f'/api/vendas/vendas?viagem_id={c.ids["viagens"][i % len(c.ids["viagens"])]}', None, c.admin)),
+    Caso('vendas', 'GET /api/vendas/vendas?data_inicio=&data_fim= (1 dia)', lambda c, i: (
+        'get', f'/api/vendas/vendas?data_inicio={dia(c, i % 30 + 1)}&data_fim={dia(c, i % 30 + 1)}', None, c.admin), repeticoes=5),
+    Caso('vendas', 'GET /api/vendas/viagens/<id>/poltronas', lambda c, i: (
+        'get', f'/api/vendas/viagens/{c.ids["viagens"][i % len(c.ids["viagens"])]}/poltronas', None, c.vendedor)),
+    Caso('vendas', 'POST /api/vendas/caixa/fechar', lambda c, i: ('post', '/api/vendas/caixa/fechar', None, c.vendedor),
+         repeticoes=1),
+
+    # --- sincronizacao ---
+    Caso('sincronizacao', 'GET /api/sincronizacao/viagens?cursor= (recente)', lambda c, i: (
+        'get', f'/api/sincronizacao/viagens?cursor={c.cursor_recente}', None, c.admin)),
+    Caso('sincronizacao', 'GET /api/sincronizacao/vendas (do zero, 1 página)', lambda c, i: (
+        'get', '/api/sincronizacao/vendas', None, c.admin), repeticoes=5),
+
+    # --- relatorios ---
+    Caso('relatorios', 'GET /api/relatorios/caixa/<id>/pdf', lambda c, i: (
+        'get', f'/api/relatorios/caixa/{c.ids["caixas"][i % len(c.ids["caixas"])]}/pdf', None, c.admin)),
+    Caso('relatorios', 'GET /api/relatorios/viagens/docx (7 dias)', lambda c, i: (
+        'get', f'/api/relatorios/viagens/docx?data_inicio={dia(c, 8)}&data_fim={dia(c, 1)}', None, c.admin), repeticoes=3),
+    Caso('relatorios', 'GET /api/relatorios/caixas/pdf (30 dias)', lambda c, i: (
+        'get', f'/api/relatorios/caixas/pdf?data_inicio={dia(c, 31)}&data_fim={dia(c, 1)}', None, c.admin), repeticoes=3),
+    Caso('relatorios', 'GET /api/relatorios/receita (30 dias)', lambda c, i: (
+        'get', f'/api/relatorios/receita?data_inicio={dia(c, 31)}&data_fim={dia(c, 1)}', None, c.admin), repeticoes=5),
+    Caso('relatorios', 'GET /api/relatorios/ocupacao (365 dias)', lambda c, i: (
+        'get', f'/api/relatorios/ocupacao?data_inicio={dia(c, 366)}&data_fim={dia(c, 1)}', None, c.admin), repeticoes=5),
+    Caso('relatorios', 'POST /api/relatorios/jobs', lambda c, i: ('post', '/api/relatorios/jobs', {
+        'tipo': 'fecho_caixa_pdf', 'parametros': {'caixa_id': c.ids['caixas'][i % len(c.ids['caixas'])]}}, c.admin),
+         depois=guardar('jobs'), status=(202,)),
+    Caso('relatorios', 'GET /api/relatorios/jobs/<id>', lambda c, i: (
+        'get', f'/api/relatorios/jobs/{criado(c, "jobs", i)}', None, c.admin)),
+]
+
+
+def preparar_contexto(app):
+    """ Ids de amostra do banco e tokens; cria as viagens vazias usadas pelas vendas """
+    with app.app_context():
+        def amostra(modelo, n=50):
+            return [i for (i,) in db.session.query(modelo.id).order_by(func.random()).limit(n)]
+
+        admin = Usuario.query.filter_by(nivel_acesso='admin').first()
+        bilheteiro = Usuario.query.filter_by(nivel_acesso='bilheteiro').first()
+        execucao = datetime.utcnow().strftime('%H%M%S')
+        # Bilheteiro próprio, sem caixa aberto, para o ciclo abrir/vender/fechar
+        vendedor = Usuario(nome_completo=f'Vendedor Benchmark {execucao}', usuario=f'vendedor_{execucao}',
+                           nivel_acesso='bilheteiro', senha_hash=bilheteiro.senha_hash)
+        db.session.add(vendedor)
+        db.session.commit()
+
+        rota_id, onibus_id, motorista_id = (amostra(m, 1)[0] for m in (Rota, Onibus, Motorista))
+        capacidade = db.session.get(Onibus, onibus_id).capacidade
+        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        viagens = []
+        for n in range(101):
+            partida = hoje + timedelta(days=90, hours=n)
+            viagens.append(Viagem(rota_id=rota_id, onibus_id=onibus_id, motorista_id=motorista_id,
+                                  data_partida_prevista=partida, data_chegada_prevista=partida + timedelta(hours=4)))
+        db.session.add_all(viagens)
+        db.session.commit()
+
+        return SimpleNamespace(
+            admin=cabecalho_auth(admin.id, 'admin'),
+            bilheteiro=cabecalho_auth(bilheteiro.id),
+            vendedor=cabecalho_auth(vendedor.id),
+            login=bilheteiro.usuario,
+            execucao=execucao,
+            hoje=hoje,
+            capacidade=capacidade,
+            viagem_livre=viagens[0].id,
+            viagem_lote=viagens[1].id,
+            # Cursor de um cliente que sincronizou há pouco: as viagens criadas acima
+            cursor_recente=db.session.query(func.max(Alteracao.id)).scalar() - len(viagens),
+            ids={
+                'motoristas': amostra(Motorista), 'onibus': amostra(Onibus), 'rotas': amostra(Rota),
+                'viagens': amostra(Viagem, 200),
+                'caixas': [i for (i,) in db.session.query(CaixaDiario.id).filter_by(status='Fechado')
+                           .order_by(func.random()).limit(50)],
+            },
+            criados={},
+            volumes={m.__tablename__: db.session.query(func.count(m.id)).scalar()
+                     for m in (Usuario, Motorista, Onibus, Rota, Viagem, RegistroOperacional, Venda, CaixaDiario)},
+        )
+
+
+def pico_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+
+
+def percentil(valores, q):
+    """ Percentil por vizinho mais próximo (valores já ordenados) """
+    return valores[min(int(round(q * (len(valores) - 1))), len(valores) - 1)]
+
+
+def medir(app, ctx, caso, repeticoes, contador):
+    cliente = app.test_client()
+    n = min(caso.repeticoes or repeticoes, repeticoes)
+    if caso.nome.startswith('POST /api/vendas/vendas') and n > ctx.capacidade:
+        n = ctx.capacidade
+    latencias, queries, status = [], [], {}
+    for i in range(n):
+        metodo, url, corpo, headers = caso.pedido(ctx, i)
+        contador['n'] = 0
+        inicio = time.perf_counter()
+        resposta = getattr(cliente, metodo)(url, json=corpo, headers=headers)
+        resposta.get_data()  # consome respostas em streaming
+        resposta.close()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        queries.append(contador['n'])
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+        if caso.depois and resposta.status_code in caso.status:
+            caso.depois(ctx, resposta)
+    latencias.sort()
+    return {
+        'blueprint': caso.blueprint,
+        'endpoint': caso.nome,
+        'n': n,
+        'status': {str(k): v for k, v in status.items()},
+        'ok': all(k in caso.status for k in status),
+        'p50_ms': round(percentil(latencias, 0.50), 2),
+        'p95_ms': round(percentil(latencias, 0.95), 2),
+        'p99_ms': round(percentil(latencias, 0.99), 2),
+        'media_ms': round(statistics.fmean(latencias), 2),
+        'queries': round(statistics.fmean(queries), 1),
+        'pico_rss_mb': pico_rss_mb(),
+    }
+
+
+def execucao_anterior(saida, volumes):
+    """ Última execução gravada sobre um banco com os mesmos volumes (comparável) """
+    for arquivo in sorted(glob.glob(os.path.join(saida, 'endpoints-*.json')), reverse=True):
+        with open(arquivo, encoding='utf-8') as f:
+            anterior = json.load(f)
+        if anterior.get('volumes') == volumes:
+            return arquivo, {r['endpoint']: r for r in anterior['resultados']}
+    return None, {}
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=basedir, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--banco', default=BANCO_PADRAO)
+    argumentos.add_argument('--repeticoes', type=int, default=20)
+    argumentos.add_argument('--filtro', help='só endpoints cujo nome/blueprint contém este texto')
+    argumentos.add_argument('--saida', default=SAIDA_PADRAO, help='pasta dos resultados (JSON por execução)')
+    argumentos.add_argument('--limite-regressao', type=float, default=1.25,
+                            help='p95 acima de anterior x este fator é marcado como regressão')
+    args = argumentos.parse_args()
+
+    if not os.path.exists(args.banco):
+        raise SystemExit(f"{args.banco} não existe. Gere-o antes com: python -m benchmarks.gerar_dados")
+
+    # Trabalha numa cópia: as escritas do benchmark não se acumulam entre execuções
+    pasta = tempfile.mkdtemp(prefix='bench_endpoints_')
+    copia = os.path.join(pasta, 'carga.db')
+    shutil.copy(args.banco, copia)
+    for extra in ('-wal', '-shm'):
+        if os.path.exists(args.banco + extra):
+            shutil.copy(args.banco + extra, copia + extra)
+
+    app = create_app(type('ConfigEndpoints', (Config,), {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + copia}))
+    contador = {'n': 0}
+    with app.app_context():
+        # Bancos gerados antes de tabelas novas (ex.: receita_diaria): cria e preenche na cópia
+        db.create_all()
+        if not db.session.query(ReceitaDiaria.data).first():
+            reconstruir()
+            db.session.commit()
+        if not db.session.query(Alteracao.id).first():
+            sincronizacao.reconstruir()
+            db.session.commit()
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def contar(*_):
+            contador['n'] += 1
+
+    ctx = preparar_contexto(app)
+    casos = [c for c in CASOS if not args.filtro or args.filtro in c.nome or args.filtro == c.blueprint]
+    print(f"Banco: {args.banco} {ctx.volumes}")
+    print(f"{'endpoint':<62} {'n':>3} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'RSS MB':>7}")
+
+    arquivo_anterior, anteriores = execucao_anterior(args.saida, ctx.volumes)
+    resultados, regressoes = [], []
+    try:
+        for caso in casos:
+            r = medir(app, ctx, caso, args.repeticoes, contador)
+            resultados.append(r)
+            marca = '' if r['ok'] else f"  status {r['status']}"
+            anterior = anteriores.get(r['endpoint'])
+            if anterior and anterior.get('ok') and r['ok']:
+                if r['p95_ms'] > anterior['p95_ms'] * args.limite_regressao or r['queries'] > anterior['queries']:
+                    regressoes.append(r['endpoint'])
+                    marca += (f"  REGRESSÃO (p95 {anterior['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms, "
+                              f"queries {anterior['queries']} -> {r['queries']})")
+            rss = f"{r['pico_rss_mb']:7.0f}" if r['pico_rss_mb'] is not None else '      -'
+            print(f"{r['endpoint'][:62]:<62} {r['n']:>3} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['queries']:>8} {rss}{marca}")
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    os.makedirs(args.saida, exist_ok=True)
+    destino = os.path.join(args.saida, f"endpoints-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(destino, 'w', encoding='utf-8') as f:
+        json.dump({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit_atual(),
+            'banco': args.banco,
+            'volumes': ctx.volumes,
+            'repeticoes': args.repeticoes,
+            'filtro': args.filtro,
+            'resultados': resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados em {destino}")
+    if arquivo_anterior:
+        print(f"Comparado com {arquivo_anterior}: {len(regressoes)} regressão(ões)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Stream de eventos (SSE): --clientes assinantes ligados ao mesmo tempo, todos
+atendidos pela única thread do servidor de eventos, e --eventos publicados
+pelas rotas (PUT /viagens/<id> com mudança de status) e em rajada
+(hub_eventos.publicar direto).
+
+Mede o tempo de cada publicação (não espera pelos clientes), o tempo até o
+último assinante receber o último evento e as threads do processo. Um
+assinante extra nunca lê o socket: a fila de saída dele passa do limite, ele é desligado e as
+publicações não param (no loopback, os buffers do kernel ainda absorvem
+alguns MB antes da fila de saída começar a crescer). No fim, um cliente reconecta com Last-Event-ID e
+recebe do histórico só o que perdeu.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.eventos [--clientes 500] [--eventos 2000] [--porta 5013]
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from app.extensions import db, hub_eventos
+from app.models import Viagem
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+
+async def assinar(porta, token, extra=''):
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta, limit=1 << 20)
+    escritor.write(f'GET /api/eventos?token={token} HTTP/1.1\r\nHost: localhost\r\n{extra}\r\n'.encode())
+    await escritor.drain()
+    await leitor.readuntil(b'\r\n\r\n')
+    return leitor, escritor
+
+
+async def receber(leitor, total, tipo):
+    """ Lê até 'total' eventos do tipo e retorna o instante do último """
+    vistos = 0
+    marca = f'event: {tipo}\n'.encode()
+    while vistos < total:
+        bloco = await leitor.read(1 << 16)
+        if not bloco:
+            raise ConnectionError('stream fechado')
+        vistos += bloco.count(marca)
+    return time.perf_counter()
+
+
+async def receber_todos(conexoes, total, tipo):
+    return await asyncio.gather(*(receber(leitor, total, tipo) for leitor, _ in conexoes))
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--clientes', type=int, default=500)
+    argumentos.add_argument('--eventos', type=int, default=2000)
+    argumentos.add_argument('--porta', type=int, default=5013)
+    args = argumentos.parse_args()
+
+    # Fila de saída pequena, para o assinante que não lê passar do limite durante a rajada
+    app = criar_app_benchmark(EVENTOS_PORTA=args.porta, EVENTOS_MAX_CLIENTES=args.clientes + 10,
+                              EVENTOS_HISTORICO=args.eventos * 2, EVENTOS_FILA_KB=64)
+    with app.app_context():
+        admin = cabecalho_auth(criar_usuario('admin', 'admin'), 'admin')
+        token = admin['Authorization'].split()[1]
+        motorista_id, onibus_id, rota_id = criar_cadastros_basicos()
+        partida = datetime(2031, 1, 1, 8)
+        viagem = Viagem(rota_id=rota_id, onibus_id=onibus_id, motorista_id=motorista_id,
+                        data_partida_prevista=partida, data_chegada_prevista=partida + timedelta(hours=2))
+        db.session.add(viagem)
+        db.session.commit()
+        viagem_id = viagem.id
+    cliente_http = app.test_client()
+    cliente_http.get('/api/status')  # primeiro pedido: sobe o servidor de eventos
+
+    # Os assinantes correm noutro loop (outra thread), como clientes externos
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def em_loop(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def ligar_todos():
+        conexoes = []
+        for i in range(0, args.clientes, 100):
+            conexoes += await asyncio.gather(*(assinar(args.porta, token)
+                                               for _ in range(min(100, args.clientes - i))))
+        return conexoes
+
+    antes = time.perf_counter()
+    conexoes = em_loop(ligar_todos())
+    print(f'{args.clientes} assinantes ligados em {time.perf_counter() - antes:.2f} s; '
+          f'threads no processo: {threading.active_count()}')
+
+    # Assinante que nunca lê: buffer de recepção mínimo para a fila dele encher logo
+    lento = socket.socket()
+    lento.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    lento.connect(('127.0.0.1', args.porta))
+    lento.sendall(f'GET /api/eventos?token={token} HTTP/1.1\r\n\r\n'.encode())
+
+    # 1) Pelas rotas: cada PUT que muda o status publica 'viagem_status'
+    mudancas = min(args.eventos, 200)
+    recepcao = asyncio.run_coroutine_threadsafe(receber_todos(conexoes, mudancas, 'viagem_status'), loop)
+    antes = time.perf_counter()
+    for i in range(mudancas):
+        cliente_http.put(f'/api/operacional/viagens/{viagem_id}',
+                         json={'status': 'Em Andamento' if i % 2 == 0 else 'Agendada'}, headers=admin)
+    tempo_rotas = time.perf_counter() - antes
+    ultimo = max(recepcao.result(60))
+    print(f'\n{mudancas} PUTs com mudança de status: {tempo_rotas * 1e3 / mudancas:.2f} ms/pedido; '
+          f'todos os assinantes com todos os eventos {(ultimo - antes) * 1e3:.0f} ms depois do primeiro PUT')
+
+    # 2) Rajada direto no hub
+    carga = {'viagem_id': viagem_id, 'pass_embarcaram': 12, 'observacoes': 'x' * 2000}
+    recepcao = asyncio.run_coroutine_threadsafe(receber_todos(conexoes, args.eventos, 'registro'), loop)
+    tempos = []
+    antes = time.perf_counter()
+    for _ in range(args.eventos):
+        inicio = time.perf_counter()
+        hub_eventos.publicar('registro', carga)
+        tempos.append(time.perf_counter() - inicio)
+    ultimo = max(recepcao.result(120))
+    tempos.sort()
+    entregas = args.clientes * args.eventos
+    print(f'{args.eventos} publicações em rajada: p50 {tempos[len(tempos) // 2] * 1e6:.0f} us, '
+          f'máx {tempos[-1] * 1e6:.0f} us por publicação; {entregas} entregas em {ultimo - antes:.2f} s '
+          f'({entregas / (ultimo - antes):,.0f}/s)')
+    print(f'assinantes desligados por fila cheia: {hub_eventos.desligados} (o que não lê); '
+          f'threads no processo: {threading.active_count()}')
+
+    # 3) Reconexão com Last-Event-ID: só os eventos depois dele, do histórico
+    desde = f'{hub_eventos.epoca}.{hub_eventos.publicados - 10}'
+
+    async def reconectar():
+        leitor, escritor = await assinar(args.porta, token, f'Last-Event-ID: {desde}\r\n')
+        instante = await receber(leitor, 10, 'registro')
+        escritor.close()
+        return instante
+
+    em_loop(asyncio.wait_for(reconectar(), 10))
+    print(f'reconexão com Last-Event-ID {desde}: 10 eventos recebidos do histórico')
+
+    lento.close()
+    for _, escritor in conexoes:
+        loop.call_soon_threadsafe(escritor.close)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Gerador de carga sintética: preenche um banco com volumes de produção.
+
+Cria (via create_app) motoristas, ônibus, rotas, bilheteiros e um histórico
+de --dias de operação: viagens com horários concentrados nos picos e mais
+movimento às sextas e domingos, vendas com ocupação variável por rota,
+antecedência de compra realista e mix de métodos de pagamento, caixas
+diários com os totais batendo com as vendas e registros operacionais das
+viagens já realizadas. Os próximos --dias-futuros ficam com viagens
+agendadas e parcialmente vendidas. O agregado diário de receita é
+reconstruído no fim a partir das vendas geradas.
+
+Com os padrões (365 dias, 110 viagens/dia) são ~40 mil viagens e ~1 milhão
+de vendas; --viagens-por-dia 1100 chega a ~10 milhões. A mesma --semente
+gera sempre o mesmo banco.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.gerar_dados [--banco instance/carga.db] [--dias 365] [--viagens-por-dia 110]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, func
+from config import Config, basedir
+from app import create_app
+from app.extensions import db, bcrypt
+from app.receita import reconstruir
+from app.models import Usuario, Motorista, Onibus, Rota, Viagem, RegistroOperacional, Venda, CaixaDiario
+
+BANCO_PADRAO = os.path.join(basedir, 'instance', 'carga.db')
+TAMANHO_LOTE = 20000
+
+CIDADES = [
+    'São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Salvador', 'Fortaleza', 'Recife', 'Brasília',
+    'Goiânia', 'Teresina', 'São Luís', 'Natal', 'João Pessoa', 'Maceió', 'Aracaju', 'Vitória',
+    'Curitiba', 'Campinas', 'Juazeiro do Norte', 'Petrolina', 'Feira de Santana', 'Imperatriz',
+    'Parnaíba', 'Sobral', 'Mossoró', 'Campina Grande', 'Caruaru', 'Palmas', 'Uberlândia',
+]
+METODOS_PAGAMENTO = (['Pix', 'Cartão', 'Dinheiro'], [45, 35, 20])
+CAPACIDADES = ([42, 44, 46, 50], [15, 25, 45, 15])
+# Peso relativo de partidas por hora do dia (picos de manhã cedo e ao fim da tarde)
+PESO_HORA = [1, 1, 1, 1, 2, 6, 9, 8, 5, 3, 3, 3, 3, 3, 4, 5, 7, 9, 9, 7, 5, 4, 3, 2]
+# Movimento relativo por dia da semana (segunda = 0)
+PESO_DIA_SEMANA = [0.9, 0.8, 0.8, 0.9, 1.3, 1.1, 1.3]
+# Bilheteria funciona das 6h às 22h
+HORA_ABRE, HORA_FECHA = 6, 22
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--banco', default=BANCO_PADRAO, help='arquivo SQLite a criar (não pode ter viagens)')
+    parser.add_argument('--dias', type=int, default=365, help='dias de histórico até hoje')
+    parser.add_argument('--dias-futuros', type=int, default=14)
+    parser.add_argument('--viagens-por-dia', type=int, default=110)
+    parser.add_argument('--rotas', type=int, default=60)
+    parser.add_argument('--onibus', type=int, default=120)
+    parser.add_argument('--motoristas', type=int, default=150)
+    parser.add_argument('--bilheteiros', type=int, default=25)
+    parser.add_argument('--semente', type=int, default=42)
+    return parser.parse_args()
+
+
+class Gerador:
+    def __init__(self, args, agora):
+        self.args = args
+        self.agora = agora
+        self.aleatorio = random.Random(args.semente)
+        self.lotes = {modelo: [] for modelo in (Viagem, Venda, RegistroOperacional)}
+        self.contagem = {modelo: 0 for modelo in self.lotes}
+        # (bilheteiro_id, data) -> [dinheiro, pix, cartão]
+        self.totais_caixa = {}
+        # id -> quando o ônibus/motorista termina a última viagem (escala sem sobreposições)
+        self.onibus_livre = {}
+        self.motorista_livre = {}
+
+    # --- Cadastros ---
+
+    def cadastros(self):
+        a, args = self.aleatorio, self.args
+        senha_hash = bcrypt.generate_password_hash('123').decode('utf-8')  # um hash só, reaproveitado
+
+        if not Usuario.query.filter_by(usuario='admin').first():
+            db.session.add(Usuario(nome_completo='Administrador Padrão', usuario='admin',
+                                   nivel_acesso='admin', senha_hash=senha_hash))
+        bilheteiros = [Usuario(nome_completo=f'Bilheteiro Carga {i:03d}', usuario=f'carga{i:03d}',
+                               nivel_acesso='bilheteiro', senha_hash=senha_hash)
+                       for i in range(1, args.bilheteiros + 1)]
+        motoristas = [Motorista(nome_completo=f'Motorista Carga {i:04d}', contato=f'(88) 9{i:04d}-{i % 10000:04d}')
+                      for i in range(1, args.motoristas + 1)]
+        frota = [Onibus(numero_onibus=f'C{i:04d}', placa=f'CRG{i:04d}',
+                        capacidade=a.choices(*CAPACIDADES)[0]) for i in range(1, args.onibus + 1)]
+        pares = [(o, d) for o in CIDADES for d in CIDADES if o != d]
+        rotas = [Rota(origem=o, destino=d, tipo_rota=a.choice(['Interestadual', 'Intermunicipal']))
+                 for o, d in a.sample(pares, min(args.rotas, len(pares)))]
+        db.session.add_all(bilheteiros + motoristas + frota + rotas)
+        db.session.commit()
+
+        self.bilheteiros = [b.id for b in bilheteiros]
+        # Alguns bilheteiros (guichês centrais) vendem bem mais que outros
+        self.peso_bilheteiros = [a.paretovariate(1.5) for _ in bilheteiros]
+        self.motoristas = [m.id for m in motoristas]
+        self.frota = [(o.id, o.capacidade) for o in frota]
+        # Popularidade das rotas segue uma lei de potência (poucas rotas muito procuradas)
+        self.rotas = []
+        for posicao, rota in enumerate(rotas):
+            self.rotas.append({
+                'id': rota.id,
+                'peso': 1 / (posicao + 1) ** 1.1,
+                'duracao': timedelta(minutes=a.randrange(90, 14 * 60, 15)),
+                'preco': round(a.uniform(40, 320), 2),
+                # Rotas populares enchem mais
+                'ocupacao': 0.45 + 0.45 / (1 + posicao / 8),
+            })
+        self.peso_rotas = [r['peso'] for r in self.rotas]
+
+    # --- Viagens e o que depende delas ---
+
+    def viagens(self):
+        a, args = self.aleatorio, self.args
+        hoje = self.agora.replace(hour=0, minute=0, second=0, microsecond=0)
+        proximo_id = (db.session.query(func.max(Viagem.id)).scalar() or 0) + 1
+        for dia in range(-args.dias, args.dias_futuros + 1):
+            data = hoje + timedelta(days=dia)
+            quantidade = round(args.viagens_por_dia * PESO_DIA_SEMANA[data.weekday()] * a.uniform(0.9, 1.1))
+            rotas = a.choices(self.rotas, weights=self.peso_rotas, k=quantidade)
+            horas = a.choices(range(24), weights=PESO_HORA, k=quantidade)
+            partidas = [data + timedelta(hours=hora, minutes=a.randrange(0, 60, 5)) for hora in horas]
+            # Em ordem de partida, para a escala de ônibus e motoristas ir sendo preenchida no tempo
+            for partida, rota in sorted(zip(partidas, rotas), key=lambda par: par[0]):
+                self.viagem(proximo_id, rota, partida, data)
+                proximo_id += 1
+            self.descarregar()
+        self.descarregar(tudo=True)
+
+    def viagem(self, viagem_id, rota, partida, data):
+        a = self.aleatorio
+        chegada = partida + rota['duracao']
+        onibus_id, capacidade = self.escalar(self.frota, lambda o: o[0], self.onibus_livre, partida, chegada)
+        if chegada < self.agora:
+            status = a.choices(['Concluída', 'Cancelada'], weights=[96, 4])[0]
+        elif partida <= self.agora:
+            status = 'Em Trânsito'
+        else:
+            status = 'Agendada'
+        self.adicionar(Viagem, {
+            'id': viagem_id, 'rota_id': rota['id'], 'onibus_id': onibus_id,
+            'motorista_id': self.escalar(self.motoristas, lambda m: m, self.motorista_livre, partida, chegada),
+            'data_partida_prevista': partida, 'data_chegada_prevista': chegada, 'status': status,
+        })
+
+        # Ocupação: beta em torno da ocupação típica da rota, ajustada pelo dia da semana
+        media = min(rota['ocupacao'] * PESO_DIA_SEMANA[data.weekday()], 0.97)
+        ocupacao = a.betavariate(8 * media, 8 * (1 - media))
+        if status == 'Cancelada':
+            ocupacao *= 0.2
+        vendidos = round(capacidade * ocupacao)
+
+        embarcados = 0
+        for poltrona in a.sample(range(1, capacidade + 1), vendidos):
+            momento = self.momento_venda(partida)
+            if momento is None:
+                continue  # venda que ainda não aconteceu (viagem futura)
+            embarcados += 1
+            bilheteiro_id = a.choices(self.bilheteiros, weights=self.peso_bilheteiros)[0]
+            metodo = a.choices(*METODOS_PAGAMENTO)[0]
+            # 10% com desconto (idoso, estudante...)
+            valor = round(rota['preco'] * (0.5 if a.random() < 0.1 else 1), 2)
+            self.adicionar(Venda, {
+                'viagem_id': viagem_id, 'bilheteiro_id': bilheteiro_id, 'data_hora_venda': momento,
+                'nome_passageiro': f'Passageiro {viagem_id}-{poltrona}',
+                'documento_passageiro': f'{a.randrange(10**10, 10**11)}',
+                'numero_poltrona': poltrona, 'valor_passagem': valor, 'metodo_pagamento': metodo,
+            })
+            totais = self.totais_caixa.setdefault((bilheteiro_id, momento.date()), [0.0, 0.0, 0.0])
+            totais[['Dinheiro', 'Pix', 'Cartão'].index(metodo)] += valor
+
+        if status in ('Concluída', 'Em Trânsito'):
+            atraso = timedelta(minutes=round(a.gammavariate(1.5, 8)))
+            chegaram = a.randint(0, embarcados)
+            desembarcaram = a.randint(0, chegaram)
+            self.adicionar(RegistroOperacional, {
+                'viagem_id': viagem_id, 'bilheteiro_id': a.choice(self.bilheteiros),
+                'data_hora_chegada_real': partida + atraso - timedelta(minutes=10),
+                'data_hora_saida_real': partida + atraso,
+                'pass_chegaram': chegaram, 'pass_desembarcaram': desembarcaram,
+                'pass_embarcaram': embarcados, 'pass_final': chegaram - desembarcaram + embarcados,
+                'observacoes': 'Atraso na chegada' if atraso > timedelta(minutes=30) else None,
+            })
+
+    def escalar(self, opcoes, chave, livre_em, partida, chegada):
+        """
+        Sorteia um ônibus/motorista livre na partida (sem viagem sobreposta).
+        Se o sorteio não achar um, fica o que se libera primeiro.
+        """
+        a = self.aleatorio
+        for _ in range(20):
+            opcao = a.choice(opcoes)
+            if livre_em.get(chave(opcao), partida) <= partida:
+                break
+        else:
+            opcao = min(opcoes, key=lambda o: livre_em.get(chave(o), partida))
+        livre_em[chave(opcao)] = chegada
+        return opcao
+
+    def momento_venda(self, partida):
+        """ Antecedência exponencial (média de 2 dias), no horário da bilheteria; None se for no futuro """
+        a = self.aleatorio
+        momento = partida - timedelta(minutes=min(a.expovariate(1 / (2 * 24 * 60)), 30 * 24 * 60) + 20)
+        if not HORA_ABRE <= momento.hour < HORA_FECHA:
+            if momento.hour < HORA_ABRE:
+                momento -= timedelta(days=1)
+            momento = momento.replace(hour=a.randrange(HORA_ABRE, HORA_FECHA), minute=a.randrange(60))
+        return momento if momento <= self.agora else None
+
+    def caixas(self):
+        """ Um caixa por bilheteiro e dia com vendas; o de hoje fica aberto """
+        a = self.aleatorio
+        linhas = []
+        for (bilheteiro_id, dia), (dinheiro, pix, cartao) in sorted(self.totais_caixa.items(), key=lambda i: i[0][1]):
+            abertura = datetime.combine(dia, datetime.min.time()) + timedelta(hours=HORA_ABRE, minutes=-a.randrange(5, 30))
+            aberto = dia == self.agora.date()
+            linhas.append({
+                'bilheteiro_id': bilheteiro_id, 'data_abertura': abertura,
+                'data_fechamento': None if aberto else abertura + timedelta(hours=HORA_FECHA - HORA_ABRE, minutes=40),
+                'saldo_inicial': a.choice([0.0, 50.0, 100.0]),
+                'total_vendas_dinheiro': round(dinheiro, 2), 'total_vendas_pix': round(pix, 2),
+                'total_vendas_cartao': round(cartao, 2), 'total_geral_vendas': round(dinheiro + pix + cartao, 2),
+                'status': 'Aberto' if aberto else 'Fechado',
+            })
+        for inicio in range(0, len(linhas), TAMANHO_LOTE):
+            db.session.execute(insert(CaixaDiario), linhas[inicio:inicio + TAMANHO_LOTE])
+        db.session.commit()
+        return len(linhas)
+
+    # --- Inserção em lotes ---
+
+    def adicionar(self, modelo, linha):
+        self.lotes[modelo].append(linha)
+
+    def descarregar(self, tudo=False):
+        """ Grava os lotes cheios (ou todos) com executemany, um commit por descarga """
+        gravou = False
+        for modelo, linhas in self.lotes.items():
+            if linhas and (tudo or len(linhas) >= TAMANHO_LOTE):
+                db.session.execute(insert(modelo), linhas)
+                self.contagem[modelo] += len(linhas)
+                linhas.clear()
+                gravou = True
+        if gravou:
+            db.session.commit()
+
+
+def main():
+    args = argumentos()
+    os.makedirs(os.path.dirname(os.path.abspath(args.banco)), exist_ok=True)
+    config = type('ConfigCarga', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(args.banco),
+        # Carga em massa: sem fsync a cada commit (o arquivo é descartável)
+        'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'OFF', 'cache_size': -256000},
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        if Viagem.query.first():
+            raise SystemExit(f"{args.banco} já tem viagens. Use outro --banco ou apague o arquivo.")
+
+        inicio = time.perf_counter()
+        gerador = Gerador(args, datetime.utcnow().replace(microsecond=0))
+        gerador.cadastros()
+        gerador.viagens()
+        caixas = gerador.caixas()
+        linhas_receita = reconstruir()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+        print(f"Banco: {args.banco} ({time.perf_counter() - inicio:.0f}s)")
+        print(f"  {len(gerador.rotas)} rotas, {len(gerador.frota)} ônibus, {len(gerador.motoristas)} motoristas, "
+              f"{len(gerador.bilheteiros)} bilheteiros (senha '123')")
+        print(f"  {gerador.contagem[Viagem]} viagens, {gerador.contagem[Venda]} vendas, "
+              f"{gerador.contagem[RegistroOperacional]} registros, {caixas} caixas, "
+              f"{linhas_receita} linhas de receita_diaria")
+
+
+if __name__ == '__main__':
+    main()
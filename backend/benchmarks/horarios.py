@@ -0,0 +1,91 @@
+"""
+Geração de viagens a partir dos modelos de horário: POST /horarios/gerar
+(um INSERT em lote por GERADOR_VIAGENS_LOTE viagens) contra o caminho antigo,
+um POST /viagens por viagem (parse de datas, verificação de escala e commit
+a cada uma).
+
+Cria um banco temporário com --rotas rotas e --horarios-por-rota modelos
+por rota, cada um com o seu ônibus e motorista, e mede a simulação e a
+geração de --dias dias, depois a segunda geração (tudo já existe). O
+caminho antigo é medido em --amostra viagens e extrapolado.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.horarios [--rotas 60] [--horarios-por-rota 6] [--dias 90] [--amostra 300]
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from app.extensions import db
+from app.models import Motorista, Onibus, Rota, HorarioViagem, Viagem
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth
+
+
+def popular(rotas, horarios_por_rota):
+    """ Um ônibus e um motorista por modelo, para a grade não ter conflitos de escala """
+    intervalo = 24 * 60 // horarios_por_rota
+    for r in range(rotas):
+        rota = Rota(origem=f'Origem {r}', destino=f'Destino {r}')
+        db.session.add(rota)
+        db.session.flush()
+        for h in range(horarios_por_rota):
+            onibus = Onibus(numero_onibus=f'ON-{r}-{h}', placa=f'B{r:03d}{h:03d}')
+            motorista = Motorista(nome_completo=f'Motorista {r}-{h}')
+            db.session.add_all([onibus, motorista])
+            db.session.flush()
+            db.session.add(HorarioViagem(
+                rota_id=rota.id, onibus_id=onibus.id, motorista_id=motorista.id,
+                hora_partida=(datetime.min + timedelta(minutes=h * intervalo)).time(),
+                duracao_minutos=intervalo - 30, dias_semana='0123456' if h % 2 else '12345'))
+    db.session.commit()
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--rotas', type=int, default=60)
+    argumentos.add_argument('--horarios-por-rota', type=int, default=6)
+    argumentos.add_argument('--dias', type=int, default=90)
+    argumentos.add_argument('--amostra', type=int, default=300)
+    args = argumentos.parse_args()
+
+    app = criar_app_benchmark()
+    with app.app_context():
+        admin = cabecalho_auth(criar_usuario('admin', 'admin'), 'admin')
+        popular(args.rotas, args.horarios_por_rota)
+    cliente = app.test_client()
+    inicio = date(2031, 1, 1)
+    periodo = {'data_inicio': inicio.isoformat(), 'data_fim': (inicio + timedelta(days=args.dias - 1)).isoformat()}
+
+    def gerar(**extras):
+        antes = time.perf_counter()
+        resposta = cliente.post('/api/operacional/horarios/gerar', json={**periodo, **extras}, headers=admin)
+        return time.perf_counter() - antes, resposta.get_json()
+
+    print(f'{args.rotas} rotas x {args.horarios_por_rota} horários, {args.dias} dias\n')
+    tempo, corpo = gerar(simular=True)
+    print(f"simulação:          {tempo:7.2f} s  ({corpo['novas']} viagens a criar)")
+    tempo_lote, corpo = gerar()
+    criadas = corpo['novas']
+    print(f"geração em lote:    {tempo_lote:7.2f} s  ({criadas} criadas, {len(corpo['conflitos'])} conflitos)")
+    tempo, corpo = gerar()
+    print(f"de novo (repetida): {tempo:7.2f} s  ({corpo['novas']} criadas, {corpo['existentes']} já existentes)")
+
+    # Caminho antigo: um POST por viagem, depois do período já gerado
+    with app.app_context():
+        horario = HorarioViagem.query.first()
+        partida = datetime.combine(inicio + timedelta(days=args.dias + 1), horario.hora_partida)
+        antes = time.perf_counter()
+        for i in range(args.amostra):
+            saida = partida + timedelta(days=i)
+            cliente.post('/api/operacional/viagens', json={
+                'rota_id': horario.rota_id, 'onibus_id': horario.onibus_id, 'motorista_id': horario.motorista_id,
+                'data_partida_prevista': saida.isoformat(),
+                'data_chegada_prevista': (saida + timedelta(minutes=horario.duracao_minutos)).isoformat(),
+            }, headers=admin)
+        por_viagem = (time.perf_counter() - antes) / args.amostra
+        assert Viagem.query.count() == criadas + args.amostra
+    print(f'\num POST por viagem: {por_viagem * 1e3:7.2f} ms/viagem -> {por_viagem * criadas:.1f} s estimados '
+          f'para {criadas} ({por_viagem * criadas / tempo_lote:.0f}x a geração em lote)')
+
+
+if __name__ == '__main__':
+    main()
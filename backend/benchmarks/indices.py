@@ -0,0 +1,168 @@
+"""
+Benchmark dos índices das consultas principais (migração 43bb02da9257).
+
+Cria um SQLite temporário com o schema de app/models.py, sem os índices
+compostos, e preenche-o com --vendas vendas (1 milhão por padrão), viagens,
+caixas e registros. Para cada consulta usada pelas rotas mostra o EXPLAIN
+QUERY PLAN e a latência mediana ANTES e DEPOIS de criar os índices.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.indices [--vendas 1000000] [--repeticoes 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from app.extensions import db
+from app import models  # noqa: F401 (regista as tabelas no metadata)
+
+# (descrição, SQL, parâmetros) - espelham as queries geradas pelas rotas
+CONSULTAS = [
+    ("Caixa aberto do bilheteiro (toda venda)",
+     "SELECT * FROM caixa_diario WHERE bilheteiro_id = ? AND status = 'Aberto' LIMIT 1", (7,)),
+    ("Vendas: 1ª página (ORDER BY data_hora_venda DESC, id DESC)",
+     "SELECT * FROM venda ORDER BY data_hora_venda DESC, id DESC LIMIT 50", ()),
+    ("Vendas de uma viagem",
+     "SELECT * FROM venda WHERE viagem_id = ? ORDER BY data_hora_venda DESC, id DESC", (1234,)),
+    ("Vendas de um bilheteiro num dia",
+     "SELECT * FROM venda WHERE bilheteiro_id = ? AND data_hora_venda >= ? AND data_hora_venda <= ? "
+     "ORDER BY data_hora_venda DESC, id DESC", (7, '2024-06-01 00:00:00', '2024-06-01 23:59:59')),
+    ("Vendas num período (filtro de datas)",
+     "SELECT * FROM venda WHERE data_hora_venda >= ? AND data_hora_venda <= ? "
+     "ORDER BY data_hora_venda DESC, id DESC LIMIT 50", ('2024-06-01 00:00:00', '2024-06-07 23:59:59')),
+    ("Poltronas ocupadas de uma viagem (bitmap)",
+     "SELECT numero_poltrona FROM venda WHERE viagem_id = ?", (1234,)),
+    ("Viagens de um mês (listagem/relatório)",
+     "SELECT * FROM viagem WHERE data_partida_prevista >= ? AND data_partida_prevista <= ? "
+     "ORDER BY data_partida_prevista DESC, id DESC", ('2024-06-01 00:00:00', '2024-06-30 23:59:59')),
+    ("Viagens por status",
+     "SELECT * FROM viagem WHERE status = ? ORDER BY data_partida_prevista DESC, id DESC LIMIT 50", ('Em Trânsito',)),
+    ("Viagens de um ônibus",
+     "SELECT * FROM viagem WHERE onibus_id = ? ORDER BY data_partida_prevista DESC, id DESC LIMIT 50", (3,)),
+    ("Registros de uma viagem",
+     "SELECT * FROM registro_operacional WHERE viagem_id = ?", (1234,)),
+    ("Caixas abertos num mês (relatório consolidado)",
+     "SELECT * FROM caixa_diario WHERE data_abertura >= ? AND data_abertura <= ?",
+     ('2024-06-01 00:00:00', '2024-06-30 23:59:59')),
+]
+
+METODOS = ['Dinheiro', 'Pix', 'Cartão']
+STATUS = ['Agendada', 'Em Trânsito', 'Concluída', 'Cancelada']
+
+
+def criar_banco(caminho, n_vendas):
+    engine = create_engine('sqlite:///' + caminho)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conexao = sqlite3.connect(caminho)
+    # Começa sem os índices compostos (como um banco anterior à migração)
+    for (nome,) in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'").fetchall():
+        conexao.execute(f'DROP INDEX {nome}')
+
+    aleatorio = random.Random(42)
+    inicio = datetime(2024, 1, 1)
+    n_bilheteiros, n_onibus, n_viagens = 40, 60, max(n_vendas // 40, 1)
+
+    conexao.executemany("INSERT INTO usuario (id, nome_completo, usuario, senha_hash, nivel_acesso) VALUES (?, ?, ?, 'x', 'bilheteiro')",
+                        [(i, f'Bilheteiro {i}', f'b{i}') for i in range(1, n_bilheteiros + 1)])
+    conexao.executemany("INSERT INTO motorista (id, nome_completo) VALUES (?, ?)",
+                        [(i, f'Motorista {i}') for i in range(1, n_onibus + 1)])
+    conexao.executemany("INSERT INTO onibus (id, numero_onibus, capacidade) VALUES (?, ?, 46)",
+                        [(i, f'ON-{i}') for i in range(1, n_onibus + 1)])
+    conexao.executemany("INSERT INTO rota (id, origem, destino) VALUES (?, 'A', ?)",
+                        [(i, f'Destino {i}') for i in range(1, 21)])
+
+    def viagens():
+        for i in range(1, n_viagens + 1):
+            partida = inicio + timedelta(minutes=30 * i)
+            yield (i, aleatorio.randint(1, 20), aleatorio.randint(1, n_onibus), aleatorio.randint(1, n_onibus),
+                   str(partida), str(partida + timedelta(hours=5)), aleatorio.choice(STATUS))
+    conexao.executemany("INSERT INTO viagem (id, rota_id, onibus_id, motorista_id, data_partida_prevista, "
+                        "data_chegada_prevista, status) VALUES (?, ?, ?, ?, ?, ?, ?)", viagens())
+
+    def vendas():
+        # 40 vendas por viagem, poltronas 1..40, vendidas antes da partida
+        for i in range(n_vendas):
+            viagem_id = i // 40 + 1
+            partida = inicio + timedelta(minutes=30 * viagem_id)
+            momento = partida - timedelta(minutes=aleatorio.randint(10, 7 * 24 * 60))
+            yield (viagem_id, aleatorio.randint(1, n_bilheteiros), str(momento), 'Passageiro', '000',
+                   i % 40 + 1, 100.0, aleatorio.choice(METODOS))
+    conexao.executemany("INSERT INTO venda (viagem_id, bilheteiro_id, data_hora_venda, nome_passageiro, "
+                        "documento_passageiro, numero_poltrona, valor_passagem, metodo_pagamento) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", vendas())
+
+    def caixas():
+        for dia in range((n_viagens * 30) // (24 * 60) + 1):
+            for bilheteiro in range(1, n_bilheteiros + 1):
+                abertura = inicio + timedelta(days=dia, hours=6)
+                yield (bilheteiro, str(abertura), str(abertura + timedelta(hours=10)), 'Fechado')
+    conexao.executemany("INSERT INTO caixa_diario (bilheteiro_id, data_abertura, data_fechamento, status) "
+                        "VALUES (?, ?, ?, ?)", caixas())
+    conexao.execute("UPDATE caixa_diario SET status = 'Aberto' WHERE id IN "
+                    "(SELECT MAX(id) FROM caixa_diario GROUP BY bilheteiro_id)")
+
+    conexao.executemany("INSERT INTO registro_operacional (viagem_id, bilheteiro_id, pass_final) VALUES (?, ?, ?)",
+                        [(v, aleatorio.randint(1, n_bilheteiros), 40) for v in range(1, n_viagens + 1)])
+    conexao.commit()
+    conexao.execute('ANALYZE')
+    return conexao
+
+
+def criar_indices(conexao):
+    """ Cria os índices declarados em app/models.py (os mesmos da migração) """
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            unico = 'UNIQUE ' if indice.unique else ''
+            colunas = ', '.join(coluna.name for coluna in indice.columns)
+            conexao.execute(f'CREATE {unico}INDEX IF NOT EXISTS {indice.name} ON {tabela.name} ({colunas})')
+    conexao.execute('ANALYZE')
+
+
+def medir(conexao, repeticoes):
+    resultados = []
+    for descricao, sql, parametros in CONSULTAS:
+        plano = ' | '.join(linha[3] for linha in conexao.execute('EXPLAIN QUERY PLAN ' + sql, parametros))
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            conexao.execute(sql, parametros).fetchall()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultados.append((descricao, plano, statistics.median(tempos)))
+    return resultados
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--vendas', type=int, default=1_000_000)
+    argumentos.add_argument('--repeticoes', type=int, default=5)
+    args = argumentos.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_indices_')
+    caminho = os.path.join(pasta, 'indices.db')
+    print(f"A gerar {args.vendas} vendas em {caminho} ...")
+    inicio = time.perf_counter()
+    conexao = criar_banco(caminho, args.vendas)
+    print(f"Banco gerado em {time.perf_counter() - inicio:.1f}s\n")
+
+    antes = medir(conexao, args.repeticoes)
+    criar_indices(conexao)
+    depois = medir(conexao, args.repeticoes)
+
+    for (descricao, plano_antes, ms_antes), (_, plano_depois, ms_depois) in zip(antes, depois):
+        print(f"== {descricao}")
+        print(f"   antes : {ms_antes:9.2f} ms | {plano_antes}")
+        print(f"   depois: {ms_depois:9.2f} ms | {plano_depois}")
+    conexao.close()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
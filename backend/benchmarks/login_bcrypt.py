@@ -0,0 +1,53 @@
+"""
+Benchmark de throughput do login para diferentes work factors do bcrypt.
+
+Para cada custo, cria um app com BCRYPT_LOG_ROUNDS=<custo> e dispara logins
+simultâneos (como numa troca de turno). Mostra logins/s, latência média e
+quantos pedidos receberam 503 por o pool do bcrypt estar cheio.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.login_bcrypt [--custos 4 8 10 12] [--logins 200] [--threads 32]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.comum import criar_app_benchmark, criar_usuario
+
+
+def medir(custo, logins, threads):
+    app = criar_app_benchmark(BCRYPT_LOG_ROUNDS=custo)
+    with app.app_context():
+        criar_usuario('bilheteiro_login', senha='senha-turno')
+    cliente = app.test_client()
+
+    def logar(_):
+        inicio = time.perf_counter()
+        resposta = cliente.post('/api/auth/login', json={'usuario': 'bilheteiro_login', 'senha': 'senha-turno'})
+        return resposta.status_code, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(logar, range(logins)))
+    duracao = time.perf_counter() - inicio
+
+    ok = [t for status, t in resultados if status == 200]
+    recusados = sum(1 for status, _ in resultados if status == 503)
+    media_ms = 1000 * sum(ok) / len(ok) if ok else float('nan')
+    print(f"custo={custo:>2} | {len(ok) / duracao:8.1f} logins/s | latência média {media_ms:8.1f} ms "
+          f"| ok={len(ok)} 503={recusados} | workers={app.config['BCRYPT_POOL_WORKERS']} "
+          f"espera={app.config['BCRYPT_POOL_ESPERA']}")
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--custos', type=int, nargs='+', default=[4, 8, 10, 12])
+    argumentos.add_argument('--logins', type=int, default=200)
+    argumentos.add_argument('--threads', type=int, default=32)
+    args = argumentos.parse_args()
+
+    for custo in args.custos:
+        medir(custo, args.logins, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Custo da instrumentação de métricas (app/metricas.py) por pedido.
+
+Cria dois apps sobre o mesmo banco temporário, um com METRICAS_HABILITADAS
+e outro sem, e alterna rodadas de --pedidos pedidos em cada um para vários
+endpoints (sem SQL, 1 statement e listagem paginada). Mostra a mediana por
+pedido com e sem métricas e a diferença absoluta e relativa.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.metricas [--pedidos 500] [--rodadas 7]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import create_app
+from app.extensions import db
+from app.models import Viagem
+from benchmarks.comum import config_temporaria, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+
+def preparar():
+    config = config_temporaria()
+    app_com = create_app(type('ConfigComMetricas', (config,), {'METRICAS_HABILITADAS': True}))
+    app_sem = create_app(type('ConfigSemMetricas', (config,), {'METRICAS_HABILITADAS': False}))
+    with app_com.app_context():
+        db.create_all()
+        headers = cabecalho_auth(criar_usuario('admin_metricas', 'admin'), 'admin')
+        motorista_id, onibus_id, rota_id = criar_cadastros_basicos()
+        inicio = datetime(2030, 1, 1, 6, 0)
+        db.session.execute(insert(Viagem), [
+            {'rota_id': rota_id, 'onibus_id': onibus_id, 'motorista_id': motorista_id,
+             'data_partida_prevista': inicio + timedelta(hours=i),
+             'data_chegada_prevista': inicio + timedelta(hours=i + 3)}
+            for i in range(1000)
+        ])
+        db.session.commit()
+    endpoints = ['/status', f'/api/cadastros/rotas/{rota_id}', '/api/operacional/viagens?limite=50']
+    return app_com, app_sem, headers, endpoints
+
+
+def rodada(cliente, url, headers, pedidos):
+    inicio = time.perf_counter()
+    for _ in range(pedidos):
+        resposta = cliente.get(url, headers=headers)
+        resposta.close()
+    return (time.perf_counter() - inicio) / pedidos * 1e6  # µs por pedido
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--pedidos', type=int, default=500)
+    argumentos.add_argument('--rodadas', type=int, default=7)
+    args = argumentos.parse_args()
+
+    app_com, app_sem, headers, endpoints = preparar()
+    clientes = {'com': app_com.test_client(), 'sem': app_sem.test_client()}
+    print(f"{'endpoint':<40} {'sem (µs)':>10} {'com (µs)':>10} {'custo':>16}")
+    for url in endpoints:
+        tempos = {'com': [], 'sem': []}
+        rodada(clientes['sem'], url, headers, args.pedidos // 5)  # aquecimento
+        rodada(clientes['com'], url, headers, args.pedidos // 5)
+        for _ in range(args.rodadas):
+            for nome in ('sem', 'com'):
+                tempos[nome].append(rodada(clientes[nome], url, headers, args.pedidos))
+        sem, com = statistics.median(tempos['sem']), statistics.median(tempos['com'])
+        print(f"{url:<40} {sem:>10.0f} {com:>10.0f} {com - sem:>+8.0f} µs {100 * (com - sem) / sem:>+5.1f}%")
+
+    metricas = clientes['com'].get('/metrics').get_data(as_text=True)
+    print(f"\n/metrics: {len(metricas.splitlines())} linhas, ex.:")
+    print('\n'.join(l for l in metricas.splitlines() if l.startswith('http_requests_total')))
+
+
+if __name__ == '__main__':
+    main()
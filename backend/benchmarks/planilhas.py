@@ -0,0 +1,104 @@
+"""
+Importação de CSV em lote (POST .../csv): tempo e pico de memória do Python
+(tracemalloc) para arquivos de tamanhos diferentes. Com a leitura em stream
+e os INSERTs em lotes, o pico não deve crescer com o número de linhas.
+
+Gera, numa pasta temporária, CSVs de ônibus e de viagens (sem conflitos de
+escala) com cada quantidade de --linhas, envia o arquivo como corpo do
+pedido (sem carregá-lo inteiro na memória) e mede. Por fim, a exportação.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.planilhas [--linhas 10000 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import Onibus, Viagem
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+
+def csv_onibus(caminho, linhas, prefixo):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('numero_onibus,placa,empresa_parceira,capacidade\n')
+        for i in range(linhas):
+            arquivo.write(f'{prefixo}-{i},{prefixo}{i:07d},Parceira {i % 7},{40 + i % 10}\n')
+
+
+def csv_viagens(caminho, linhas, ids, inicio):
+    motorista_id, onibus_id, rota_id = ids
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('rota_id,onibus_id,motorista_id,data_partida_prevista,data_chegada_prevista\n')
+        for i in range(linhas):
+            partida = inicio + timedelta(hours=3 * i)
+            arquivo.write(f'{rota_id},{onibus_id},{motorista_id},{partida.isoformat()},'
+                          f'{(partida + timedelta(hours=2)).isoformat()}\n')
+
+
+def limpar(app):
+    """ Apaga o que as importações anteriores gravaram (ficam os cadastros básicos, id 1) """
+    with app.app_context():
+        Viagem.query.delete()
+        Onibus.query.filter(Onibus.id > 1).delete()
+        db.session.commit()
+
+
+def enviar(cliente, url, caminho, cabecalho, medir_memoria):
+    with open(caminho, 'rb') as arquivo:
+        if medir_memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resposta = cliente.post(url, input_stream=arquivo, content_length=os.path.getsize(caminho),
+                                headers={**cabecalho, 'Content-Type': 'text/csv'})
+        tempo = time.perf_counter() - inicio
+        pico = 0
+        if medir_memoria:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    corpo = resposta.get_json()
+    assert resposta.status_code == 200 and corpo['total_erros'] == 0, corpo
+    return tempo, pico, corpo['importadas']
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--linhas', type=int, nargs='+', default=[10000, 100000])
+    args = argumentos.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_csv_')
+    app = criar_app_benchmark()
+    cliente = app.test_client()
+    with app.app_context():
+        admin = cabecalho_auth(criar_usuario('admin', 'admin'), 'admin')
+        ids = criar_cadastros_basicos()
+
+    print(f"{'arquivo':<22} {'linhas':>8} {'tempo':>9} {'linhas/s':>9} {'pico memória':>13}")
+    for n, linhas in enumerate(args.linhas):
+        casos = (
+            ('ônibus', '/api/cadastros/onibus/csv', os.path.join(pasta, f'onibus{n}.csv'),
+             lambda caminho: csv_onibus(caminho, linhas, f'B{n}')),
+            ('viagens', '/api/operacional/viagens/csv', os.path.join(pasta, f'viagens{n}.csv'),
+             lambda caminho: csv_viagens(caminho, linhas, ids, datetime(2031, 1, 1))),
+        )
+        for nome, url, caminho, gerar in casos:
+            gerar(caminho)
+            # Tempo sem o tracemalloc (que deixa tudo mais lento); memória numa segunda carga do mesmo arquivo
+            limpar(app)
+            tempo, _, importadas = enviar(cliente, url, caminho, admin, medir_memoria=False)
+            limpar(app)
+            _, pico, _ = enviar(cliente, url, caminho, admin, medir_memoria=True)
+            print(f'{nome:<22} {importadas:>8} {tempo:>8.2f}s {importadas / tempo:>9.0f} {pico / 2**20:>10.1f} MB')
+
+    with app.app_context():
+        total = Viagem.query.count()
+    inicio = time.perf_counter()
+    resposta = cliente.get('/api/operacional/viagens/csv', headers=admin)
+    tamanho = sum(len(bloco) for bloco in resposta.response)
+    print(f'\nexportação de {total} viagens: {time.perf_counter() - inicio:.2f}s ({tamanho / 2**20:.1f} MB de CSV)')
+
+
+if __name__ == '__main__':
+    main()
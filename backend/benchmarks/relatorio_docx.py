@@ -0,0 +1,59 @@
+"""
+Benchmark do relatório DOCX de viagens (/api/relatorios/viagens/docx).
+
+Para cada volume, insere N viagens num banco temporário e mede o tempo do
+pedido e quanto o pico de memória do processo (RSS) subiu durante a geração.
+Os volumes correm em ordem crescente, então cada medição de RSS é válida.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.relatorio_docx [--volumes 1000 10000 50000]
+"""
+import argparse
+import resource
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.extensions import db
+from app.models import Viagem
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+
+def medir(volume):
+    app = criar_app_benchmark()
+    with app.app_context():
+        headers = cabecalho_auth(criar_usuario('admin_bench', 'admin'), 'admin')
+        motorista_id, onibus_id, rota_id = criar_cadastros_basicos()
+        inicio = datetime(2030, 1, 1, 6, 0)
+        db.session.execute(insert(Viagem), [
+            {
+                'rota_id': rota_id, 'onibus_id': onibus_id, 'motorista_id': motorista_id,
+                'data_partida_prevista': inicio + timedelta(hours=i),
+                'data_chegada_prevista': inicio + timedelta(hours=i + 3),
+                'status': 'Agendada',
+            }
+            for i in range(volume)
+        ])
+        db.session.commit()
+
+    cliente = app.test_client()
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    resposta = cliente.get('/api/relatorios/viagens/docx', headers=headers)
+    duracao = time.perf_counter() - inicio
+    pico = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_antes) * 1024  # ru_maxrss em KB (Linux)
+
+    assert resposta.status_code == 200
+    print(f"{volume:>7} viagens | {duracao:7.2f} s | {volume / duracao:9.0f} linhas/s "
+          f"| pico de RSS +{pico / 2**20:7.1f} MB | arquivo {len(resposta.data) / 2**20:6.2f} MB")
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--volumes', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = argumentos.parse_args()
+    for volume in args.volumes:
+        medir(volume)
+
+
+if __name__ == '__main__':
+    main()
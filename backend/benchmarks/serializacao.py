@@ -0,0 +1,105 @@
+"""
+Serialização das listagens: objetos do ORM + to_dict() + json do Flask
+(como era) contra tuplas de colunas + app/serializacao.py (orjson e, para
+comparação, o fallback com o json da stdlib).
+
+Cria um banco temporário com --linhas viagens, vendas, registros e caixas e,
+para cada tabela, mede consulta + serialização da lista inteira. Mostra a
+mediana em ms por 10 mil linhas e o ganho sobre o caminho antigo.
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.serializacao [--linhas 10000] [--rodadas 7]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from app import serializacao
+from app.extensions import db
+from app.models import Viagem, RegistroOperacional, Venda, CaixaDiario
+from app.serializacao import ESQUEMA_VIAGEM, ESQUEMA_REGISTRO, ESQUEMA_VENDA, ESQUEMA_CAIXA
+from benchmarks.comum import criar_app_benchmark, criar_usuario, criar_cadastros_basicos
+
+CASOS = (
+    ('viagem', ESQUEMA_VIAGEM, lambda: Viagem.query.order_by(Viagem.id.desc())),
+    ('venda', ESQUEMA_VENDA, lambda: Venda.query.order_by(Venda.id.desc())),
+    ('registro_operacional', ESQUEMA_REGISTRO,
+     lambda: RegistroOperacional.query.order_by(RegistroOperacional.id.desc())),
+    ('caixa_diario', ESQUEMA_CAIXA, lambda: CaixaDiario.query.order_by(CaixaDiario.id.desc())),
+)
+
+
+def popular(linhas):
+    bilheteiros = [criar_usuario(f'bilheteiro{i}') for i in range(20)]
+    motorista_id, onibus_id, rota_id = criar_cadastros_basicos()
+    inicio = datetime(2030, 1, 1, 6, 0)
+    db.session.execute(insert(Viagem), [
+        {'rota_id': rota_id, 'onibus_id': onibus_id, 'motorista_id': motorista_id,
+         'data_partida_prevista': inicio + timedelta(minutes=30 * i),
+         'data_chegada_prevista': inicio + timedelta(minutes=30 * i + 180)}
+        for i in range(linhas)
+    ])
+    db.session.execute(insert(Venda), [
+        {'viagem_id': 1 + i // 40, 'bilheteiro_id': bilheteiros[i % 20], 'numero_poltrona': 1 + i % 40,
+         'data_hora_venda': inicio + timedelta(seconds=37 * i), 'nome_passageiro': f'Passageiro {i}',
+         'documento_passageiro': f'{i:011d}', 'valor_passagem': 50 + i % 90, 'metodo_pagamento': 'Pix'}
+        for i in range(linhas)
+    ])
+    db.session.execute(insert(RegistroOperacional), [
+        {'viagem_id': 1 + i, 'bilheteiro_id': bilheteiros[i % 20],
+         'data_hora_chegada_real': inicio + timedelta(minutes=30 * i + 2), 'pass_chegaram': i % 40,
+         'pass_embarcaram': i % 7, 'pass_desembarcaram': i % 5, 'pass_final': i % 40, 'observacoes': 'Sem ocorrências'}
+        for i in range(linhas)
+    ])
+    db.session.execute(insert(CaixaDiario), [
+        {'bilheteiro_id': bilheteiros[i % 20], 'data_abertura': inicio + timedelta(hours=8 * i),
+         'data_fechamento': inicio + timedelta(hours=8 * i + 7), 'saldo_inicial': 100.0,
+         'total_geral_vendas': 1234.5, 'status': 'Fechado'}
+        for i in range(linhas)
+    ])
+    db.session.commit()
+
+
+def medir(funcao, rodadas):
+    tempos = []
+    for _ in range(rodadas):
+        db.session.expunge_all()  # o caminho antigo não pode aproveitar objetos da rodada anterior
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--linhas', type=int, default=10000)
+    argumentos.add_argument('--rodadas', type=int, default=7)
+    args = argumentos.parse_args()
+
+    app = criar_app_benchmark()
+    with app.app_context():
+        popular(args.linhas)
+        orjson = serializacao.orjson
+        por_10k = 1e3 * 10000 / args.linhas
+        print(f'{args.linhas} linhas por tabela; orjson {"instalado" if orjson else "AUSENTE"}\n')
+        print(f"{'tabela':<22} {'to_dict+json':>13} {'colunas+json':>13} {'colunas+orjson':>15} {'ganho':>7}")
+        for nome, esquema, consulta in CASOS:
+            selecao = esquema.selecionar({})
+            antigo = medir(lambda: current_app.json.dumps([o.to_dict() for o in consulta().all()]), args.rodadas)
+            serializacao.orjson = None
+            stdlib = medir(lambda: serializacao.dumps(selecao.lista(consulta())), args.rodadas)
+            serializacao.orjson = orjson
+            novo = medir(lambda: serializacao.dumps(selecao.lista(consulta())), args.rodadas)
+            print(f'{nome:<22} {antigo * por_10k:>10.0f} ms {stdlib * por_10k:>10.0f} ms '
+                  f'{novo * por_10k:>12.0f} ms {antigo / novo:>6.1f}x')
+
+        # ?fields= reduz colunas lidas e bytes gerados
+        selecao = ESQUEMA_VENDA.selecionar({'fields': 'id,valor_passagem'})
+        parcial = medir(lambda: serializacao.dumps(selecao.lista(Venda.query.order_by(Venda.id.desc()))), args.rodadas)
+        print(f"\nvenda ?fields=id,valor_passagem: {parcial * por_10k:.0f} ms por 10 mil linhas")
+
+
+if __name__ == '__main__':
+    main()
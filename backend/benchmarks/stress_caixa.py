@@ -0,0 +1,83 @@
+"""
+Teste de stress dos totais do caixa.
+
+Dispara centenas de vendas simultâneas contra o MESMO caixa aberto e confere
+que os totais do CaixaDiario batem exatamente com SUM(valor_passagem) das
+vendas gravadas (por método de pagamento e no total geral).
+
+Uso (na pasta 'backend'):
+    python -m benchmarks.stress_caixa [--vendas 400] [--threads 32]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.extensions import db
+from app.models import Viagem, Venda, CaixaDiario
+from benchmarks.comum import criar_app_benchmark, criar_usuario, cabecalho_auth, criar_cadastros_basicos
+
+# Valores exatos em binário, para a comparação com SUM() não depender de arredondamento
+VALORES = [12.5, 37.25, 80.0, 101.75]
+METODOS = ['Dinheiro', 'Pix', 'Cartão']
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argumentos.add_argument('--vendas', type=int, default=400)
+    argumentos.add_argument('--threads', type=int, default=32)
+    args = argumentos.parse_args()
+
+    app = criar_app_benchmark(SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 60}})
+    with app.app_context():
+        bilheteiro_id = criar_usuario('bilheteiro_stress')
+        headers = cabecalho_auth(bilheteiro_id)
+        motorista_id, onibus_id, rota_id = criar_cadastros_basicos(capacidade=args.vendas)
+        partida = datetime(2030, 1, 1, 8, 0)
+        viagem = Viagem(rota_id=rota_id, onibus_id=onibus_id, motorista_id=motorista_id,
+                        data_partida_prevista=partida, data_chegada_prevista=partida + timedelta(hours=4))
+        db.session.add(viagem)
+        db.session.commit()
+        viagem_id = viagem.id
+
+    cliente = app.test_client()
+    assert cliente.post('/api/vendas/caixa/abrir', json={'saldo_inicial': 0}, headers=headers).status_code == 201
+
+    def vender(i):
+        resposta = cliente.post('/api/vendas/vendas', headers=headers, json={
+            'viagem_id': viagem_id,
+            'nome_passageiro': f'Passageiro {i}',
+            'documento_passageiro': f'{i:011d}',
+            'numero_poltrona': i + 1,
+            'valor_passagem': VALORES[i % len(VALORES)],
+            'metodo_pagamento': METODOS[i % len(METODOS)],
+        })
+        return resposta.status_code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        status = list(executor.map(vender, range(args.vendas)))
+    duracao = time.perf_counter() - inicio
+
+    with app.app_context():
+        caixa = CaixaDiario.query.filter_by(bilheteiro_id=bilheteiro_id).one()
+        soma_por_metodo = dict(
+            db.session.query(Venda.metodo_pagamento, func.sum(Venda.valor_passagem))
+            .group_by(Venda.metodo_pagamento).all()
+        )
+        soma_total = db.session.query(func.sum(Venda.valor_passagem)).scalar() or 0.0
+
+        print(f"Vendas aceitas: {status.count(201)}/{args.vendas} em {duracao:.2f}s "
+              f"({args.vendas / duracao:.0f} vendas/s, {args.threads} threads)")
+        print(f"Caixa total_geral_vendas={caixa.total_geral_vendas} | SUM(valor_passagem)={soma_total}")
+
+        assert status.count(201) == args.vendas, f"Respostas inesperadas: {sorted(set(status))}"
+        assert caixa.total_geral_vendas == soma_total
+        assert caixa.total_vendas_dinheiro == soma_por_metodo.get('Dinheiro', 0.0)
+        assert caixa.total_vendas_pix == soma_por_metodo.get('Pix', 0.0)
+        assert caixa.total_vendas_cartao == soma_por_metodo.get('Cartão', 0.0)
+    print("OK: totais do caixa consistentes com as vendas.")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,4 +19,98 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Configuração do JWT (para os tokens de login)
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'minha-chave-secreta-jwt'
\ No newline at end of file
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'minha-chave-secreta-jwt'
+    
+    # Tempo (s) que uma alteração de papel/exclusão de usuário se sobrepõe ao claim
+    # 'nivel_acesso' dos tokens já emitidos. Deve ser >= validade do token de acesso
+    # (15 min por padrão no Flask-JWT-Extended).
+    CACHE_PAPEIS_TTL = int(os.environ.get('CACHE_PAPEIS_TTL') or 900)
+    
+    # Bcrypt: work factor dos hashes de senha (hashes antigos são refeitos no login)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS') or 12)
+    # Pool do bcrypt no login: hashes em paralelo, pedidos que podem esperar por
+    # um hash ao mesmo tempo e espera máxima (s, perto de um hash de custo 12).
+    # BCRYPT_POOL_ESPERA fica abaixo das threads do servidor (waitress usa 4 por
+    # padrão, --threads): numa rajada de logins sobra sempre uma para as vendas
+    BCRYPT_POOL_WORKERS = int(os.environ.get('BCRYPT_POOL_WORKERS') or os.cpu_count() or 2)
+    BCRYPT_POOL_ESPERA = int(os.environ.get('BCRYPT_POOL_ESPERA') or 3)
+    BCRYPT_POOL_TIMEOUT = float(os.environ.get('BCRYPT_POOL_TIMEOUT') or 0.5)
+    
+    # Jobs de relatórios: pasta dos arquivos gerados, processos de renderização
+    # e tempo (s) que um arquivo pronto fica disponível para download
+    RELATORIOS_JOBS_DIR = os.environ.get('RELATORIOS_JOBS_DIR') or os.path.join(basedir, 'instance', 'relatorios')
+    RELATORIOS_JOBS_WORKERS = int(os.environ.get('RELATORIOS_JOBS_WORKERS') or 2)
+    RELATORIOS_JOBS_TTL = int(os.environ.get('RELATORIOS_JOBS_TTL') or 3600)
+    
+    # Métricas por pedido em /metrics (formato Prometheus) e limite (ms) a partir
+    # do qual um statement SQL é registado no log 'app.sql_lento'
+    METRICAS_HABILITADAS = (os.environ.get('METRICAS_HABILITADAS') or '1') != '0'
+    METRICAS_SQL_LENTA_MS = float(os.environ.get('METRICAS_SQL_LENTA_MS') or 200)
+    
+    # Geração de viagens a partir dos modelos de horário: linhas por INSERT em
+    # lote e maior período (dias) aceito num pedido
+    GERADOR_VIAGENS_LOTE = int(os.environ.get('GERADOR_VIAGENS_LOTE') or 1000)
+    GERADOR_VIAGENS_MAX_DIAS = int(os.environ.get('GERADOR_VIAGENS_MAX_DIAS') or 366)
+    
+    # Importação de CSV: linhas por INSERT em lote e máximo de erros listados na resposta
+    IMPORTACAO_CSV_LOTE = int(os.environ.get('IMPORTACAO_CSV_LOTE') or 1000)
+    IMPORTACAO_CSV_MAX_ERROS = int(os.environ.get('IMPORTACAO_CSV_MAX_ERROS') or 1000)
+    
+    # Sincronização incremental: máximo de alterações por página
+    SINCRONIZACAO_LIMITE = int(os.environ.get('SINCRONIZACAO_LIMITE') or 1000)
+    
+    # Eventos em tempo real (Server-Sent Events, ver app/eventos.py): endereço do
+    # servidor do stream, dados pendentes (KB) por cliente antes de ele ser desligado,
+    # eventos guardados para o replay (Last-Event-ID), limite de assinantes e
+    # intervalo (s) do heartbeat
+    EVENTOS_HABILITADOS = (os.environ.get('EVENTOS_HABILITADOS') or '1') != '0'
+    EVENTOS_HOST = os.environ.get('EVENTOS_HOST') or '127.0.0.1'
+    EVENTOS_PORTA = int(os.environ.get('EVENTOS_PORTA') or 5003)
+    EVENTOS_FILA_KB = int(os.environ.get('EVENTOS_FILA_KB') or 512)
+    EVENTOS_HISTORICO = int(os.environ.get('EVENTOS_HISTORICO') or 1000)
+    EVENTOS_MAX_CLIENTES = int(os.environ.get('EVENTOS_MAX_CLIENTES') or 1000)
+    EVENTOS_HEARTBEAT = float(os.environ.get('EVENTOS_HEARTBEAT') or 15)
+    
+    # PRAGMAs aplicados a cada conexão SQLite (ver app/sqlite.py). Vazio = padrões do SQLite.
+    SQLITE_PRAGMAS = {}
+
+
+class ConfigProducao(Config):
+    """
+    Perfil de produção para SQLite com vários bilheteiros simultâneos.
+    WAL deixa as leituras correrem em paralelo com a escrita, e busy_timeout
+    faz uma escrita esperar pela outra em vez de falhar com "database is locked".
+    """
+    
+    # Sem o padrão do desenvolvimento: o banco versionado (gestao_transportes.db)
+    # passaria para WAL. Sem DATABASE_URL o create_app() falha.
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        # Espera máxima (ms) pelo lock de escrita antes de desistir
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+        # Em WAL, NORMAL só faz fsync no checkpoint: seguro contra corrupção,
+        # pode perder os últimos commits numa queda de energia
+        'synchronous': 'NORMAL',
+        # Cache de páginas por conexão, em KiB quando negativo (64 MB)
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_KB') or 64000),
+        # Leitura do arquivo via mmap (256 MB)
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_BYTES') or 268435456),
+        'temp_store': 'MEMORY',
+    }
+    
+    # Pool de conexões: pelo menos uma por thread do servidor (waitress usa 4 por
+    # padrão), com folga para picos; pool_timeout limita a espera por uma conexão livre
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('SQLALCHEMY_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('SQLALCHEMY_MAX_OVERFLOW') or 10),
+        'pool_timeout': 30,
+    }
+
+
+# Perfis selecionáveis pela variável de ambiente APP_CONFIG (ver run.py)
+configuracoes = {
+    'desenvolvimento': Config,
+    'producao': ConfigProducao,
+}
@@ -0,0 +1,53 @@
+"""indices das consultas principais
+
+Revision ID: 43bb02da9257
+Revises:
+Create Date: 2026-10-17 23:31:28.533537
+
+Índices compostos para os filtros e ordenações usados em vendas.py,
+operacional.py e relatorios.py (ver __table_args__ em app/models.py).
+
+Bancos criados antes desta revisão (via db.create_all()) não tinham nenhum
+índice além das chaves primárias/únicas: 'flask db upgrade' cria-os.
+Bancos novos criados por db.create_all() já nascem com os índices; basta
+marcar a revisão com 'flask db stamp head'. Os índices são criados com
+IF NOT EXISTS, então o upgrade também é seguro nesse caso.
+
+Atenção: ix_venda_viagem_poltrona é ÚNICO. Se já existirem vendas da mesma
+poltrona na mesma viagem, o upgrade falha até os duplicados serem corrigidos.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '43bb02da9257'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (nome, tabela, colunas, único)
+INDICES = [
+    ('ix_venda_viagem_poltrona', 'venda', ['viagem_id', 'numero_poltrona'], True),
+    ('ix_venda_data_hora_id', 'venda', ['data_hora_venda', 'id'], False),
+    ('ix_venda_bilheteiro_data_hora', 'venda', ['bilheteiro_id', 'data_hora_venda'], False),
+    ('ix_viagem_partida_id', 'viagem', ['data_partida_prevista', 'id'], False),
+    ('ix_viagem_status_partida', 'viagem', ['status', 'data_partida_prevista'], False),
+    ('ix_viagem_rota_partida', 'viagem', ['rota_id', 'data_partida_prevista'], False),
+    ('ix_viagem_onibus_partida', 'viagem', ['onibus_id', 'data_partida_prevista'], False),
+    ('ix_viagem_motorista_partida', 'viagem', ['motorista_id', 'data_partida_prevista'], False),
+    ('ix_caixa_diario_bilheteiro_status', 'caixa_diario', ['bilheteiro_id', 'status'], False),
+    ('ix_caixa_diario_data_abertura', 'caixa_diario', ['data_abertura'], False),
+    ('ix_registro_operacional_viagem', 'registro_operacional', ['viagem_id'], False),
+]
+
+
+def upgrade():
+    for nome, tabela, colunas, unico in INDICES:
+        op.create_index(nome, tabela, colunas, unique=unico, if_not_exists=True)
+
+
+def downgrade():
+    for nome, tabela, _, _ in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela, if_exists=True)
@@ -0,0 +1,50 @@
+"""agregado diario de receita
+
+Revision ID: 7c2e5a91d4b3
+Revises: 43bb02da9257
+Create Date: 2026-10-17 23:58:02.518304
+
+Tabela receita_diaria (ReceitaDiaria em app/models.py): vendas somadas por
+dia, rota, bilheteiro e método de pagamento. O upgrade já a preenche com o
+histórico de vendas; 'flask receita reconstruir' refaz o cálculo depois,
+se preciso (ex.: só alguns dias).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5a91d4b3'
+down_revision = '43bb02da9257'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'receita_diaria',
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.Column('rota_id', sa.Integer(), nullable=False),
+        sa.Column('bilheteiro_id', sa.Integer(), nullable=False),
+        sa.Column('metodo_pagamento', sa.String(length=30), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['bilheteiro_id'], ['usuario.id']),
+        sa.ForeignKeyConstraint(['rota_id'], ['rota.id']),
+        sa.PrimaryKeyConstraint('data', 'rota_id', 'bilheteiro_id', 'metodo_pagamento'),
+        if_not_exists=True
+    )
+
+    # No SQLite, CAST(... AS DATE) não dá uma data: date() devolve 'YYYY-MM-DD'
+    dia = 'date(v.data_hora_venda)' if op.get_bind().dialect.name == 'sqlite' else 'CAST(v.data_hora_venda AS DATE)'
+    op.execute('DELETE FROM receita_diaria')
+    op.execute(f"""
+        INSERT INTO receita_diaria (data, rota_id, bilheteiro_id, metodo_pagamento, quantidade, total)
+        SELECT {dia}, vi.rota_id, v.bilheteiro_id, v.metodo_pagamento, COUNT(v.id), SUM(v.valor_passagem)
+        FROM venda v JOIN viagem vi ON vi.id = v.viagem_id
+        GROUP BY {dia}, vi.rota_id, v.bilheteiro_id, v.metodo_pagamento
+    """)
+
+
+def downgrade():
+    op.drop_table('receita_diaria')
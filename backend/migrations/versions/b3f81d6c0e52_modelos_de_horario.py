@@ -0,0 +1,43 @@
+"""modelos de horario
+
+Revision ID: b3f81d6c0e52
+Revises: 7c2e5a91d4b3
+Create Date: 2026-10-18 00:41:27.903115
+
+Tabela horario_viagem (HorarioViagem em app/models.py): grade de horários
+que se repete, expandida em viagens por POST /api/operacional/horarios/gerar.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f81d6c0e52'
+down_revision = '7c2e5a91d4b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'horario_viagem',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rota_id', sa.Integer(), nullable=False),
+        sa.Column('onibus_id', sa.Integer(), nullable=False),
+        sa.Column('motorista_id', sa.Integer(), nullable=False),
+        sa.Column('hora_partida', sa.Time(), nullable=False),
+        sa.Column('duracao_minutos', sa.Integer(), nullable=False),
+        sa.Column('dias_semana', sa.String(length=7), nullable=False),
+        sa.Column('vigente_de', sa.Date(), nullable=True),
+        sa.Column('vigente_ate', sa.Date(), nullable=True),
+        sa.Column('ativo', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['motorista_id'], ['motorista.id']),
+        sa.ForeignKeyConstraint(['onibus_id'], ['onibus.id']),
+        sa.ForeignKeyConstraint(['rota_id'], ['rota.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('horario_viagem')
@@ -0,0 +1,77 @@
+"""log de alteracoes
+
+Revision ID: e8c4a27d19f6
+Revises: b3f81d6c0e52
+Create Date: 2026-10-18 01:37:12.640218
+
+Tabela alteracao (Alteracao em app/models.py) e os gatilhos que a mantêm
+em cada INSERT, UPDATE e DELETE das tabelas sincronizadas (ver
+app/sincronizacao.py). O upgrade já grava um 'upsert' por registro
+existente, para a primeira sincronização (cursor 0) trazer tudo.
+Os gatilhos e o log só existem no SQLite, único banco em que a
+sincronização é suportada; nos outros fica só a tabela, vazia.
+
+Como as anteriores, pode correr num banco criado por db.create_all(), que
+já tem a tabela e os gatilhos: tudo é criado só se não existir, e o log só
+é preenchido se estiver vazio.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c4a27d19f6'
+down_revision = 'b3f81d6c0e52'
+branch_labels = None
+depends_on = None
+
+TABELAS = ('usuario', 'motorista', 'onibus', 'rota', 'viagem', 'horario_viagem',
+           'registro_operacional', 'venda', 'caixa_diario')
+
+EVENTOS_SQLITE = (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'), ('DELETE', 'OLD', 'delete'))
+
+
+def upgrade():
+    op.create_table(
+        'alteracao',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tabela', sa.String(length=40), nullable=False),
+        sa.Column('registro_id', sa.Integer(), nullable=False),
+        sa.Column('operacao', sa.String(length=10), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+        if_not_exists=True
+    )
+    op.create_index('ix_alteracao_tabela_id', 'alteracao', ['tabela', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_alteracao_tabela_registro', 'alteracao', ['tabela', 'registro_id'], unique=True,
+                    if_not_exists=True)
+
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # Log já preenchido (pelos gatilhos de um banco do create_all): não duplica
+    if op.get_bind().execute(sa.text('SELECT 1 FROM alteracao LIMIT 1')).first() is None:
+        for tabela in TABELAS:
+            op.execute(f"INSERT INTO alteracao (tabela, registro_id, operacao) "
+                       f"SELECT '{tabela}', id, 'upsert' FROM {tabela} ORDER BY id")
+
+    for tabela in TABELAS:
+        for evento, linha, operacao in EVENTOS_SQLITE:
+            op.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_alteracao_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    INSERT OR REPLACE INTO alteracao (tabela, registro_id, operacao)
+                    VALUES ('{tabela}', {linha}.id, '{operacao}');
+                END
+            """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for tabela in TABELAS:
+            for evento, _, _ in EVENTOS_SQLITE:
+                op.execute(f'DROP TRIGGER IF EXISTS trg_{tabela}_alteracao_{evento.lower()}')
+    op.drop_index('ix_alteracao_tabela_registro', table_name='alteracao')
+    op.drop_index('ix_alteracao_tabela_id', table_name='alteracao')
+    op.drop_table('alteracao')
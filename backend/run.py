@@ -1,9 +1,13 @@
+import os
 # Importa o create_app de 'app' (o __init__.py)
 from app import create_app
+from config import configuracoes
 # Importa o 'db' do novo 'extensions.py'
 from app.extensions import db
 
-app = create_app()
+# APP_CONFIG=producao ativa o perfil de produção do SQLite (WAL, busy_timeout...);
+# nele DATABASE_URL é obrigatória
+app = create_app(configuracoes[os.environ.get('APP_CONFIG') or 'desenvolvimento'])
 
 @app.shell_context_processor
 def make_shell_context():
@@ -13,7 +17,7 @@ def make_shell_context():
     """
     from app.models import (
         Usuario, Motorista, Onibus, Rota, Viagem, 
-        RegistroOperacional, Venda, CaixaDiario
+        RegistroOperacional, Venda, CaixaDiario, ReceitaDiaria, HorarioViagem, Alteracao
     )
     
     return {
@@ -25,7 +29,10 @@ def make_shell_context():
         'Viagem': Viagem,
         'RegistroOperacional': RegistroOperacional,
         'Venda': Venda,
-        'CaixaDiario': CaixaDiario
+        'CaixaDiario': CaixaDiario,
+        'ReceitaDiaria': ReceitaDiaria,
+        'HorarioViagem': HorarioViagem,
+        'Alteracao': Alteracao
     }
 
 if __name__ == '__main__':